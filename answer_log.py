@@ -0,0 +1,73 @@
+"""Anonymous log of submitted answers, kept for offline analysis.
+
+Answers that pass the pre-screen are appended to a small SQLite database,
+keyed by topic, question and Shiny session id only. On Hugging Face the
+database goes to the persistent ``/data`` volume when one is mounted.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS answers (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    topic TEXT NOT NULL,
+    question INTEGER NOT NULL,
+    session TEXT,
+    answer TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS answers_topic_question ON answers (topic, question);
+"""
+
+
+def data_dir():
+    """Persistent storage if the Space has it, otherwise the working directory."""
+    configured = os.environ.get("TUTOR_DATA_DIR")
+    if configured:
+        return Path(configured)
+    persistent = Path("/data")
+    return persistent if persistent.is_dir() and os.access(persistent, os.W_OK) else Path.cwd()
+
+
+class AnswerLog:
+    def __init__(self, path=None):
+        self.path = Path(path) if path else data_dir() / "tutor_answers.sqlite"
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connection(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.executescript(SCHEMA)
+        return self._conn
+
+    def record(self, topic, question, session_id, answer):
+        try:
+            with self._lock:
+                conn = self._connection()
+                conn.execute(
+                    "INSERT INTO answers (ts, topic, question, session, answer) VALUES (?, ?, ?, ?, ?)",
+                    (time.time(), topic, question, session_id, answer),
+                )
+                conn.commit()
+        except sqlite3.Error as e:
+            print(f"Warning: Could not log answer: {e}")
+
+    def answers(self, topic, question=None):
+        """``(question, answer)`` rows for ``topic``, oldest first."""
+        with self._lock:
+            conn = self._connection()
+            if question is None:
+                rows = conn.execute(
+                    "SELECT question, answer FROM answers WHERE topic = ? ORDER BY id", (topic,)
+                )
+            else:
+                rows = conn.execute(
+                    "SELECT question, answer FROM answers WHERE topic = ? AND question = ? ORDER BY id",
+                    (topic, question),
+                )
+            return rows.fetchall()
@@ -0,0 +1,226 @@
+"""Quiz-attempt ingestion for the MCQ pages, served by a tutor Space.
+
+The MCQ pages POST each submitted attempt as JSON to ``/attempts``. The
+handler validates the attempt and queues it, then returns straight away. A
+single writer thread drains the queue into SQLite, one transaction per
+batch, so a burst of submissions costs one commit rather than one per
+attempt. The database lives next to the answer log on the persistent
+``/data`` volume when the Space has one.
+"""
+
+import json
+import math
+import queue
+import re
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from answer_log import data_dir
+
+SCHEMA = """
+PRAGMA journal_mode = WAL;
+PRAGMA synchronous = NORMAL;
+CREATE TABLE IF NOT EXISTS attempts (
+    id INTEGER PRIMARY KEY,
+    received REAL NOT NULL,
+    submitted TEXT,
+    quiz TEXT NOT NULL,
+    nickname TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    total INTEGER NOT NULL,
+    details TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS attempts_quiz ON attempts (quiz);
+"""
+
+MAX_BODY_BYTES = 256 * 1024
+MAX_QUESTIONS = 200
+_QUIZ = re.compile(r"^[A-Za-z0-9_-]{1,40}$")
+_CONTROL = re.compile(r"[\x00-\x1f\x7f]")
+
+
+class InvalidAttempt(ValueError):
+    pass
+
+
+def _count(payload, field, low, high):
+    value = payload.get(field)
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value) or value != int(value):
+        raise InvalidAttempt(f"{field} must be a whole number")
+    if not low <= value <= high:
+        raise InvalidAttempt(f"{field} must be between {low} and {high}")
+    return int(value)
+
+
+def validate(payload, received=None):
+    """The row to store for one attempt; raises ``InvalidAttempt`` with a reason."""
+    if not isinstance(payload, dict):
+        raise InvalidAttempt("attempt must be a JSON object")
+    quiz = payload.get("quiz")
+    if not isinstance(quiz, str) or not _QUIZ.match(quiz):
+        raise InvalidAttempt("quiz must be 1-40 letters, digits, '-' or '_'")
+    nickname = payload.get("nickname")
+    if not isinstance(nickname, str):
+        raise InvalidAttempt("nickname is required")
+    nickname = " ".join(nickname.split())
+    if not 1 <= len(nickname) <= 40 or _CONTROL.search(nickname):
+        raise InvalidAttempt("nickname must be 1-40 printable characters")
+    total = _count(payload, "total", 1, MAX_QUESTIONS)
+    score = _count(payload, "score", 0, total)
+    details = payload.get("details", {})
+    if not isinstance(details, dict) or len(details) > MAX_QUESTIONS:
+        raise InvalidAttempt(f"details must be an object with at most {MAX_QUESTIONS} questions")
+    submitted = payload.get("timestamp")
+    submitted = submitted[:40] if isinstance(submitted, str) else None
+    return (received or time.time(), submitted, quiz, nickname, score, total, json.dumps(details, separators=(",", ":")))
+
+
+class AttemptStore:
+    """Validated attempts, batch-inserted into SQLite by one writer thread.
+
+    ``listeners`` are called from the writer thread with each committed batch
+    of rows, for consumers that keep derived state up to date. An exception
+    in one is logged and counted, and doesn't stop ingestion.
+    """
+
+    def __init__(self, path=None, batch_size=1000, max_queue=100_000):
+        self.path = Path(path) if path else data_dir() / "quiz_attempts.sqlite"
+        self.batch_size = batch_size
+        self.listeners = []
+        self.counts = defaultdict(int)
+        self._queue = queue.Queue(max_queue)
+        self._lock = threading.Lock()
+        self._writer = None
+        self._read_conn = None
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.executescript(SCHEMA)
+        return conn
+
+    def _start(self):
+        with self._lock:
+            if self._writer is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._connect().close()
+                self._writer = threading.Thread(target=self._drain, name="attempt-writer", daemon=True)
+                self._writer.start()
+
+    def submit(self, rows):
+        """Queue validated rows; raises ``queue.Full`` when the writer has fallen too far behind."""
+        self._start()
+        if self._queue.maxsize and self._queue.qsize() + len(rows) > self._queue.maxsize:
+            raise queue.Full
+        for row in rows:
+            self._queue.put_nowait(row)
+        self.counts["accepted"] += len(rows)
+
+    def _drain(self):
+        conn = self._connect()
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write(conn, batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write(self, conn, batch):
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT INTO attempts (received, submitted, quiz, nickname, score, total, details) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    batch,
+                )
+        except sqlite3.Error as e:
+            self.counts["failed"] += len(batch)
+            print(f"Warning: Could not store {len(batch)} quiz attempts: {e}")
+            return
+        self.counts["written"] += len(batch)
+        self.counts["batches"] += 1
+        # A failing listener must not stop the writer thread, or attempts would queue until the endpoint 503s
+        for listener in self.listeners:
+            try:
+                listener(batch)
+            except Exception as e:
+                self.counts["listener_errors"] += 1
+                print(f"Warning: Quiz attempt listener {getattr(listener, '__qualname__', listener)} failed: {e!r}")
+
+    def flush(self):
+        """Block until every queued attempt has been committed."""
+        if self._writer is not None:
+            self._queue.join()
+
+    def rows(self, quiz=None):
+        """Stored attempts, oldest first."""
+        with self._lock:
+            if self._read_conn is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._read_conn = self._connect()
+            sql = "SELECT received, submitted, quiz, nickname, score, total, details FROM attempts"
+            if quiz is None:
+                return self._read_conn.execute(sql + " ORDER BY id").fetchall()
+            return self._read_conn.execute(sql + " WHERE quiz = ? ORDER BY id", (quiz,)).fetchall()
+
+
+CORS_HEADERS = {
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Methods": "GET, POST, OPTIONS",
+    "Access-Control-Allow-Headers": "Content-Type",
+}
+
+
+def attempt_routes(store):
+    """Starlette routes for ``/attempts``, to pass to ``with_metrics(..., routes=...)``."""
+    from starlette.responses import JSONResponse, Response
+    from starlette.routing import Route
+
+    async def attempts(request):
+        if request.method == "OPTIONS":
+            return Response(status_code=204, headers=CORS_HEADERS)
+        if request.method == "GET":
+            # Same shape as the old Apps Script doGet, for pages that still build the leaderboard client-side
+            rows = store.rows(request.query_params.get("quiz"))
+            return JSONResponse(
+                [{"timestamp": submitted or time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(received)),
+                  "nickname": nickname, "quiz": quiz, "score": score, "total": total}
+                 for received, submitted, quiz, nickname, score, total, _ in rows],
+                headers=CORS_HEADERS,
+            )
+
+        # Pages post with text/plain to avoid a CORS preflight, so the body is parsed whatever its type
+        body = await request.body()
+        if len(body) > MAX_BODY_BYTES:
+            return JSONResponse({"error": "request too large"}, status_code=413, headers=CORS_HEADERS)
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            store.counts["rejected"] += 1
+            return JSONResponse({"error": "body must be JSON"}, status_code=400, headers=CORS_HEADERS)
+        payloads = payload if isinstance(payload, list) else [payload]
+        received = time.time()
+        rows, errors = [], []
+        for i, item in enumerate(payloads):
+            try:
+                rows.append(validate(item, received))
+            except InvalidAttempt as e:
+                errors.append({"index": i, "error": str(e)})
+        store.counts["rejected"] += len(errors)
+        if not rows:
+            return JSONResponse({"accepted": 0, "rejected": errors}, status_code=400, headers=CORS_HEADERS)
+        try:
+            store.submit(rows)
+        except queue.Full:
+            return JSONResponse({"error": "busy, try again shortly"}, status_code=503, headers=CORS_HEADERS)
+        return JSONResponse({"accepted": len(rows), "rejected": errors}, status_code=202, headers=CORS_HEADERS)
+
+    return [Route("/attempts", attempts, methods=["GET", "POST", "OPTIONS"])]
@@ -0,0 +1,115 @@
+"""Throughput of the quiz-attempt ingestion endpoint.
+
+First the store alone: how many validated attempts per second the writer
+thread commits to SQLite. Then the full path: uvicorn serving ``/attempts``
+in its own process, hit by concurrent keep-alive connections posting one attempt
+per request, as the MCQ pages do. Run from the repository root:
+``python benchmarks/bench_attempts.py``.
+"""
+
+import asyncio
+import json
+import multiprocessing
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+import numpy as np
+import uvicorn
+from starlette.applications import Starlette
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from attempts import AttemptStore, attempt_routes, validate  # noqa: E402
+
+PORT = 8765
+
+
+def attempts(n, rng):
+    """Attempts at a 20-question quiz by a cohort of 500 nicknames."""
+    scores = rng.integers(0, 21, n)
+    nicknames = rng.integers(0, 500, n)
+    return [
+        {"quiz": "Week1", "nickname": f"student{k}", "score": int(s), "total": 20,
+         "details": {f"Q{q}": "A" for q in range(1, 21)}, "timestamp": "2026-10-19T12:00:00Z"}
+        for k, s in zip(nicknames, scores)
+    ]
+
+
+def bench_store(payloads, directory):
+    store = AttemptStore(directory / "store.sqlite")
+    started = time.perf_counter()
+    rows = [validate(p) for p in payloads]
+    validated = time.perf_counter()
+    for lo in range(0, len(rows), 100):
+        store.submit(rows[lo:lo + 100])
+    store.flush()
+    finished = time.perf_counter()
+    print(f"validate       {len(rows) / (validated - started):12,.0f} attempts/s")
+    print(f"store + commit {len(rows) / (finished - validated):12,.0f} attempts/s  "
+          f"({store.counts['batches']} transactions)")
+
+
+async def _client(bodies, statuses):
+    # A bare keep-alive HTTP/1.1 connection: general-purpose async clients cost more CPU than the server
+    reader, writer = await asyncio.open_connection("127.0.0.1", PORT)
+    for body in bodies:
+        writer.write(
+            f"POST /attempts HTTP/1.1\r\nHost: 127.0.0.1\r\nContent-Type: text/plain\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n".encode() + body
+        )
+        head = await reader.readuntil(b"\r\n\r\n")
+        length = int(head.lower().split(b"content-length:")[1].split(b"\r\n")[0])
+        await reader.readexactly(length)
+        statuses.append(int(head.split()[1]))
+    writer.close()
+    await writer.wait_closed()
+
+
+async def _post_all(payloads, concurrency):
+    bodies = iter(json.dumps(p).encode() for p in payloads)
+    statuses = []
+    await asyncio.gather(*(_client(bodies, statuses) for _ in range(concurrency)))
+    return statuses
+
+
+def _serve(path):
+    store = AttemptStore(path)
+    uvicorn.run(Starlette(routes=attempt_routes(store)), port=PORT, log_level="warning")
+
+
+def bench_http(payloads, directory, concurrency=64):
+    # The server runs in its own process, as on a Space, so the clients don't compete with it for the GIL
+    server = multiprocessing.get_context("spawn").Process(target=_serve, args=(directory / "http.sqlite",))
+    server.start()
+    try:
+        for _ in range(200):
+            try:
+                httpx.get(f"http://127.0.0.1:{PORT}/attempts?quiz=none")
+                break
+            except httpx.TransportError:
+                time.sleep(0.05)
+        started = time.perf_counter()
+        statuses = asyncio.run(_post_all(payloads, concurrency))
+        elapsed = time.perf_counter() - started
+        stored = len(httpx.get(f"http://127.0.0.1:{PORT}/attempts", timeout=30).json())
+    finally:
+        server.terminate()
+        server.join()
+    codes = {int(k): int(v) for k, v in zip(*np.unique(statuses, return_counts=True))}
+    print(f"HTTP POST      {len(payloads) / elapsed:12,.0f} attempts/s  "
+          f"({concurrency} clients, status codes {codes}, {stored} stored)")
+
+
+def main(n=100_000, requests=10_000):
+    rng = np.random.default_rng(0)
+    payloads = attempts(n, rng)
+    with tempfile.TemporaryDirectory() as tmp:
+        bench_store(payloads, Path(tmp))
+        bench_http(payloads[:requests], Path(tmp))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""Query latency of the memory-mapped macro store in ``macro_store.py``, against parsing CSVs with pandas.
+
+The store is built from synthetic series with the shapes of the real ones:
+monthly CPI and M4 from 1960, daily Bank Rate from 1960, and quarterly GDP
+with its output gap. That avoids needing network access to the ONS and the
+Bank of England. Cases:
+
+- opening the store and mapping a column (in a fresh ``MacroStore``);
+- a 2010-2019 range;
+- monthly CPI to quarterly averages, and daily Bank Rate to month-end values;
+- year-on-year CPI inflation since 2010.
+
+Each pandas case reads the series from CSV, as an app without the store
+would on every session, then does the same query.
+
+First, ``build --sources`` runs on the CSVs in ``benchmarks/fixtures/macro``.
+They copy the download formats: ONS files with quoted metadata rows, then
+annual, quarterly and monthly sections, and Bank of England files with a
+``DATE,<code>`` header and dates like 05 Mar 2009. The Bank Rate changes
+are the published ones since 2004; the CPI, GDP and M4 values are
+illustrative, for testing the parsers, not for teaching. The script exits
+non-zero if the build doesn't parse every row. Run from the repository
+root: ``python benchmarks/bench_macro_store.py``.
+"""
+
+import sys
+import tempfile
+import timeit
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from macro_store import MacroStore, Series, build, ordinal, output_gap, period_starts, write_store  # noqa: E402
+
+FIXTURES = ROOT / "benchmarks" / "fixtures" / "macro"
+# Periods each fixture should parse to: (frequency, first, last)
+EXPECTED = {
+    "cpi": ("M", "2005-01-01", "2024-12-01"),
+    "bank_rate": ("D", "2004-08-05", "2024-12-31"),
+    "m4": ("M", "2005-01-01", "2024-12-01"),
+    "gdp": ("Q", "2005-01-01", "2024-10-01"),
+    "output_gap": ("Q", "2005-01-01", "2024-10-01"),
+}
+
+
+def synthetic(rng):
+    months = ordinal("2025-12-01", "M") - ordinal("1960-01-01", "M") + 1
+    days = ordinal("2025-12-31", "D") - ordinal("1960-01-01", "D") + 1
+    quarters = months // 3
+    cpi = 10 * np.exp(np.cumsum(rng.normal(0.004, 0.003, months)))
+    m4 = 5e3 * np.exp(np.cumsum(rng.normal(0.007, 0.005, months)))
+    # Bank Rate changes on about one day in 200
+    changes = rng.random(days) < 0.005
+    rate = np.clip(5 + np.cumsum(np.where(changes, rng.normal(0, 0.5, days), 0)), 0.1, 17)
+    gdp = Series("gdp", "Q", ordinal("1960-01-01", "Q"),
+                 1e5 * np.exp(np.cumsum(rng.normal(0.006, 0.008, quarters))), "£ million")
+    return {
+        "cpi": Series("cpi", "M", ordinal("1960-01-01", "M"), cpi, "index"),
+        "m4": Series("m4", "M", ordinal("1960-01-01", "M"), m4, "£ million"),
+        "bank_rate": Series("bank_rate", "D", ordinal("1960-01-01", "D"), rate, "per cent"),
+        "gdp": gdp,
+        "output_gap": output_gap(gdp),
+    }
+
+
+def best(fn, number):
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number * 1e6
+
+
+def check_fixtures(tmp):
+    """Build from the fixture downloads and compare each series' span with ``EXPECTED``; returns the failures."""
+    start = timeit.default_timer()
+    _, series = build(tmp / "fixture-macro", sources_dir=FIXTURES)
+    print(f"build --sources {FIXTURES.relative_to(ROOT)}: {(timeit.default_timer() - start) * 1e3:.0f} ms")
+    failures = 0
+    for name, (frequency, first, last) in EXPECTED.items():
+        s = series[name]
+        span = (s.frequency, *map(str, period_starts([s.start, s.start + len(s) - 1], s.frequency)))
+        gaps = int(np.isnan(s.values).sum())
+        ok = span == (frequency, first, last) and not gaps
+        failures += not ok
+        verdict = "ok" if ok else f"expected {frequency} {first} to {last}"
+        print(f"  {name:11s} {s.frequency} {span[1]} to {span[2]}, {gaps} gaps  {verdict}")
+    rate = MacroStore(tmp / "fixture-macro").query("bank_rate", "2009-03-01", "2009-03-31")
+    # Bank Rate fell from 1 to 0.5 per cent on 5 March 2009, and is carried forward between changes
+    failures += not (rate.values[:4] == 1.0).all() or not (rate.values[4:] == 0.5).all()
+    return failures
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        failures = check_fixtures(tmp)
+        series = synthetic(np.random.default_rng(0))
+        root = tmp / "macro"
+        write_store(series, root)
+        for name, s in series.items():
+            s.to_pandas().to_csv(tmp / f"{name}.csv", header=True)
+
+        store = MacroStore(root)
+        cases = {
+            "open store, map cpi": (lambda: MacroStore(root).series("cpi"),
+                                    lambda: pd.read_csv(tmp / "cpi.csv", index_col=0, parse_dates=True)),
+            "cpi 2010-2019": (lambda: store.query("cpi", "2010-01-01", "2019-12-31"),
+                              lambda: pd.read_csv(tmp / "cpi.csv", index_col=0, parse_dates=True)["2010":"2019"]),
+            "cpi monthly to quarterly": (lambda: store.query("cpi", frequency="Q"),
+                                         lambda: pd.read_csv(tmp / "cpi.csv", index_col=0, parse_dates=True)
+                                         .resample("QS").mean()),
+            "bank rate daily to month-end": (lambda: store.query("bank_rate", frequency="M", how="last"),
+                                             lambda: pd.read_csv(tmp / "bank_rate.csv", index_col=0, parse_dates=True)
+                                             .resample("MS").last()),
+            "cpi inflation yoy since 2010": (lambda: store.query("cpi", "2010-01-01", growth="yoy"),
+                                             lambda: pd.read_csv(tmp / "cpi.csv", index_col=0, parse_dates=True)
+                                             .pct_change(12)["2010":]),
+        }
+        print(f"{len(series['bank_rate']):,} daily and {len(series['cpi']):,} monthly observations per series")
+        print(f"{'query':30s} {'store µs':>9s} {'pandas from CSV µs':>19s}")
+        for label, (ours, theirs) in cases.items():
+            print(f"{label:30s} {best(ours, 200):9.1f} {best(theirs, 5):19.0f}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
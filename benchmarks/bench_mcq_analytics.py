@@ -0,0 +1,65 @@
+"""Cohort item analysis over a large synthetic set of topic 1 MCQ attempts.
+
+Answers are drawn from a two-parameter logistic model over the real topic 1
+item bank, and wrong answers pick a distractor at random. The benchmark times
+unpacking the stored attempts into the response matrix, and then the
+vectorised analysis. Run from the repository root:
+``python benchmarks/bench_mcq_analytics.py``.
+"""
+
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from mcq_analytics import ItemBank, ResponseMatrix, analyse  # noqa: E402
+
+
+def synthetic_choices(bank, n, rng):
+    m = len(bank)
+    ability = rng.normal(0.0, 1.0, n)
+    a, b = rng.uniform(0.5, 2.0, m), rng.normal(0.0, 1.0, m)
+    right = rng.random((n, m)) < 1 / (1 + np.exp(-a * (ability[:, None] - b)))
+    keys = np.array(bank.keys)
+    widths = np.array([len(o) for o in bank.options])
+    wrong = (keys + 1 + rng.integers(0, widths - 1, (n, m))) % widths
+    return np.where(right, keys, wrong).astype(np.int16)
+
+
+def stored_rows(bank, choices):
+    for i, row in enumerate(choices):
+        details = {f"Q{j + 1}": {"selected": bank.options[j][k], "ok": int(k == bank.keys[j]), "cat": bank.categories[j]}
+                   for j, k in enumerate(row)}
+        yield (0.0, None, "Week1", f"student{i}", 0, len(row), json.dumps(details))
+
+
+def main(n=100_000):
+    bank = ItemBank.from_qmd(ROOT / "topic1mcqs.qmd")
+    choices = synthetic_choices(bank, n, np.random.default_rng(0))
+    rows = list(stored_rows(bank, choices))
+
+    matrix = ResponseMatrix(bank, quiz="Week1")
+    started = time.perf_counter()
+    for lo in range(0, n, 1000):
+        matrix.append(rows[lo:lo + 1000])
+    unpacked = time.perf_counter() - started
+    assert np.array_equal(matrix.choices, choices)
+
+    started = time.perf_counter()
+    stats = analyse(matrix.choices, matrix.keys, bank.categories)
+    elapsed = time.perf_counter() - started
+    print(f"{n:,} attempts x {len(bank)} items")
+    print(f"unpack stored attempts  {unpacked:6.2f} s  ({n / unpacked:,.0f} attempts/s, paid once as they arrive)")
+    print(f"cohort analysis         {elapsed * 1e3:6.1f} ms")
+    print(f"KR-20 {stats['reliability']:.3f}, difficulty {stats['difficulty'].min():.2f}-"
+          f"{stats['difficulty'].max():.2f}, discrimination {np.nanmin(stats['discrimination']):.2f}-"
+          f"{np.nanmax(stats['discrimination']):.2f}, {int(stats['review'].sum())} items flagged")
+
+
+if __name__ == "__main__":
+    main()
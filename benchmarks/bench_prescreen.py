@@ -0,0 +1,48 @@
+"""Per-answer cost of the local pre-screen.
+
+Run from the repository root: ``python benchmarks/bench_prescreen.py``.
+"""
+
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from prescreen import PLACEHOLDER, prescreen  # noqa: E402
+
+QUESTION = (
+    "According to the New Classical model, the more volatile is monetary policy the lower "
+    "is the effect of unpredictable changes in the price level on output. Intuitively "
+    "explain why this is the case."
+)
+CONCEPTS = (
+    "monetary volatility, New Classical model, signal extraction, price surprises, "
+    "output effects, information processing"
+)
+SUBSTANTIVE = (
+    "With high monetary volatility, rational agents recognise that price fluctuations mainly "
+    "reflect unpredictable money, not real demand. When they see prices rise they ask whether "
+    "it is monetary noise or a real shock and discount the signal, so the coefficient on price "
+    "surprises becomes small and unpredictable monetary shocks have minimal output effects. "
+) * 3
+
+CASES = {
+    "empty-ish": "money",
+    "placeholder": PLACEHOLDER,
+    "restated question": QUESTION,
+    "non-English": "El dinero es importante para la economía porque permite que los agentes "
+    "intercambien bienes sin la doble coincidencia de deseos",
+    "substantive (~150 words)": SUBSTANTIVE,
+}
+
+
+def main(number=20_000):
+    for name, answer in CASES.items():
+        seconds = timeit.timeit(lambda: prescreen(answer, QUESTION, CONCEPTS), number=number)
+        verdict = prescreen(answer, QUESTION, CONCEPTS)
+        print(f"{name:26s} {seconds / number * 1e6:8.2f} us/answer  -> {verdict[0] if verdict else 'LLM'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Site search: bytes transferred and query latency, monolithic search.json versus the sharded index.
+
+Both sides search the same documents: the sections in Quarto's current
+``docs/search.json``. They are also searched replicated ``--scale`` times
+(default 5), to show how each side grows once topics 4-8 get their
+readings. The query is typed a letter at a time, as the search box sees it.
+
+- Before: the page downloads ``search.json`` (counted gzip-compressed, as
+  GitHub Pages serves it), parses it, builds the Fuse.js index, and runs a
+  Fuse search per keystroke. The options are those of ``quarto-search.js``.
+- After: ``tools/search_client.js`` fetches ``meta.json.gz`` and only the
+  shards each keystroke needs.
+
+Latency is measured in Node on the real client code, so network time is
+excluded. Needs ``node`` on the path. Run from the repository root:
+``python benchmarks/bench_search.py``.
+"""
+
+import argparse
+import gzip
+import json
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "tools"))
+
+from build_search import build_index  # noqa: E402
+
+QUERIES = ["liquidity trap", "quantity theory of money", "friedman"]
+
+DRIVER = r"""
+const fs = require("fs"), zlib = require("zlib"), path = require("path");
+const [client, fuseFile, dir, queriesJson] = process.argv.slice(1);
+const SiteSearch = require(client);
+const Fuse = require(fuseFile);
+const now = () => Number(process.hrtime.bigint()) / 1e6;
+const keystrokes = q => Array.from({ length: q.length - 1 }, (_, i) => q.slice(0, i + 2)).filter(s => !s.endsWith(" "));
+const out = {};
+
+(async () => {
+  for (const query of JSON.parse(queriesJson)) {
+    // Before: download and index everything, then search per keystroke
+    const raw = fs.readFileSync(path.join(dir, "search.json"));
+    const t = now();
+    const fuse = new Fuse(JSON.parse(raw), {
+      keys: [{ name: "title", weight: 20 }, { name: "section", weight: 20 }, { name: "text", weight: 10 }],
+      ignoreLocation: true, threshold: 0.1, includeMatches: true, includeScore: true,
+    });
+    const firstBefore = now() - t;
+    const before = keystrokes(query).map(q => { const t0 = now(); fuse.search(q, { limit: 50 }); return now() - t0; });
+
+    // After: a fresh client per query, so its first keystroke pays for meta and shards
+    let bytes = 0;
+    const search = new SiteSearch("", async name => {
+      const data = fs.readFileSync(path.join(dir, "search", name));
+      bytes += data.length;
+      return JSON.parse(zlib.gunzipSync(data));
+    });
+    const after = [], fetched = [];
+    for (const q of keystrokes(query)) {
+      const t0 = now();
+      await search.search(q, 50);
+      after.push(now() - t0);
+      fetched.push(bytes);
+    }
+    out[query] = { firstBefore, before, after, fetched };
+  }
+  console.log(JSON.stringify(out));
+})();
+"""
+
+
+def scaled(entries, scale):
+    copies = []
+    for k in range(scale):
+        for e in entries:
+            href = e["href"] if k == 0 else e["href"].replace(".html", f"-copy{k}.html", 1)
+            copies.append({**e, "objectID": href, "href": href})
+    return copies
+
+
+def run(entries, workdir, node):
+    workdir.mkdir(parents=True, exist_ok=True)
+    raw = json.dumps(entries).encode()
+    (workdir / "search.json").write_bytes(raw)
+    sizes = build_index(entries, workdir / "search")
+    done = subprocess.run(
+        [node, "-e", DRIVER, str(ROOT / "tools" / "search_client.js"),
+         str(ROOT / "docs" / "site_libs" / "quarto-search" / "fuse.min.js"), str(workdir), json.dumps(QUERIES)],
+        capture_output=True, text=True, check=True,
+    )
+    return len(raw), len(gzip.compress(raw)), sizes, json.loads(done.stdout)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=int, default=5, help="also benchmark the site replicated this many times")
+    args = parser.parse_args(argv)
+    node = shutil.which("node")
+    if not node:
+        print("node is required to run the search clients")
+        return 1
+    entries = json.loads((ROOT / "docs" / "search.json").read_text(encoding="utf-8"))
+    with tempfile.TemporaryDirectory() as tmp:
+        for scale in sorted({1, args.scale}):
+            docs = scaled(entries, scale)
+            raw, gz, sizes, results = run(docs, Path(tmp) / f"x{scale}", node)
+            print(f"\n{len(docs)} sections (site x{scale}): search.json {raw / 1024:.0f} KB, {gz / 1024:.0f} KB gzipped; "
+                  f"sharded index {sum(sizes.values()) / 1024:.0f} KB in {len(sizes) - 1} shards "
+                  f"(meta {sizes['meta.json.gz'] / 1024:.1f} KB)")
+            print(f"{'query, typed':28s} {'KB before':>9s} {'KB after':>8s} {'first ms before':>15s} "
+                  f"{'first ms after':>14s} {'per key ms before':>17s} {'per key ms after':>16s}")
+            for query, r in results.items():
+                first_before = r["firstBefore"] + r["before"][0]
+                per_before = sum(r["before"][1:]) / max(len(r["before"]) - 1, 1)
+                per_after = sum(r["after"][1:]) / max(len(r["after"]) - 1, 1)
+                print(f"{query:28s} {gz / 1024:9.1f} {r['fetched'][-1] / 1024:8.1f} {first_before:15.1f} "
+                      f"{r['after'][0]:14.2f} {per_before:17.2f} {per_after:16.3f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+"""Startup time and memory of the lazy, columnar dataset loader in ``shared.py``.
+
+Each case runs in a fresh interpreter. The case reports the time of the
+measured step and the process's resident memory afterwards (Linux). Cases:
+
+- the old eager import, which imported pandas and parsed ``tips.csv``;
+- the new ``import shared``, which reads nothing;
+- the first access on a cold cache (CSV parsed and converted to Feather),
+  then on a warm one (Feather file memory-mapped).
+
+Tips has only 244 rows, so the same cases are repeated on a synthetic
+2-million-row tips-shaped CSV, registered with ``shared.register``. Run from
+the repository root: ``python benchmarks/bench_shared.py``.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+
+PRELUDE = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+started = time.perf_counter()
+"""
+REPORT = """
+elapsed = time.perf_counter() - started
+rss = next(int(line.split()[1]) for line in open("/proc/self/status") if line.startswith("VmRSS:"))
+print(json.dumps({"seconds": elapsed, "rss_mb": rss / 1024,
+                  "frame_mb": frame.memory_usage(deep=True).sum() / 2**20 if frame is not None else 0}))
+"""
+CASES = {
+    "eager read_csv (old import)": "import pandas as pd\nframe = pd.read_csv({csv!r})",
+    "import shared": "import shared\nframe = None",
+    "first access, cold cache": "import shared\nshared.register('data', {csv!r})\nframe = shared.load('data')",
+    "first access, warm cache": "import shared\nshared.register('data', {csv!r})\nframe = shared.load('data')",
+}
+
+
+def measure(code, csv, cache):
+    script = PRELUDE.format(root=str(ROOT)) + code.format(csv=str(csv)) + REPORT
+    env = {**os.environ, "TUTOR_DATA_DIR": str(cache)}
+    done = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, env=env, check=True)
+    return json.loads(done.stdout.strip().splitlines()[-1])
+
+
+def synthetic_tips(path, rows, rng):
+    tips = pd.read_csv(ROOT / "tips.csv")
+    sample = tips.sample(rows, replace=True, random_state=0).reset_index(drop=True)
+    sample["total_bill"] = (sample["total_bill"] * rng.uniform(0.8, 1.2, rows)).round(2)
+    sample.to_csv(path, index=False)
+
+
+def main(rows=2_000_000):
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        big = tmp / "tips_big.csv"
+        synthetic_tips(big, rows, np.random.default_rng(0))
+        for label, csv in (("tips.csv (244 rows)", ROOT / "tips.csv"),
+                           (f"synthetic tips ({rows:,} rows, {big.stat().st_size / 2**20:.0f} MB CSV)", big)):
+            cache = tmp / f"cache-{csv.stem}"
+            print(f"\n{label}")
+            print(f"{'case':30s} {'seconds':>8s} {'RSS MB':>7s} {'frame MB':>9s}")
+            for case, code in CASES.items():
+                result = measure(code, csv, cache)
+                print(f"{case:30s} {result['seconds']:8.3f} {result['rss_mb']:7.0f} {result['frame_mb']:9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Hit rates and latency of the shared simulation cache under simulated slider traffic.
+
+A cohort of students drags two sliders towards a handful of popular settings;
+each lookup runs the topic 4 money-growth model on a miss. Run from the
+repository root: ``python benchmarks/bench_sim_cache.py``.
+"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import money_growth  # noqa: E402
+from sim_cache import SimulationCache  # noqa: E402
+
+
+def model(g_after, speed):
+    g_M = money_growth.schedule(3.0, g_after, 5, 60)
+    return {k: v[0] for k, v in money_growth.simulate(g_M, speed).items()}
+
+
+def traffic(lookups, rng):
+    """Slider positions clustered around a few settings, with per-student jitter."""
+    popular = np.array([[6.0, 0.35], [10.0, 0.35], [6.0, 0.8], [4.0, 0.2]])
+    centres = popular[rng.integers(0, len(popular), lookups)]
+    return centres + rng.normal(0.0, [0.6, 0.04], (lookups, 2))
+
+
+def main(lookups=20_000):
+    import os
+
+    rng = np.random.default_rng(0)
+    points = traffic(lookups, rng)
+    started = time.perf_counter()
+    for g_after, speed in points:
+        model(g_after, speed)
+    uncached = time.perf_counter() - started
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["TUTOR_DATA_DIR"] = tmp
+        for label, tolerance in (("quantise only", None), ("quantise + interpolate", 0.1)):
+            cache = SimulationCache(f"bench-{tolerance}", model, {"g_after": 0.5, "speed": 0.05}, tolerance=tolerance)
+            started = time.perf_counter()
+            for g_after, speed in points:
+                cache.get(g_after=g_after, speed=speed)
+            elapsed = time.perf_counter() - started
+            stats = cache.stats()
+            print(f"{label:24s} {elapsed / lookups * 1e6:7.1f} us/lookup  hit rate {stats['hit_rate']:.1%}  "
+                  f"{stats['counts']}")
+            # A restarted Space: empty memory tier, warm memory-mapped disk tier
+            cache.clear()
+            started = time.perf_counter()
+            for g_after, speed in points[:2000]:
+                cache.get(g_after=g_after, speed=speed)
+            print(f"{'  after restart':24s} {(time.perf_counter() - started) / 2000 * 1e6:7.1f} us/lookup")
+    print(f"{'no cache':24s} {uncached / lookups * 1e6:7.1f} us/lookup")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Per-answer cost and verdicts of the numeric verifier on known student phrasings.
+
+The checks mirror topic 2 Q1(f) and topic 4 Q1(b), with their reference
+values written out. Every phrasing below is a correct answer, each one
+graded wrong by an earlier version of the statement parser: values chained
+with "so" or "which gives", statements with no separator before the next
+label, arithmetic left for the verifier to finish, and symbolic steps
+before the number, and a later symbolic mention overriding the value.
+A symbolic right-hand side alone (``N = 100θ``) must state nothing. The
+script exits non-zero if any verdict is not "correct", or if a symbolic
+case states a value. Needs ``sympy``. Run from the repository root:
+``python benchmarks/bench_verifier.py``.
+"""
+
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from verifier import Check, NumericVerifier, symbol  # noqa: E402
+
+THETA = ("θ", r"\\theta", "theta")
+TOPIC4_Q1 = NumericVerifier([
+    Check("(b)", "θ", 4, [symbol(*THETA)]),
+    Check("(b)", "N", 400, [symbol("N")]),
+    Check("(b)", "Y", 3200, [symbol("Y")]),
+    Check("(c)", "P₀", 5, [symbol("P", sub=0)]),
+    Check("(c)", "W₀", 20, [symbol("W", sub=0)]),
+])
+TOPIC2_Q1 = NumericVerifier([
+    Check("(f)", "y_N", 14, [symbol("y", sub="N")]),
+    Check("(f)", "d₁*", 3.5, [symbol("d", sub=1)]),
+    Check("(f)", "d₂*", 7, [symbol("d", sub=2)]),
+    Check("(f)", "net purchase of good 1", 1.5,
+          [r"d_?1\s*\*?\s*[-−]\s*s_?1", r"net\s+purchases?\s+(?:of\s+)?good\s*1"],
+          [r"net\s+sales?\s+(?:of\s+)?good\s*1"]),
+    Check("(f)", "net purchase of good 2", -3,
+          [r"d_?2\s*\*?\s*[-−]\s*s_?2", r"net\s+purchases?\s+(?:of\s+)?good\s*2"],
+          [r"net\s+sales?\s+(?:of\s+)?good\s*2"]),
+])
+
+CASES = [
+    (TOPIC4_Q1, "theta = 4 so N = 100*4 = 400 and Y = 160*20 = 3200"),
+    (TOPIC4_Q1, "theta = 4, N = 400, Y = 3200"),
+    (TOPIC4_Q1, "θ = 4 N = 400 Y = 3200"),
+    (TOPIC4_Q1, "θ* = 4, therefore N* = 100θ = 400, then Y = 160√N = 160 × 20 = 3,200"),
+    (TOPIC4_Q1, "Y = 160*20"),
+    (TOPIC4_Q1, "P0 = 32000/(2*3200) = 5, W0 = θP0 = 4 * 5 = 20"),
+    (TOPIC4_Q1, "W_0 = theta P_0 = 20 and P_0 = 5"),
+    (TOPIC2_Q1, "d_2 = 7 so d1 - s1 = 1.5"),
+    (TOPIC2_Q1, "d1* = 3.5, d2* = 7. Net purchase of good 1 = 1.5, net sale of good 2 = 3."),
+    (TOPIC2_Q1, "y_N = 2*2 + 1*10 = 14, hence d1 = 0.5*14/2 = 3.5 which gives d1 - s1 = 1.5"),
+    (TOPIC2_Q1, "d1 = 3.5 d2 = 7 d1 - s1 = 1.5 d2 - s2 = -3"),
+    (TOPIC4_Q1, "Employment is N = 400, found by substituting into N = 100θ."),
+    (TOPIC4_Q1, "Substituting θ = 4 into N = 100θ gives N = 400"),
+]
+# A symbolic right-hand side states no value, so these must come back "missing", not "incorrect"
+MISSING = [
+    (TOPIC4_Q1, "N = 100θ"),
+    (TOPIC4_Q1, "Y = 160√N"),
+]
+
+
+def main(number=2_000):
+    failures = 0
+    for verifier, answer in CASES:
+        seconds = timeit.timeit(lambda: verifier.verify(answer), number=number)
+        stated = [v for v in verifier.verify(answer) if v.status != "missing"]
+        wrong = [f"{v.label}={v.student:g}" for v in stated if v.status != "correct"]
+        failures += bool(wrong) or not stated
+        verdict = "WRONG " + ", ".join(wrong) if wrong else f"{len(stated)} correct" if stated else "NOTHING FOUND"
+        print(f"{seconds / number * 1e6:7.1f} us  {verdict:18s} {answer}")
+    for verifier, answer in MISSING:
+        stated = [f"{v.label}={v.student:g}" for v in verifier.verify(answer) if v.status != "missing"]
+        failures += bool(stated)
+        print(f"{'':10s} {'STATED ' + ', '.join(stated) if stated else 'nothing stated':18s} {answer}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,257 @@
+"""Token budget accounting and admission control for the Groq-backed tutors.
+
+Every Space shares one Groq quota, so each completion is charged against three
+rolling windows: the student's session, the topic, and a global cohort budget.
+Requests are admitted, downgraded to the cheaper model, or rejected *before*
+any upstream call. An admitted request reserves its estimated tokens at once,
+so concurrent sessions cannot all pass admission against the same headroom;
+the reservation is settled to the completion's ``usage`` fields afterwards.
+"""
+
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass
+
+PRIMARY_MODEL = "llama-3.3-70b-versatile"
+FALLBACK_MODEL = "llama-3.1-8b-instant"
+
+# Upper bound on the completion length; the prompts ask for 150-250 words.
+MAX_COMPLETION_TOKENS = 600
+
+
+def _env_int(name, default):
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def _setting(value, name, default):
+    return _env_int(name, default) if value is None else value
+
+
+def estimate_tokens(text):
+    """Cheap prompt-size estimate (roughly four characters per token)."""
+    return len(text) // 4 + 1
+
+
+@dataclass
+class Admission:
+    allowed: bool
+    model: str = PRIMARY_MODEL
+    reason: str = ""
+    message: str = ""
+    # (window, event) pairs charged with the estimate, settled by ``TokenBudget.record``
+    reservation: tuple = ()
+
+
+class RollingWindow:
+    """Sum of token charges over the last ``window`` seconds."""
+
+    def __init__(self, window):
+        self.window = window
+        self.events = deque()
+        self.total = 0
+
+    def _evict(self, now):
+        cutoff = now - self.window
+        while self.events and self.events[0][0] <= cutoff:
+            self.total -= self.events.popleft()[1]
+
+    def add(self, tokens, now):
+        """Charge ``tokens`` at ``now``; returns the event, for ``settle``."""
+        self._evict(now)
+        event = [now, tokens]
+        self.events.append(event)
+        self.total += tokens
+        return event
+
+    def settle(self, event, tokens, now):
+        """Change the charge of ``event`` to ``tokens``, unless it has already left the window."""
+        self._evict(now)
+        if event[0] > now - self.window:
+            self.total += tokens - event[1]
+            event[1] = tokens
+
+    def used(self, now):
+        self._evict(now)
+        return self.total
+
+
+class TokenBudget:
+    """Per-session, per-topic and global rolling token budgets.
+
+    Limits default to values that keep a class of ~200 students inside the
+    Groq free tier and can be overridden with ``TUTOR_*`` environment
+    variables. A scope that passes ``downgrade_at`` of its limit is served by
+    the fallback model; a scope that would exceed its limit is rejected.
+    """
+
+    def __init__(
+        self,
+        session_limit=None,
+        topic_limit=None,
+        global_limit=None,
+        session_window=None,
+        cohort_window=None,
+        downgrade_at=0.8,
+        clock=time.monotonic,
+    ):
+        self.limits = {
+            "session": _setting(session_limit, "TUTOR_SESSION_TOKEN_BUDGET", 20_000),
+            "topic": _setting(topic_limit, "TUTOR_TOPIC_TOKEN_BUDGET", 400_000),
+            "global": _setting(global_limit, "TUTOR_GLOBAL_TOKEN_BUDGET", 1_000_000),
+        }
+        self.windows = {
+            "session": _setting(session_window, "TUTOR_SESSION_WINDOW_SECONDS", 3600),
+            "topic": _setting(cohort_window, "TUTOR_COHORT_WINDOW_SECONDS", 86_400),
+            "global": _setting(cohort_window, "TUTOR_COHORT_WINDOW_SECONDS", 86_400),
+        }
+        self.downgrade_at = downgrade_at
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._usage = {scope: {} for scope in self.limits}
+        self.decisions = defaultdict(int)
+        self.tokens = defaultdict(int)
+
+    def _window(self, scope, key):
+        windows = self._usage[scope]
+        if key not in windows:
+            windows[key] = RollingWindow(self.windows[scope])
+        return windows[key]
+
+    def _scopes(self, session_id, topic):
+        return (("session", session_id or "anonymous"), ("topic", topic), ("global", "all"))
+
+    def admit(self, session_id, topic, estimated_tokens):
+        """Decide whether a completion of ``estimated_tokens`` may go upstream, and reserve them if so."""
+        now = self.clock()
+        model = PRIMARY_MODEL
+        with self._lock:
+            windows = [(scope, self._window(scope, key)) for scope, key in self._scopes(session_id, topic)]
+            for scope, window in windows:
+                used = window.used(now)
+                limit = self.limits[scope]
+                if used + estimated_tokens > limit:
+                    self.decisions["rejected", scope] += 1
+                    return Admission(False, reason=scope, message=_REJECT_MESSAGES[scope])
+                if used + estimated_tokens > self.downgrade_at * limit:
+                    model = FALLBACK_MODEL
+            self.decisions["downgraded" if model == FALLBACK_MODEL else "admitted", None] += 1
+            reservation = tuple((window, window.add(estimated_tokens, now)) for _, window in windows)
+        return Admission(True, model=model, reservation=reservation)
+
+    def record(self, session_id, topic, model, usage, admission=None):
+        """Charge the actual ``usage`` of a completion to every scope.
+
+        With the ``admission`` that reserved the tokens, the reservation is
+        settled to the actual spend instead, or released if ``usage`` is None
+        because the call failed.
+        """
+        reservation = admission.reservation if admission is not None else ()
+        if usage is None and not reservation:
+            return
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+        total = getattr(usage, "total_tokens", 0) or prompt_tokens + completion_tokens
+        now = self.clock()
+        with self._lock:
+            if reservation:
+                for window, event in reservation:
+                    window.settle(event, total, now)
+            else:
+                for scope, key in self._scopes(session_id, topic):
+                    self._window(scope, key).add(total, now)
+            self.tokens["prompt", model] += prompt_tokens
+            self.tokens["completion", model] += completion_tokens
+
+    def snapshot(self):
+        """Current window usage per scope plus cumulative counters."""
+        now = self.clock()
+        with self._lock:
+            usage = {
+                scope: {key: window.used(now) for key, window in windows.items()}
+                for scope, windows in self._usage.items()
+            }
+            # Forget sessions whose spend has rolled out of the window.
+            for key in [key for key, used in usage["session"].items() if not used]:
+                del self._usage["session"][key]
+            return {
+                "limits": dict(self.limits),
+                "usage": usage,
+                "decisions": dict(self.decisions),
+                "tokens": dict(self.tokens),
+            }
+
+    def render_metrics(self):
+        """Prometheus text exposition of the accounting."""
+        snap = self.snapshot()
+        lines = [
+            "# HELP tutor_token_budget_limit Token limit per rolling window.",
+            "# TYPE tutor_token_budget_limit gauge",
+        ]
+        for scope, limit in snap["limits"].items():
+            lines.append(f'tutor_token_budget_limit{{scope="{scope}"}} {limit}')
+        lines += [
+            "# HELP tutor_token_budget_used Tokens charged in the current rolling window.",
+            "# TYPE tutor_token_budget_used gauge",
+        ]
+        sessions = snap["usage"].pop("session")
+        for scope, keys in snap["usage"].items():
+            for key, used in keys.items():
+                lines.append(f'tutor_token_budget_used{{scope="{scope}",key="{key}"}} {used}')
+        # Session ids are unbounded, so only their distribution is exported.
+        lines += [
+            "# HELP tutor_token_budget_sessions Sessions with spend in the current window.",
+            "# TYPE tutor_token_budget_sessions gauge",
+            f"tutor_token_budget_sessions {sum(1 for used in sessions.values() if used)}",
+            "# HELP tutor_token_budget_session_max Largest per-session spend in the current window.",
+            "# TYPE tutor_token_budget_session_max gauge",
+            f"tutor_token_budget_session_max {max(sessions.values(), default=0)}",
+            "# HELP tutor_admissions_total Admission decisions.",
+            "# TYPE tutor_admissions_total counter",
+        ]
+        for (decision, scope), count in snap["decisions"].items():
+            labels = f'decision="{decision}"' + (f',scope="{scope}"' if scope else "")
+            lines.append(f"tutor_admissions_total{{{labels}}} {count}")
+        lines += [
+            "# HELP tutor_tokens_total Tokens reported by completion usage.",
+            "# TYPE tutor_tokens_total counter",
+        ]
+        for (kind, model), count in snap["tokens"].items():
+            lines.append(f'tutor_tokens_total{{kind="{kind}",model="{model}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+
+_REJECT_MESSAGES = {
+    "session": (
+        "You have requested a lot of feedback in the last hour. Take some time to revise "
+        "your answer using the hints you already have, then try again later."
+    ),
+    "topic": (
+        "AI feedback for this topic has reached its usage limit for today. "
+        "Please try again tomorrow or bring your answer to your tutorial."
+    ),
+    "global": (
+        "AI feedback has reached the course-wide usage limit for today. "
+        "Please try again tomorrow or bring your answer to your tutorial."
+    ),
+}
+
+TOKEN_BUDGET = TokenBudget()
+
+
+def with_metrics(shiny_app, budget=TOKEN_BUDGET, routes=()):
+    """Serve ``/metrics`` (and any extra ``routes``) alongside a Shiny app."""
+    from starlette.applications import Starlette
+    from starlette.responses import PlainTextResponse
+    from starlette.routing import Mount, Route
+
+    from sim_cache import render_metrics as cache_metrics
+
+    async def metrics(request):
+        return PlainTextResponse(budget.render_metrics() + cache_metrics(), media_type="text/plain; version=0.0.4")
+
+    return Starlette(routes=[Route("/metrics", metrics), *routes, Mount("/", app=shiny_app)])
@@ -0,0 +1,151 @@
+"""Instant concept-coverage checklist shown while the LLM feedback is generating.
+
+Each question's ``TOPIC_CONCEPTS`` list and indicative answer are compiled
+once into a concept x vocabulary matrix over stemmed, synonym-normalised
+tokens. Scoring an answer is a dictionary lookup per word and one
+matrix-vector product, so the checklist renders in well under a millisecond;
+``score_many`` does the same for a whole batch of answers.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from prescreen import STOPWORDS, stem, tokenize
+
+# Abbreviations students use for course terms, expanded before stemming.
+ABBREVIATIONS = {
+    "moe": "medium of exchange",
+    "uoa": "unit of account",
+    "sov": "store of value",
+    "qtm": "quantity theory of money",
+    "cb": "central bank",
+    "cbs": "central banks",
+    "boe": "bank of england",
+    "ecb": "european central bank",
+    "qe": "quantitative easing",
+    "qt": "quantitative tightening",
+    "zlb": "zero lower bound",
+    "elb": "zero lower bound",
+    "fg": "forward guidance",
+    "mp": "monetary policy",
+    "sdr": "special drawing right",
+    "ecu": "european currency unit",
+    "ge": "general equilibrium",
+    "foc": "first order conditions",
+    "focs": "first order conditions",
+}
+
+# Word-level synonyms, mapped onto the term used in the concept lists.
+SYNONYMS = {
+    "unexpected": "surprise",
+    "unanticipated": "surprise",
+    "unpredictable": "surprise",
+    "unpredicted": "surprise",
+    "unforeseen": "surprise",
+    "variance": "volatility",
+    "variability": "volatility",
+    "uncertainty": "volatility",
+    "pegged": "fixed",
+    "peg": "fixed",
+    "pandemic": "covid",
+    "coronavirus": "covid",
+    "euro": "eurozone",
+    "hoard": "hoarding",
+    "hoarded": "hoarding",
+    "lagrange": "lagrangian",
+    "numéraire": "numeraire",
+    "homogenous": "homogeneity",
+    "homogeneous": "homogeneity",
+    "walrasian": "walras",
+}
+
+COVERED_AT = 0.5
+
+
+def normalise(text):
+    """Stemmed content tokens of ``text`` with abbreviations and synonyms resolved."""
+    stems = []
+    for word in tokenize(text):
+        for part in ABBREVIATIONS.get(word, word).split():
+            part = SYNONYMS.get(part, part)
+            if part not in STOPWORDS and len(part) > 2:
+                stems.append(stem(part))
+    return stems
+
+
+@dataclass
+class CoverageReport:
+    concepts: list
+    key_terms: float
+
+    @property
+    def covered(self):
+        return sum(1 for _, fraction in self.concepts if fraction >= COVERED_AT)
+
+
+class CoverageScorer:
+    """Scores answers against one question's concept list and indicative answer."""
+
+    def __init__(self, concepts, indicative_answer=""):
+        self.labels = [label.strip() for label in concepts.split(",") if label.strip()]
+        concept_terms = [set(normalise(label)) for label in self.labels]
+        key_terms = set(normalise(indicative_answer))
+        vocabulary = sorted(set().union(key_terms, *concept_terms))
+        self.index = {term: i for i, term in enumerate(vocabulary)}
+
+        self.matrix = np.zeros((len(self.labels), len(vocabulary)), dtype=np.float32)
+        for row, terms in enumerate(concept_terms):
+            self.matrix[row, [self.index[t] for t in terms]] = 1.0
+        self.sizes = np.maximum(self.matrix.sum(axis=1), 1.0)
+
+        self.key = np.zeros(len(vocabulary), dtype=np.float32)
+        self.key[[self.index[t] for t in key_terms]] = 1.0
+        self.key_size = max(float(self.key.sum()), 1.0)
+
+    def vectorise(self, answers):
+        """Binary answers x vocabulary matrix."""
+        present = np.zeros((len(answers), len(self.index)), dtype=np.float32)
+        for row, answer in enumerate(answers):
+            columns = [self.index[t] for t in set(normalise(answer)) if t in self.index]
+            present[row, columns] = 1.0
+        return present
+
+    def score_many(self, answers):
+        """Per-concept coverage (answers x concepts) and key-term coverage per answer."""
+        present = self.vectorise(answers)
+        return (present @ self.matrix.T) / self.sizes, (present @ self.key) / self.key_size
+
+    def score(self, answer):
+        concepts, key_terms = self.score_many([answer])
+        return CoverageReport(
+            concepts=list(zip(self.labels, concepts[0].tolist())),
+            key_terms=float(key_terms[0]),
+        )
+
+
+def checklist_ui(report):
+    """Render a ``CoverageReport`` as a compact checklist card."""
+    from shiny import ui
+
+    items = [
+        ui.tags.li(
+            ("✅ " if fraction >= COVERED_AT else "⬜ ") + label,
+            style="list-style: none; margin: 2px 0;",
+        )
+        for label, fraction in report.concepts
+    ]
+    return ui.div(
+        ui.h4("Concept checklist", style="margin-top: 0; color: #3949ab;"),
+        ui.p(
+            f"You have touched on {report.covered} of {len(report.concepts)} key concepts "
+            f"and about {report.key_terms:.0%} of the key terms in a model answer. "
+            "Detailed feedback will appear below.",
+            style="color: #555; margin-bottom: 8px;",
+        ),
+        ui.tags.ul(*items, style="padding-left: 0; margin: 0;"),
+        style=(
+            "margin-top: 20px; padding: 16px 20px; background: #f0f4ff; "
+            "border-left: 4px solid #667eea; border-radius: 6px;"
+        ),
+    )
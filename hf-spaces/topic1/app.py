@@ -1,12 +1,34 @@
 from shiny import App, ui, render, reactive
 from groq import Groq
+import asyncio
 import os
 import pathlib
+import sys
 from dotenv import load_dotenv
 
+# Shared tutor modules live at the repository root; the sync workflow copies them next to app.py,
+# where the Space's /app/app.py has no repository root above it
+_APP = pathlib.Path(__file__).resolve()
+if len(_APP.parents) > 2:
+    sys.path.append(str(_APP.parents[2]))
+
+from answer_log import AnswerLog
+from attempts import AttemptStore, attempt_routes
+from budget import MAX_COMPLETION_TOKENS, TOKEN_BUDGET, estimate_tokens, with_metrics
+from concept_coverage import CoverageScorer, checklist_ui
+from irt import QUIZ_NAMES, AdaptiveSelector, adaptive_routes
+from leaderboard import Leaderboard, leaderboard_routes
+from misconceptions import MisconceptionLibrary
+from prescreen import prescreen
+from retrieval import format_passages, load_reading_index, reading_links
+
+import kiyotaki_wright
+
 # Load environment variables from .env file
 load_dotenv()
 
+TOPIC = "topic1"
+
 # Try to load topic1questions.qmd for context
 def load_questions_from_qmd():
     """Load question text from topic1questions.qmd for better context."""
@@ -21,6 +43,17 @@ def load_questions_from_qmd():
             print(f"Warning: Could not load topic1questions.qmd: {e}")
     return None
 
+# Section-level BM25 index over the topic reading (memory-mapped after the first build)
+READINGS = load_reading_index("topic1reading.qmd")
+
+# Answers are logged for offline misconception clustering; reviewed clusters are served below
+ANSWER_LOG = AnswerLog()
+ATTEMPTS = AttemptStore()
+LEADERBOARD = Leaderboard(ATTEMPTS)
+# Adaptive MCQ mode, once `python irt.py topic1` has calibrated the items
+ADAPTIVE = AdaptiveSelector.for_topic(TOPIC)
+MISCONCEPTIONS = MisconceptionLibrary.for_topic(TOPIC)
+
 # Store indicative answers for each question
 INDICATIVE_ANSWERS = {
     1: """The Store of Value (SoV) role of money automatically follows from its Medium of Exchange (MoE) role. This is because using money as MoE leads inevitably to a time gap between acquiring money through sale and spending it to buy something else. During this time, money stores the value of what was sold.
@@ -59,6 +92,18 @@ Conclusion: The use of a MoE simplifies all these complications and reduces tran
 }
 
 
+TOPIC_CONCEPTS = {
+    1: "medium of exchange, store of value, unit of account, independent functions, Special Drawing Right, European Currency Unit",
+    2: "liquidity, marketability, predictability of exchange value, reversibility, divisibility, transportability, durability, universal appeal",
+    3: "three agents example, middleman, clearinghouse, multilateral trades, search frictions, information costs, coordination costs, transaction costs",
+}
+
+COVERAGE = {
+    num: CoverageScorer(TOPIC_CONCEPTS.get(num, ""), answer)
+    for num, answer in INDICATIVE_ANSWERS.items()
+}
+
+
 def get_question_text(num):
     questions = {
         1: "A. Does the Unit of Account (UoA) role of money follow from the Medium of Exchange (MoE) role or is it independent? B. If independent, provide an example of a UoA that is not a widely used MoE.",
@@ -68,12 +113,19 @@ def get_question_text(num):
     return questions.get(num, "")
 
 
-def create_feedback_prompt(question_num, student_answer, indicative_answer):
+def create_feedback_prompt(question_num, student_answer, indicative_answer, passages=()):
     qmd_context = load_questions_from_qmd()
     context_note = ""
     if qmd_context:
         context_note = "\n\nNote: This question is from topic1questions.qmd, which is synced to HF Space for reference."
     
+    reading_context = ""
+    if passages:
+        reading_context = f"""
+RELEVANT SECTIONS OF THE TOPIC READING (use these to point the student to specific sections):
+{format_passages(passages)}
+"""
+
     return f"""You are an expert economics tutor providing feedback on a Monetary Economics question from Topic 1. Your goal is to help students improve their analysis and evaluation skills by providing hints and guidance, NOT complete answers.
 
 QUESTION {question_num}:
@@ -84,7 +136,7 @@ STUDENT'S ANSWER:
 
 INDICATIVE ANSWER (for your reference only - DO NOT share directly):
 {indicative_answer}
-
+{reading_context}
 INSTRUCTIONS:
 1. Identify what the student got right and acknowledge it
 2. If the answer is incomplete or has gaps, provide HINTS to guide them toward:
@@ -99,28 +151,56 @@ INSTRUCTIONS:
 Provide your feedback now:{context_note}"""
 
 
-def get_ai_feedback(question_num, student_answer):
+def get_ai_feedback(question_num, student_answer, session_id=None):
     if not student_answer.strip():
         return "Please provide an answer to receive feedback."
 
+    # Trivial answers get instant canned guidance instead of an LLM call
+    screened = prescreen(student_answer, get_question_text(question_num), TOPIC_CONCEPTS.get(question_num, ""))
+    if screened:
+        return screened[1]
+
+    ANSWER_LOG.record(TOPIC, question_num, session_id, student_answer)
+
+    # Recurring misconceptions get their tutor-reviewed template without an LLM call
+    known = MISCONCEPTIONS.match(question_num, student_answer)
+    if known:
+        return known.template
+
     try:
         api_key = os.environ.get("GROQ_API_KEY")
         if not api_key:
             return "Error: GROQ_API_KEY environment variable not set. Please set your Groq API key."
 
-        client = Groq(api_key=api_key)
         indicative_answer = INDICATIVE_ANSWERS.get(question_num, "")
-        prompt = create_feedback_prompt(question_num, student_answer, indicative_answer)
+        passages = READINGS.search(f"{get_question_text(question_num)}\n{student_answer}") if READINGS else []
+        prompt = create_feedback_prompt(question_num, student_answer, indicative_answer, passages)
+
+        # Charge the shared Groq quota before going upstream
+        admission = TOKEN_BUDGET.admit(
+            session_id, TOPIC, estimate_tokens(prompt) + MAX_COMPLETION_TOKENS
+        )
+        if not admission.allowed:
+            return admission.message
+
+        client = Groq(api_key=api_key)
 
         # Use a supported Groq production model
         # Current production models: llama-3.3-70b-versatile, llama-3.1-8b-instant
         # See https://console.groq.com/docs/models for latest available models
-        message = client.chat.completions.create(
-            messages=[{"role": "user", "content": prompt}],
-            model="llama-3.3-70b-versatile",
-        )
+        usage = None
+        try:
+            message = client.chat.completions.create(
+                messages=[{"role": "user", "content": prompt}],
+                model=admission.model,
+                max_tokens=MAX_COMPLETION_TOKENS,
+            )
+            usage = message.usage
+        finally:
+            # Settle the reservation to the actual spend, or release it if the call failed
+            TOKEN_BUDGET.record(session_id, TOPIC, admission.model, usage, admission)
 
-        return message.choices[0].message.content
+        return message.choices[0].message.content + reading_links(passages)
     except Exception as e:
         return f"Error getting feedback: {str(e)}. Make sure your GROQ_API_KEY environment variable is set correctly."
 
@@ -368,6 +448,7 @@ app_ui = ui.page_fluid(
         };
         """),
         ui.tags.script(src="https://cdn.jsdelivr.net/npm/mathjax@3/es5/tex-mml-chtml.js"),
+        ui.tags.script(src="https://cdn.plot.ly/plotly-2.35.2.min.js"),
         ui.tags.script("""
         function renderMath() {
           if (window.MathJax) {
@@ -418,6 +499,7 @@ app_ui = ui.page_fluid(
                         ui.input_action_button("submit1", "Get AI Feedback", class_="btn-primary"),
                         class_="answer-section"
                     ),
+                    ui.output_ui("coverage1"),
                     ui.output_ui("feedback1"),
                     class_="question-card"
                 )
@@ -437,6 +519,7 @@ app_ui = ui.page_fluid(
                         ui.input_action_button("submit2", "Get AI Feedback", class_="btn-primary"),
                         class_="answer-section"
                     ),
+                    ui.output_ui("coverage2"),
                     ui.output_ui("feedback2"),
                     class_="question-card"
                 )
@@ -463,10 +546,52 @@ app_ui = ui.page_fluid(
                         ui.input_action_button("submit3", "Get AI Feedback", class_="btn-primary"),
                         class_="answer-section"
                     ),
+                    ui.output_ui("coverage3"),
                     ui.output_ui("feedback3"),
                     class_="question-card"
                 )
             ),
+            ui.nav_panel(
+                "Search Money Simulator",
+                ui.div(
+                    ui.markdown(
+                        "Question 3's three traders, scaled up to a large economy in the style of Kiyotaki and "
+                        "Wright. Every Harriet, Ina and Jamal holds one good, pays its storage cost each period "
+                        "and meets a random partner. No pair has a double coincidence of wants, so barter "
+                        "produces no trade. Commodity money appears when traders accept goods they don't eat. "
+                        "Under learning, traders copy better-paid traders of their own kind, and the run shows "
+                        "which goods emerge as money."
+                    ),
+                    ui.layout_columns(
+                        ui.input_select(
+                            "kw_agents", "Traders",
+                            {str(n): f"{n:,}" for n in kiyotaki_wright.AGENT_COUNTS}, selected="100000",
+                        ),
+                        ui.input_select("kw_regime", "Regime", kiyotaki_wright.REGIMES, selected="learning"),
+                        *[
+                            ui.input_slider(f"kw_{name}", label, min=start, max=stop, step=step, value=default)
+                            for name, (label, start, stop, step, default) in kiyotaki_wright.AXES.items()
+                        ],
+                        col_widths=(4, 4, 4, 4, 4, 4, 4),
+                    ),
+                    ui.input_action_button("kw_run", "Run Simulation", class_="btn-primary"),
+                    ui.div(id="kw_status", style="margin: 10px 0; color: #555;"),
+                    ui.div(id="kw_plot", style="height: 420px;"),
+                    ui.tags.script("""
+                    document.addEventListener('DOMContentLoaded', function() {
+                      Shiny.addCustomMessageHandler('kw-progress', function(msg) {
+                        document.getElementById('kw_status').textContent = msg.status;
+                        Plotly.react('kw_plot', msg.figure.data, msg.figure.layout, {responsive: true, displayModeBar: false});
+                      });
+                      document.addEventListener('shown.bs.tab', function() {
+                        if (document.getElementById('kw_plot').data) { Plotly.Plots.resize('kw_plot'); }
+                      });
+                    });
+                    """),
+                    ui.output_ui("kw_summary"),
+                    class_="question-card"
+                )
+            ),
         ),
         class_="container-custom"
     )
@@ -474,41 +599,96 @@ app_ui = ui.page_fluid(
 
 
 def server(input, output, session):
-    @render.ui
-    @reactive.event(input.submit1)
-    def feedback1():
-        feedback = get_ai_feedback(1, input.answer1())
-        return ui.div(
-            ui.div(
-                ui.h3("AI Tutor Feedback", style="margin-top: 0; color: #2e7d32;"),
-                ui.markdown(feedback),
-                class_="feedback-box"
+    def question_outputs(num):
+        submit = input[f"submit{num}"]
+        answer = input[f"answer{num}"]
+
+        @reactive.extended_task
+        async def feedback_task(student_answer):
+            # Run the Groq call off the event loop so the checklist is sent straight away
+            return await asyncio.to_thread(get_ai_feedback, num, student_answer, session.id)
+
+        @reactive.effect
+        @reactive.event(submit)
+        def _submit():
+            feedback_task.invoke(answer())
+
+        @output(id=f"coverage{num}")
+        @render.ui
+        @reactive.event(submit)
+        def _coverage():
+            if not answer().strip():
+                return None
+            return checklist_ui(COVERAGE[num].score(answer()))
+
+        @output(id=f"feedback{num}")
+        @render.ui
+        def _feedback():
+            return ui.div(
+                ui.div(
+                    ui.h3("AI Tutor Feedback", style="margin-top: 0; color: #2e7d32;"),
+                    ui.markdown(feedback_task.result()),
+                    class_="feedback-box"
+                )
             )
-        )
 
-    @render.ui
-    @reactive.event(input.submit2)
-    def feedback2():
-        feedback = get_ai_feedback(2, input.answer2())
-        return ui.div(
-            ui.div(
-                ui.h3("AI Tutor Feedback", style="margin-top: 0; color: #2e7d32;"),
-                ui.markdown(feedback),
-                class_="feedback-box"
-            )
+    for num in INDICATIVE_ANSWERS:
+        question_outputs(num)
+
+    @reactive.extended_task
+    async def kw_task(agents, periods, costs, utility, regime):
+        runner = kiyotaki_wright.run(agents, periods, costs, utility, regime)
+        history = []
+        # Each segment runs off the event loop and is drawn before the next one starts
+        while (summary := await asyncio.to_thread(next, runner, None)) is not None:
+            history.append(summary)
+            await session.send_custom_message("kw-progress", {
+                "figure": kiyotaki_wright.figure(history),
+                "status": f"Period {summary['period']} of {periods}: "
+                          f"{summary['meals']:.1%} of traders ate per period in the last segment.",
+            })
+        return history
+
+    @reactive.effect
+    @reactive.event(input.kw_run)
+    def _run_kw():
+        kw_task.invoke(
+            int(input.kw_agents()),
+            int(input.kw_periods()),
+            [input[f"kw_cost_{g}"]() for g in range(3)],
+            input.kw_utility(),
+            input.kw_regime(),
         )
 
     @render.ui
-    @reactive.event(input.submit3)
-    def feedback3():
-        feedback = get_ai_feedback(3, input.answer3())
+    def kw_summary():
+        final = kw_task.result()[-1]
+        rows = "".join(
+            f"<tr><td>{trader}</td><td>{final['speculating'][k]:.0%}</td>"
+            + "".join(f"<td>{share:.0%}</td>" for share in final["holdings"][k])
+            + "</tr>"
+            for k, trader in enumerate(kiyotaki_wright.TRADERS)
+        )
+        goods = "".join(f"<th>Holds {good}</th>" for good in kiyotaki_wright.GOODS)
+        money = [good for good, rate in zip(kiyotaki_wright.GOODS, final["medium"]) if rate > 0.01]
         return ui.div(
-            ui.div(
-                ui.h3("AI Tutor Feedback", style="margin-top: 0; color: #2e7d32;"),
-                ui.markdown(feedback),
-                class_="feedback-box"
-            )
+            ui.HTML(
+                "<table class='table table-sm' style='max-width: 640px;'>"
+                f"<thead><tr><th>Trader</th><th>Speculating</th>{goods}</tr></thead>"
+                f"<tbody>{rows}</tbody></table>"
+            ),
+            ui.markdown(
+                f"Goods used as a medium of exchange: **{', '.join(money)}**." if money
+                else "No good is used as a medium of exchange, so no one trades."
+            ),
         )
 
 
-app = App(app_ui, server)
+app = with_metrics(
+    App(app_ui, server),
+    routes=[
+        *attempt_routes(ATTEMPTS),
+        *leaderboard_routes(LEADERBOARD),
+        *adaptive_routes({QUIZ_NAMES[TOPIC]: ADAPTIVE} if ADAPTIVE else {}),
+    ],
+)
@@ -0,0 +1,262 @@
+"""Kiyotaki-Wright search model of commodity money, scaled up from the three-trader example.
+
+There are three kinds of trader, as in Question 3. Harriet eats Bananas and
+produces Apples, Ina eats Cabbage and produces Bananas, and Jamal eats Apples
+and produces Cabbage. Every trader stores one unit of one good and pays that
+good's storage cost each period. Each period traders are matched in random
+pairs and swap goods if both want to. A trader who gets their consumption
+good eats it (utility ``u``) and produces again.
+
+No pair ever has a double coincidence of wants, so under pure barter nobody
+trades. A trader will accept another good that they don't eat as a medium of
+exchange if their strategy says so. A *fundamental* trader accepts it only if
+it is cheaper to store than the good they hold. A *speculative* trader
+accepts it only if it is not cheaper to store, betting that it is more
+marketable.
+Under learning, traders copy the strategy of a random trader of their own kind
+who earned more since the last revision. Which goods end up as money emerges
+from the storage costs.
+
+Agent state is struct-of-arrays: one NumPy buffer per field and no
+per-agent objects, so a period for a million traders is a handful of
+vectorised operations. ``run`` splits the population into independent
+markets. With enough traders it steps them in a process pool over
+shared-memory buffers, and it yields summary statistics after every segment
+so the UI can draw the run as it goes.
+"""
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+TRADERS = ["Harriet", "Ina", "Jamal"]
+GOODS = ["Bananas", "Cabbage", "Apples"]
+CONSUMES = np.array([0, 1, 2], dtype=np.int8)
+PRODUCES = np.array([2, 0, 1], dtype=np.int8)
+
+FIELDS = {"kind": np.int8, "holding": np.int8, "speculate": np.bool_, "payoff": np.float32}
+REGIMES = {
+    "barter": "Barter only",
+    "fundamental": "Commodity money, fundamental strategies",
+    "speculative": "Commodity money, speculative strategies",
+    "learning": "Learning (strategies evolve)",
+}
+AGENT_COUNTS = [1_000, 10_000, 100_000, 1_000_000]
+
+# Slider axes: (label, start, stop, step, default)
+AXES = {
+    "cost_0": ("Storage cost of Bananas", 0.0, 1.0, 0.05, 0.1),
+    "cost_1": ("Storage cost of Cabbage", 0.0, 1.0, 0.05, 0.2),
+    "cost_2": ("Storage cost of Apples", 0.0, 1.0, 0.05, 0.3),
+    "utility": ("Utility of consumption u", 0.5, 5.0, 0.25, 1.0),
+    "periods": ("Periods", 20, 400, 20, 200),
+}
+
+SEGMENTS = 20
+LEARN_EVERY = 5
+MUTATION = 0.01
+CHUNK_MIN = 100_000
+
+_POOL = None
+_POOL_LOCK = threading.Lock()
+
+
+def allocate(agents, regime, rng, buffers=None):
+    """Fill (or create) the SoA buffers: traders start holding their production good."""
+    state = buffers or {name: np.empty(agents, dtype) for name, dtype in FIELDS.items()}
+    state["kind"][:] = np.arange(agents) % 3
+    state["holding"][:] = PRODUCES[state["kind"]]
+    if regime == "learning":
+        state["speculate"][:] = rng.random(agents) < 0.5
+    else:
+        state["speculate"][:] = regime == "speculative"
+    state["payoff"][:] = 0.0
+    return state
+
+
+def _wants(kind, speculate, own, offered, costs, barter):
+    eats = offered == CONSUMES[kind]
+    if barter:
+        return eats
+    cheaper = costs[offered] < costs[own]
+    return eats | ((offered != own) & (cheaper != speculate))
+
+
+def step(state, rng, costs, utility, barter=False):
+    """One period of matching, trade, consumption and storage; returns (acceptances by good, meals)."""
+    kind, holding, speculate, payoff = (state[name] for name in FIELDS)
+    order = rng.permutation(len(kind))
+    half = len(order) // 2
+    a, b = order[:half], order[half:2 * half]
+    ha, hb = holding[a], holding[b]
+    trade = _wants(kind[a], speculate[a], ha, hb, costs, barter) & _wants(kind[b], speculate[b], hb, ha, costs, barter)
+    a, b, ha, hb = a[trade], b[trade], ha[trade], hb[trade]
+    holding[a], holding[b] = hb, ha
+
+    # A good accepted by someone who doesn't eat it is being used as a medium of exchange
+    received = np.concatenate([hb, ha])
+    receivers = np.concatenate([kind[a], kind[b]])
+    medium = np.bincount(received[received != CONSUMES[receivers]], minlength=3)
+
+    eats = holding == CONSUMES[kind]
+    holding[eats] = PRODUCES[kind[eats]]
+    payoff += np.where(eats, utility, 0.0).astype(np.float32) - costs[holding].astype(np.float32)
+    return medium, int(eats.sum())
+
+
+def learn(state, rng):
+    """Imitate a random trader of the same kind who earned more, then mutate a few strategies."""
+    kind, speculate, payoff = state["kind"], state["speculate"], state["payoff"]
+    model = rng.integers(0, len(kind), len(kind))
+    copy = (kind[model] == kind) & (payoff[model] > payoff)
+    speculate[:] = np.where(copy, speculate[model], speculate)
+    speculate ^= rng.random(len(kind)) < MUTATION
+    payoff[:] = 0.0
+
+
+def advance(state, start, periods, costs, utility, regime, seed):
+    """Step one market from period ``start`` for ``periods`` periods; returns counts that add up across markets."""
+    rng = np.random.default_rng(seed)
+    costs = np.asarray(costs, dtype=np.float64)
+    medium = np.zeros(3, dtype=np.int64)
+    meals = 0
+    for t in range(periods):
+        used, eaten = step(state, rng, costs, utility, barter=regime == "barter")
+        medium += used
+        meals += eaten
+        if regime == "learning" and (start + t + 1) % LEARN_EVERY == 0:
+            learn(state, rng)
+    kind, holding = state["kind"], state["holding"]
+    return {
+        "medium": medium,
+        "meals": meals,
+        "speculating": np.bincount(kind[state["speculate"]], minlength=3),
+        "holdings": np.bincount(kind.astype(np.int64) * 3 + holding, minlength=9).reshape(3, 3),
+    }
+
+
+def _attach(names, agents):
+    blocks = {name: shared_memory.SharedMemory(name=block) for name, block in names.items()}
+    views = {name: np.ndarray(agents, FIELDS[name], buffer=blocks[name].buf) for name in FIELDS}
+    return blocks, views
+
+
+def _advance_shared(names, agents, lo, hi, start, periods, costs, utility, regime, seed):
+    blocks, views = _attach(names, agents)
+    try:
+        return advance({k: v[lo:hi] for k, v in views.items()}, start, periods, costs, utility, regime, seed)
+    finally:
+        del views
+        for block in blocks.values():
+            block.close()
+
+
+def _pool():
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            # spawn: forking a threaded web server is unsafe
+            _POOL = ProcessPoolExecutor(
+                max_workers=os.cpu_count() or 1, mp_context=multiprocessing.get_context("spawn")
+            )
+        return _POOL
+
+
+def _summary(results, agents, done, periods_per_segment):
+    medium = sum(r["medium"] for r in results)
+    holdings = sum(r["holdings"] for r in results)
+    per_kind = np.bincount(np.arange(agents) % 3, minlength=3)
+    meetings = max(agents // 2 * periods_per_segment, 1)
+    return {
+        "period": done,
+        "speculating": (sum(r["speculating"] for r in results) / per_kind).round(4).tolist(),
+        "medium": (medium / meetings).round(5).tolist(),
+        "meals": round(sum(r["meals"] for r in results) / (agents * periods_per_segment), 5),
+        "holdings": (holdings / per_kind[:, None]).round(4).tolist(),
+    }
+
+
+def run(agents, periods, costs, utility, regime, seed=0, segments=SEGMENTS, chunks=None):
+    """Generator of summary dicts, one per segment of the run.
+
+    The population is split into ``chunks`` markets of equal size that match
+    internally. Large runs step the markets in the process pool on shared
+    memory; small ones step in the calling thread.
+    """
+    chunks = chunks or max(1, min(os.cpu_count() or 1, agents // CHUNK_MIN))
+    bounds = np.linspace(0, agents, chunks + 1).astype(int)
+    lengths = np.diff(np.linspace(0, periods, segments + 1).astype(int))
+    seeds = np.random.SeedSequence(seed).spawn(chunks * (segments + 1))
+    shared = chunks > 1
+    blocks = {}
+    try:
+        if shared:
+            blocks = {
+                name: shared_memory.SharedMemory(create=True, size=max(agents * np.dtype(dtype).itemsize, 1))
+                for name, dtype in FIELDS.items()
+            }
+            state = {name: np.ndarray(agents, FIELDS[name], buffer=blocks[name].buf) for name in FIELDS}
+        else:
+            state = None
+        rng = np.random.default_rng(seeds[-1])
+        state = allocate(agents, regime, rng, state)
+        done = 0
+        for s, length in enumerate(lengths):
+            if length == 0:
+                continue
+            if shared:
+                names = {name: block.name for name, block in blocks.items()}
+                futures = [
+                    _pool().submit(_advance_shared, names, agents, bounds[c], bounds[c + 1], done, int(length), costs,
+                                   utility, regime, seeds[s * chunks + c])
+                    for c in range(chunks)
+                ]
+                results = [future.result() for future in futures]
+            else:
+                results = [advance(state, done, int(length), costs, utility, regime, seeds[s])]
+            done += int(length)
+            yield _summary(results, agents, done, int(length))
+    finally:
+        if shared:
+            del state
+        for block in blocks.values():
+            block.close()
+            block.unlink()
+
+
+def figure(history):
+    """Plotly figure dict: share speculating by trader, and each good's use as a medium of exchange."""
+    periods = [h["period"] for h in history]
+    trader_colours = ["#1f77b4", "#9467bd", "#8c564b"]
+    good_colours = ["#e0a800", "#2ca02c", "#d62728"]
+    data = [
+        {"x": periods, "y": [h["speculating"][k] for h in history], "mode": "lines+markers", "name": trader,
+         "line": {"color": trader_colours[k]}}
+        for k, trader in enumerate(TRADERS)
+    ] + [
+        {"x": periods, "y": [h["medium"][g] for h in history], "mode": "lines+markers", "name": f"{good} as money",
+         "line": {"color": good_colours[g], "dash": "dot"}, "xaxis": "x2", "yaxis": "y2"}
+        for g, good in enumerate(GOODS)
+    ]
+    return {
+        "data": data,
+        "layout": {
+            "height": 420,
+            "margin": {"t": 40, "b": 40, "l": 50, "r": 20},
+            "legend": {"orientation": "h", "y": -0.2},
+            "xaxis": {"domain": [0, 0.45], "title": {"text": "Period"}},
+            "yaxis": {"title": {"text": "Share speculating"}, "range": [-0.02, 1.02]},
+            "xaxis2": {"domain": [0.55, 1], "title": {"text": "Period"}, "anchor": "y2"},
+            "yaxis2": {"title": {"text": "Indirect trades per meeting"}, "anchor": "x2", "rangemode": "tozero"},
+            "annotations": [
+                {"text": "Speculative strategies by trader", "x": 0.225, "y": 1.08, "xref": "paper", "yref": "paper",
+                 "showarrow": False},
+                {"text": "Goods accepted as a medium of exchange", "x": 0.775, "y": 1.08, "xref": "paper",
+                 "yref": "paper", "showarrow": False},
+            ],
+        },
+    }
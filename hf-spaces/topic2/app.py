@@ -1,12 +1,33 @@
 from shiny import App, ui, render, reactive
 from groq import Groq
+import sympy as sp
+import asyncio
 import os
 import pathlib
+import sys
 from dotenv import load_dotenv
 
+# Shared tutor modules live at the repository root; the sync workflow copies them next to app.py,
+# where the Space's /app/app.py has no repository root above it
+_APP = pathlib.Path(__file__).resolve()
+if len(_APP.parents) > 2:
+    sys.path.append(str(_APP.parents[2]))
+
+from answer_log import AnswerLog
+from budget import MAX_COMPLETION_TOKENS, TOKEN_BUDGET, estimate_tokens, with_metrics
+from concept_coverage import CoverageScorer, checklist_ui
+from misconceptions import MisconceptionLibrary
+from prescreen import prescreen
+from retrieval import format_passages, load_reading_index, reading_links
+from verifier import Check, NumericVerifier, reference_values, symbol, verdicts_prompt, verdicts_ui
+
+import walras
+
 # Load environment variables from .env file
 load_dotenv()
 
+TOPIC = "topic2"
+
 # Try to load topic2questions.qmd for context
 def load_questions_from_qmd():
     """Load question text from topic2questions.qmd for better context."""
@@ -19,6 +40,13 @@ def load_questions_from_qmd():
             print(f"Warning: Could not load topic2questions.qmd: {e}")
     return None
 
+# Section-level BM25 index over the topic reading (memory-mapped after the first build)
+READINGS = load_reading_index("topic2reading.qmd")
+
+# Answers are logged for offline misconception clustering; reviewed clusters are served below
+ANSWER_LOG = AnswerLog()
+MISCONCEPTIONS = MisconceptionLibrary.for_topic(TOPIC)
+
 # Store indicative answers for each question (from your handwritten notes)
 INDICATIVE_ANSWERS = {
     1: """**(a)** Nominal income: y_N = P_1 s_1 + P_2 s_2
@@ -87,6 +115,52 @@ Therefore: D_2 = S_2
 }
 
 
+TOPIC_CONCEPTS = {
+    1: "nominal income, budget constraint, Lagrangian, first-order conditions, Cobb-Douglas demands, homogeneity of demand, relative prices, net purchases",
+    2: "nominal budget constraint, real budget constraint, numeraire, market clearing, binding budget constraints, Walras' Law, general equilibrium",
+}
+
+COVERAGE = {
+    num: CoverageScorer(TOPIC_CONCEPTS.get(num, ""), answer)
+    for num, answer in INDICATIVE_ANSWERS.items()
+}
+
+
+def numeric_verifiers():
+    """Reference values for Q1(f), solved with SymPy and compiled once at startup."""
+    alpha, s1, s2, P1, P2, d1, d2 = sp.symbols("alpha s_1 s_2 P_1 P_2 d_1 d_2", positive=True)
+    y_N = P1 * s1 + P2 * s2
+    # Cobb-Douglas optimum: MRS equals the price ratio on the budget line
+    demands = sp.solve(
+        [sp.Eq(alpha * d2 / ((1 - alpha) * d1), P1 / P2), sp.Eq(P1 * d1 + P2 * d2, y_N)], [d1, d2], dict=True
+    )[0]
+    ref = reference_values(
+        {"y_N": y_N, "d1": demands[d1], "d2": demands[d2], "net1": demands[d1] - s1, "net2": demands[d2] - s2},
+        {alpha: 0.5, s1: 2, s2: 10, P1: 2, P2: 1},
+    )
+    return {
+        1: NumericVerifier([
+            Check("(f)", "y_N", ref["y_N"], [symbol("y", sub="N")]),
+            Check("(f)", "d₁*", ref["d1"], [symbol("d", sub=1)]),
+            Check("(f)", "d₂*", ref["d2"], [symbol("d", sub=2)]),
+            Check(
+                "(f)", "net purchase of good 1", ref["net1"],
+                [r"d_?1\s*\*?\s*[-−]\s*s_?1", r"net\s+purchases?\s+(?:of\s+)?good\s*1"],
+                [r"net\s+sales?\s+(?:of\s+)?good\s*1"],
+            ),
+            Check(
+                "(f)", "net purchase of good 2", ref["net2"],
+                [r"d_?2\s*\*?\s*[-−]\s*s_?2", r"net\s+purchases?\s+(?:of\s+)?good\s*2"],
+                [r"net\s+sales?\s+(?:of\s+)?good\s*2"],
+            ),
+        ]),
+    }
+
+
+# Quantitative parts are checked locally; verdicts go to the student and into the prompt
+VERIFIERS = numeric_verifiers()
+
+
 def get_question_text(num):
     questions = {
     1: """**Question 1: Utility Maximization**
@@ -112,12 +186,26 @@ Endowments: $s^A = (s_1^A, s_2^A)$, $s^B = (s_1^B, s_2^B)$.
     return questions.get(num, "")
 
 
-def create_feedback_prompt(question_num, student_answer, indicative_answer):
+def create_feedback_prompt(question_num, student_answer, indicative_answer, passages=(), verdicts=()):
     qmd_context = load_questions_from_qmd()
     context_note = ""
     if qmd_context:
         context_note = "\n\nNote: This question is from Topic 2 - Classical Theory of Money."
     
+    reading_context = ""
+    if passages:
+        reading_context = f"""
+RELEVANT SECTIONS OF THE TOPIC READING (use these to point the student to specific sections):
+{format_passages(passages)}
+"""
+
+    numeric_check = ""
+    if verdicts:
+        numeric_check = f"""
+AUTOMATED NUMERICAL CHECK (computed exactly - trust these verdicts, do not redo the arithmetic):
+{verdicts_prompt(verdicts)}
+"""
+
     return f"""You are an expert economics tutor providing feedback on a Monetary Economics question from Topic 2 (Classical Theory of Money). Your goal is to help students improve their understanding of utility maximization, budget constraints, and general equilibrium by providing hints and guidance, NOT complete answers.
 
 QUESTION {question_num}:
@@ -128,7 +216,7 @@ STUDENT'S ANSWER:
 
 INDICATIVE ANSWER (for your reference only - DO NOT share directly):
 {indicative_answer}
-
+{reading_context}{numeric_check}
 TOPIC 2 KEY CONCEPTS:
 - Cobb-Douglas utility functions and optimization
 - Budget constraints (nominal vs. real)
@@ -151,25 +239,57 @@ INSTRUCTIONS:
 Provide your feedback now:{context_note}"""
 
 
-def get_ai_feedback(question_num, student_answer):
+def get_ai_feedback(question_num, student_answer, session_id=None):
     if not student_answer.strip():
         return "Please provide an answer to receive feedback."
 
+    verdicts = VERIFIERS[question_num].verify(student_answer) if question_num in VERIFIERS else []
+
+    # Trivial answers get instant canned guidance instead of an LLM call. A stated value
+    # the verifier can check is a real attempt however terse, so it skips the screens.
+    if all(v.status == "missing" for v in verdicts):
+        screened = prescreen(student_answer, get_question_text(question_num), TOPIC_CONCEPTS.get(question_num, ""))
+        if screened:
+            return screened[1]
+
+    ANSWER_LOG.record(TOPIC, question_num, session_id, student_answer)
+
+    # Recurring misconceptions get their tutor-reviewed template without an LLM call
+    known = MISCONCEPTIONS.match(question_num, student_answer)
+    if known:
+        return known.template
+
     try:
         api_key = os.environ.get("GROQ_API_KEY")
         if not api_key:
             return "Error: GROQ_API_KEY environment variable not set. Please set your Groq API key."
 
-        client = Groq(api_key=api_key)
         indicative_answer = INDICATIVE_ANSWERS.get(question_num, "")
-        prompt = create_feedback_prompt(question_num, student_answer, indicative_answer)
+        passages = READINGS.search(f"{get_question_text(question_num)}\n{student_answer}") if READINGS else []
+        prompt = create_feedback_prompt(question_num, student_answer, indicative_answer, passages, verdicts)
 
-        message = client.chat.completions.create(
-            messages=[{"role": "user", "content": prompt}],
-            model="llama-3.3-70b-versatile",
+        # Charge the shared Groq quota before going upstream
+        admission = TOKEN_BUDGET.admit(
+            session_id, TOPIC, estimate_tokens(prompt) + MAX_COMPLETION_TOKENS
         )
+        if not admission.allowed:
+            return admission.message
+
+        client = Groq(api_key=api_key)
+
+        usage = None
+        try:
+            message = client.chat.completions.create(
+                messages=[{"role": "user", "content": prompt}],
+                model=admission.model,
+                max_tokens=MAX_COMPLETION_TOKENS,
+            )
+            usage = message.usage
+        finally:
+            # Settle the reservation to the actual spend, or release it if the call failed
+            TOKEN_BUDGET.record(session_id, TOPIC, admission.model, usage, admission)
 
-        return message.choices[0].message.content
+        return message.choices[0].message.content + reading_links(passages)
     except Exception as e:
         return f"Error getting feedback: {str(e)}. Make sure your GROQ_API_KEY environment variable is set correctly."
 
@@ -403,6 +523,7 @@ app_ui = ui.page_fluid(
         };
         """),
         ui.tags.script(src="https://cdn.jsdelivr.net/npm/mathjax@3/es5/tex-mml-chtml.js"),
+        ui.tags.script(src="https://cdn.plot.ly/plotly-2.35.2.min.js"),
         ui.tags.script("""
         function renderMath() {
           if (window.MathJax) {
@@ -449,6 +570,7 @@ app_ui = ui.page_fluid(
                         ui.input_action_button("submit1", "Get AI Feedback", class_="btn-primary"),
                         class_="answer-section"
                     ),
+                    ui.output_ui("coverage1"),
                     ui.output_ui("feedback1"),
                     class_="question-card"
                 )
@@ -466,10 +588,44 @@ app_ui = ui.page_fluid(
                         ui.input_action_button("submit2", "Get AI Feedback", class_="btn-primary"),
                         class_="answer-section"
                     ),
+                    ui.output_ui("coverage2"),
                     ui.output_ui("feedback2"),
                     class_="question-card"
                 )
             ),
+            ui.nav_panel(
+                "Exchange Economy Solver",
+                ui.div(
+                    ui.markdown(
+                        "Question 2 with many traders and goods. Every trader has Cobb-Douglas utility "
+                        "$U = \\prod_k d_k^{\\alpha_k}$, as in Question 1, with random tastes and endowments. The "
+                        "solver finds the prices that clear every market, with good 1 as numeraire. The left panel "
+                        "shows each market's excess demand as $P_2$ moves. Walras' law says $P \\cdot Z(P) = 0$ at "
+                        "any prices, not only in equilibrium, and it is checked below."
+                    ),
+                    ui.layout_columns(
+                        *[
+                            ui.input_slider(f"walras_{name}", label, min=start, max=stop, step=step, value=default)
+                            for name, (label, start, stop, step, default) in walras.AXES.items()
+                        ],
+                        ui.input_radio_buttons("walras_method", "Solver", walras.METHODS, inline=True),
+                        col_widths=(4, 4, 4, 4, 4),
+                    ),
+                    ui.div(id="walras_plot", style="height: 420px;"),
+                    ui.tags.script("""
+                    document.addEventListener('DOMContentLoaded', function() {
+                      Shiny.addCustomMessageHandler('walras-plot', function(fig) {
+                        Plotly.react('walras_plot', fig.data, fig.layout, {responsive: true, displayModeBar: false});
+                      });
+                      document.addEventListener('shown.bs.tab', function() {
+                        if (document.getElementById('walras_plot').data) { Plotly.Plots.resize('walras_plot'); }
+                      });
+                    });
+                    """),
+                    ui.output_ui("walras_summary"),
+                    class_="question-card"
+                )
+            ),
         ),
         class_="container-custom"
     )
@@ -477,29 +633,81 @@ app_ui = ui.page_fluid(
 
 
 def server(input, output, session):
-    @render.ui
-    @reactive.event(input.submit1)
-    def feedback1():
-        feedback = get_ai_feedback(1, input.answer1())
-        return ui.div(
-            ui.div(
-                ui.h3("AI Tutor Feedback", style="margin-top: 0; color: #2e7d32;"),
-                ui.markdown(feedback),
-                class_="feedback-box"
+    def question_outputs(num):
+        submit = input[f"submit{num}"]
+        answer = input[f"answer{num}"]
+
+        @reactive.extended_task
+        async def feedback_task(student_answer):
+            # Run the Groq call off the event loop so the checklist is sent straight away
+            return await asyncio.to_thread(get_ai_feedback, num, student_answer, session.id)
+
+        @reactive.effect
+        @reactive.event(submit)
+        def _submit():
+            feedback_task.invoke(answer())
+
+        @output(id=f"coverage{num}")
+        @render.ui
+        @reactive.event(submit)
+        def _coverage():
+            if not answer().strip():
+                return None
+            checklist = checklist_ui(COVERAGE[num].score(answer()))
+            if num not in VERIFIERS:
+                return checklist
+            return ui.TagList(checklist, verdicts_ui(VERIFIERS[num].verify(answer())))
+
+        @output(id=f"feedback{num}")
+        @render.ui
+        def _feedback():
+            return ui.div(
+                ui.div(
+                    ui.h3("AI Tutor Feedback", style="margin-top: 0; color: #2e7d32;"),
+                    ui.markdown(feedback_task.result()),
+                    class_="feedback-box"
+                )
             )
+
+    for num in INDICATIVE_ANSWERS:
+        question_outputs(num)
+
+    @reactive.calc
+    def walras_solution():
+        # Cached per economy; a 1,000-trader, 8-good economy solves in tens of milliseconds
+        return walras.solve(
+            input.walras_agents(), input.walras_goods(), round(input.walras_concentration(), 4),
+            input.walras_seed(), input.walras_method(),
         )
 
+    @reactive.effect
+    async def _draw_walras():
+        await session.send_custom_message("walras-plot", walras_solution()["figure"])
+
     @render.ui
-    @reactive.event(input.submit2)
-    def feedback2():
-        feedback = get_ai_feedback(2, input.answer2())
+    def walras_summary():
+        solution = walras_solution()
+        rows = "".join(
+            f"<tr><td>{k + 1}</td><td>{price:.4f}</td><td>{excess:.1e}</td>"
+            + "".join(f"<td>{solution['net'][i, k]:+.3f}</td>" for i in range(2))
+            + "</tr>"
+            for k, (price, excess) in enumerate(zip(solution["prices"], solution["excess"]))
+        )
         return ui.div(
-            ui.div(
-                ui.h3("AI Tutor Feedback", style="margin-top: 0; color: #2e7d32;"),
-                ui.markdown(feedback),
-                class_="feedback-box"
-            )
+            ui.HTML(
+                "<table class='table table-sm' style='max-width: 640px;'>"
+                "<thead><tr><th>Good</th><th>Price</th><th>Excess demand</th>"
+                "<th>Net purchase, trader A</th><th>Net purchase, trader B</th></tr></thead>"
+                f"<tbody>{rows}</tbody></table>"
+            ),
+            ui.markdown(
+                f"{walras.METHODS[input.walras_method()]} converged in **{len(solution['history'])}** iterations "
+                f"({solution['seconds'] * 1000:.1f} ms). Walras' law: the largest $|P \\cdot Z(P)|$ over 256 "
+                f"random price vectors is **{solution['walras_random']:.1e}** of the value of endowments, "
+                f"which is zero up to rounding. Each trader's budget binds, so the values of all the "
+                f"excess demands add to zero even when markets don't clear."
+            ),
         )
 
 
-app = App(app_ui, server)
+app = with_metrics(App(app_ui, server))
@@ -0,0 +1,170 @@
+"""Walrasian equilibrium of an exchange economy with N Cobb-Douglas traders and K goods.
+
+Trader ``i`` has endowment ``s_i`` and utility ``U = Π_k d_k^α_ik`` with
+``Σ_k α_ik = 1``; with two goods this is Question 1's ``d_1^α d_2^(1-α)``. Demands are
+``d_ik = α_ik (p · s_i) / p_k``, so market ``k`` has excess demand::
+
+    Z_k(p) = Σ_i α_ik (p · s_i) / p_k - Σ_i s_ik = (M p)_k / p_k - S_k,   M = αᵀ s
+
+``M`` is K x K, so once it is formed an evaluation costs O(K²) whatever the
+number of traders, and a whole batch of price vectors is one matrix product.
+Equilibrium prices are found with good 1 as numeraire, by Newton's method on
+log prices or by tâtonnement. Walras' law, ``p · Z(p) = 0`` at *every* price
+vector, is checked at the trader level over a batch of random prices.
+Solutions are kept in an LRU cache keyed on the economy's parameters.
+"""
+
+import time
+from functools import lru_cache
+
+import numpy as np
+
+# Slider axes: (label, start, stop, step, default)
+AXES = {
+    "agents": ("Traders N", 2, 1000, 1, 200),
+    "goods": ("Goods K", 2, 8, 1, 3),
+    "concentration": ("Taste similarity (Dirichlet concentration)", 0.5, 10.0, 0.5, 2.0),
+    "seed": ("Random economy", 0, 50, 1, 0),
+}
+METHODS = {"newton": "Newton", "tatonnement": "Tâtonnement"}
+TOL = 1e-10
+MAX_ITER = {"newton": 100, "tatonnement": 20_000}
+
+
+def economy(agents, goods, concentration=2.0, seed=0):
+    """Random tastes ``α`` (N x K, rows sum to one) and endowments ``s`` (N x K)."""
+    rng = np.random.default_rng(seed)
+    alpha = rng.dirichlet(np.full(goods, concentration), agents)
+    endowments = rng.lognormal(1.0, 0.75, (agents, goods))
+    return alpha, endowments
+
+
+def demands(prices, alpha, endowments):
+    """Each trader's demands at a batch of price vectors: (B, N, K) for prices (B, K)."""
+    prices = np.atleast_2d(prices)
+    income = prices @ endowments.T
+    return alpha[None] * income[..., None] / prices[:, None, :]
+
+
+def excess_demand(prices, alpha, endowments):
+    """Trader-level market excess demands at a batch of price vectors: (B, K)."""
+    return demands(prices, alpha, endowments).sum(axis=1) - endowments.sum(axis=0)
+
+
+def aggregate(alpha, endowments):
+    """``(M, S)`` such that ``Z(p) = (M p) / p - S``."""
+    return alpha.T @ endowments, endowments.sum(axis=0)
+
+
+def _excess(prices, M, S):
+    return (prices @ M.T) / prices - S
+
+
+def _jacobian(p, M, S):
+    """dZ_k / d log p_j at one price vector."""
+    spend = M @ p
+    return M * p[None, :] / p[:, None] - np.diag(spend / p)
+
+
+def newton(M, S, tol=TOL, max_iter=MAX_ITER["newton"]):
+    """Solve ``Z_2..K = 0`` in log prices with ``p_1 = 1``; returns (prices, residual history)."""
+    x = np.zeros(len(S) - 1)
+    history = []
+    for _ in range(max_iter):
+        p = np.concatenate([[1.0], np.exp(x)])
+        z = _excess(p, M, S)[1:] / S[1:]
+        history.append(float(np.abs(z).max()))
+        if history[-1] < tol:
+            break
+        J = _jacobian(p, M, S)[1:, 1:] / S[1:, None]
+        dx = np.linalg.solve(J, -z)
+        # Damped step: halve until the residual falls
+        for _ in range(30):
+            trial = np.concatenate([[1.0], np.exp(x + dx)])
+            if np.abs(_excess(trial, M, S)[1:] / S[1:]).max() < history[-1]:
+                break
+            dx /= 2
+        x = x + dx
+    return np.concatenate([[1.0], np.exp(x)]), history
+
+
+def tatonnement(M, S, tol=TOL, max_iter=MAX_ITER["tatonnement"], speed=0.5):
+    """The auctioneer raises the price of goods in excess demand: ``log p += speed · Z / S``."""
+    p = np.ones(len(S))
+    history = []
+    for _ in range(max_iter):
+        z = _excess(p, M, S) / S
+        history.append(float(np.abs(z[1:]).max()))
+        if history[-1] < tol:
+            break
+        p = p * np.exp(speed * z)
+        p = p / p[0]
+    return p, history
+
+
+def walras_residual(prices, alpha, endowments):
+    """Largest ``|p · Z(p)|`` relative to the value of endowments, per price vector."""
+    prices = np.atleast_2d(prices)
+    value = np.abs(np.einsum("bk,bk->b", prices, excess_demand(prices, alpha, endowments)))
+    return value / (prices @ endowments.sum(axis=0))
+
+
+@lru_cache(maxsize=256)
+def solve(agents, goods, concentration, seed, method):
+    """Equilibrium, convergence history and Walras' law check for one economy."""
+    alpha, endowments = economy(agents, goods, concentration, seed)
+    started = time.perf_counter()
+    M, S = aggregate(alpha, endowments)
+    prices, history = (newton if method == "newton" else tatonnement)(M, S)
+    elapsed = time.perf_counter() - started
+
+    random_prices = np.exp(np.random.default_rng(seed + 1).normal(0.0, 1.0, (256, goods)))
+    at_equilibrium = excess_demand(prices, alpha, endowments)[0]
+    net = demands(prices, alpha, endowments)[0] - endowments
+    return {
+        "prices": prices,
+        "excess": at_equilibrium,
+        "history": history,
+        "seconds": elapsed,
+        "walras_random": float(walras_residual(random_prices, alpha, endowments).max()),
+        "walras_equilibrium": float(walras_residual(prices, alpha, endowments)[0]),
+        "net": net[:2],
+        "figure": _figure(prices, alpha, endowments, history, method),
+    }
+
+
+def _figure(prices, alpha, endowments, history, method):
+    """Excess demand for every good as the price of good 2 varies, and the solver's convergence."""
+    goods = len(prices)
+    colours = ["#1f77b4", "#d62728", "#2ca02c", "#ff7f0e", "#9467bd", "#8c564b", "#e377c2", "#7f7f7f"]
+    p2 = prices[1] * np.geomspace(0.25, 4.0, 121)
+    batch = np.repeat(prices[None], len(p2), axis=0)
+    batch[:, 1] = p2
+    Z = excess_demand(batch, alpha, endowments) / endowments.sum(axis=0)
+    data = [
+        {"x": np.round(p2, 5).tolist(), "y": np.round(Z[:, k], 5).tolist(), "mode": "lines",
+         "name": f"Z{k + 1} / S{k + 1}", "line": {"color": colours[k % len(colours)], "width": 3 if k == 1 else 2}}
+        for k in range(goods)
+    ]
+    data.append({"x": [float(prices[1])], "y": [0.0], "mode": "markers", "name": "Equilibrium P₂",
+                 "marker": {"color": "black", "size": 12}})
+    data.append({"x": list(range(1, len(history) + 1)), "y": [max(h, 1e-16) for h in history],
+                 "mode": "lines+markers", "name": f"{METHODS[method]} residual", "xaxis": "x2", "yaxis": "y2",
+                 "line": {"color": "black"}, "marker": {"size": 4}})
+    return {
+        "data": data,
+        "layout": {
+            "height": 420,
+            "margin": {"t": 40, "b": 40, "l": 60, "r": 20},
+            "legend": {"orientation": "h", "y": -0.2},
+            "xaxis": {"domain": [0, 0.5], "type": "log", "title": {"text": "Price of good 2 (P₁ = 1)"}},
+            "yaxis": {"title": {"text": "Excess demand / endowment"}, "zeroline": True},
+            "xaxis2": {"domain": [0.6, 1], "title": {"text": "Iteration"}, "anchor": "y2"},
+            "yaxis2": {"type": "log", "title": {"text": "max |Z| / S"}, "anchor": "x2", "exponentformat": "e"},
+            "annotations": [
+                {"text": "Excess demands, other prices at equilibrium", "x": 0.25, "y": 1.08, "xref": "paper",
+                 "yref": "paper", "showarrow": False},
+                {"text": "Convergence", "x": 0.8, "y": 1.08, "xref": "paper", "yref": "paper", "showarrow": False},
+            ],
+        },
+    }
@@ -1,11 +1,30 @@
 from shiny import App, ui, render, reactive
 from groq import Groq
+import asyncio
 import os
 import pathlib
+import sys
 from dotenv import load_dotenv
 
+# Shared tutor modules live at the repository root; the sync workflow copies them next to app.py,
+# where the Space's /app/app.py has no repository root above it
+_APP = pathlib.Path(__file__).resolve()
+if len(_APP.parents) > 2:
+    sys.path.append(str(_APP.parents[2]))
+
+from answer_log import AnswerLog
+from budget import MAX_COMPLETION_TOKENS, TOKEN_BUDGET, estimate_tokens, with_metrics
+from concept_coverage import CoverageScorer, checklist_ui
+from misconceptions import MisconceptionLibrary
+from prescreen import prescreen
+from retrieval import format_passages, load_reading_index, reading_links
+
+import islm
+
 load_dotenv()
 
+TOPIC = "topic3"
+
 def load_questions_from_qmd():
     """Load question text from topic3questions.qmd for better context."""
     qmd_path = pathlib.Path("topic3questions.qmd")
@@ -17,6 +36,13 @@ def load_questions_from_qmd():
             print(f"Warning: Could not load topic3questions.qmd: {e}")
     return None
 
+# Section-level BM25 index over the topic reading (memory-mapped after the first build)
+READINGS = load_reading_index("topic3reading.qmd")
+
+# Answers are logged for offline misconception clustering; reviewed clusters are served below
+ANSWER_LOG = AnswerLog()
+MISCONCEPTIONS = MisconceptionLibrary.for_topic(TOPIC)
+
 INDICATIVE_ANSWERS = {
     1: """**Main points of similarity:**
 
@@ -64,6 +90,17 @@ Similarly, because money is also a store of value that competes with interest-be
 In a liquidity trap, however, precisely because the desire to hoard money is unlimited, this mechanism also ceases to work."""
 }
 
+TOPIC_CONCEPTS = {
+    1: "transaction demand for money, Cambridge equation of exchange, store of value, liquidity preference, loanable funds, IS-LM, dichotomy, neutrality of money, liquidity trap",
+    2: "price of money, unit of account, exogenous money supply, no close substitutes, interest rate adjustment, price level adjustment, Walras' Law, liquidity trap",
+    3: "absolute liquidity preference, uncertainty, aggregate demand, falling price level, interest-bearing assets, hoarding money, excess demand for money",
+}
+
+COVERAGE = {
+    num: CoverageScorer(TOPIC_CONCEPTS.get(num, ""), answer)
+    for num, answer in INDICATIVE_ANSWERS.items()
+}
+
 def get_question_text(num):
     questions = {
         1: "**Question 1: Classical vs. Keynesian Views**\n\nCompare and contrast Classical and Keynesian views on the macroeconomic role of money.",
@@ -72,12 +109,19 @@ def get_question_text(num):
     }
     return questions.get(num, "")
 
-def create_feedback_prompt(question_num, student_answer, indicative_answer):
+def create_feedback_prompt(question_num, student_answer, indicative_answer, passages=()):
     qmd_context = load_questions_from_qmd()
     context_note = ""
     if qmd_context:
         context_note = "\n\nNote: This question is from Topic 3 of EC3014 Monetary Economics."
     
+    reading_context = ""
+    if passages:
+        reading_context = f"""
+RELEVANT SECTIONS OF THE TOPIC READING (use these to point the student to specific sections):
+{format_passages(passages)}
+"""
+
     return f"""You are an expert economics tutor providing feedback on a Monetary Economics question from Topic 3 (Keynes's Theory of Money). Your goal is to help students improve their understanding by providing hints and guidance, NOT complete answers.
 
 QUESTION {question_num}:
@@ -88,7 +132,7 @@ STUDENT'S ANSWER:
 
 INDICATIVE ANSWER (for your reference only - DO NOT share directly):
 {indicative_answer}
-
+{reading_context}
 TOPIC 3 KEY CONCEPTS:
 - Classical vs. Keynesian views on money's role
 - Money market exceptionality (price of money, supply rigidity, no substitutes)
@@ -108,25 +152,53 @@ INSTRUCTIONS:
 
 Provide your feedback now:{context_note}"""
 
-def get_ai_feedback(question_num, student_answer):
+def get_ai_feedback(question_num, student_answer, session_id=None):
     if not student_answer.strip():
         return "Please provide an answer to receive feedback."
 
+    # Trivial answers get instant canned guidance instead of an LLM call
+    screened = prescreen(student_answer, get_question_text(question_num), TOPIC_CONCEPTS.get(question_num, ""))
+    if screened:
+        return screened[1]
+
+    ANSWER_LOG.record(TOPIC, question_num, session_id, student_answer)
+
+    # Recurring misconceptions get their tutor-reviewed template without an LLM call
+    known = MISCONCEPTIONS.match(question_num, student_answer)
+    if known:
+        return known.template
+
     try:
         api_key = os.environ.get("GROQ_API_KEY")
         if not api_key:
             return "Error: GROQ_API_KEY environment variable not set. Please set your Groq API key."
 
-        client = Groq(api_key=api_key)
         indicative_answer = INDICATIVE_ANSWERS.get(question_num, "")
-        prompt = create_feedback_prompt(question_num, student_answer, indicative_answer)
+        passages = READINGS.search(f"{get_question_text(question_num)}\n{student_answer}") if READINGS else []
+        prompt = create_feedback_prompt(question_num, student_answer, indicative_answer, passages)
 
-        message = client.chat.completions.create(
-            messages=[{"role": "user", "content": prompt}],
-            model="llama-3.3-70b-versatile",
+        # Charge the shared Groq quota before going upstream
+        admission = TOKEN_BUDGET.admit(
+            session_id, TOPIC, estimate_tokens(prompt) + MAX_COMPLETION_TOKENS
         )
+        if not admission.allowed:
+            return admission.message
+
+        client = Groq(api_key=api_key)
+
+        usage = None
+        try:
+            message = client.chat.completions.create(
+                messages=[{"role": "user", "content": prompt}],
+                model=admission.model,
+                max_tokens=MAX_COMPLETION_TOKENS,
+            )
+            usage = message.usage
+        finally:
+            # Settle the reservation to the actual spend, or release it if the call failed
+            TOKEN_BUDGET.record(session_id, TOPIC, admission.model, usage, admission)
 
-        return message.choices[0].message.content
+        return message.choices[0].message.content + reading_links(passages)
     except Exception as e:
         return f"Error getting feedback: {str(e)}. Make sure your GROQ_API_KEY environment variable is set correctly."
 
@@ -318,6 +390,7 @@ app_ui = ui.page_fluid(
         };
         """),
         ui.tags.script(src="https://cdn.jsdelivr.net/npm/mathjax@3/es5/tex-mml-chtml.js"),
+        ui.tags.script(src="https://cdn.plot.ly/plotly-2.35.2.min.js"),
         ui.tags.script("""
         function renderMath() {
           if (window.MathJax) {
@@ -361,6 +434,7 @@ app_ui = ui.page_fluid(
                         ui.input_action_button("submit1", "Get AI Feedback", class_="btn-primary"),
                         class_="answer-section"
                     ),
+                    ui.output_ui("coverage1"),
                     ui.output_ui("feedback1"),
                     class_="question-card"
                 )
@@ -375,6 +449,7 @@ app_ui = ui.page_fluid(
                         ui.input_action_button("submit2", "Get AI Feedback", class_="btn-primary"),
                         class_="answer-section"
                     ),
+                    ui.output_ui("coverage2"),
                     ui.output_ui("feedback2"),
                     class_="question-card"
                 )
@@ -389,50 +464,106 @@ app_ui = ui.page_fluid(
                         ui.input_action_button("submit3", "Get AI Feedback", class_="btn-primary"),
                         class_="answer-section"
                     ),
+                    ui.output_ui("coverage3"),
                     ui.output_ui("feedback3"),
                     class_="question-card"
                 )
             ),
+            ui.nav_panel(
+                "IS-LM Simulator",
+                ui.div(
+                    ui.markdown(
+                        "Move the sliders to see how money supply, the price level and demand shift the IS-LM "
+                        "and AD-AS equilibria. Raise the trap floor $i_L$ to see why deflation and monetary "
+                        "expansion stop working, and the Pigou effect $c$ to see real balances shift IS."
+                    ),
+                    ui.layout_columns(
+                        *[
+                            ui.input_slider(f"sim_{name}", label, min=start, max=stop, step=step, value=default)
+                            for name, (label, start, stop, step, default) in islm.AXES.items()
+                        ],
+                        col_widths=(4, 4, 4, 6, 6),
+                    ),
+                    ui.div(id="islm_plot", style="height: 450px;"),
+                    ui.tags.script(f"""
+                    document.addEventListener('DOMContentLoaded', function() {{
+                      const fig = {islm.figure_json(islm.default_point())};
+                      Plotly.newPlot('islm_plot', fig.data, fig.layout, {{responsive: true, displayModeBar: false}});
+                      Shiny.addCustomMessageHandler('islm-restyle', function(patches) {{
+                        patches.forEach(function(p) {{ Plotly.restyle('islm_plot', p[0], p[1]); }});
+                      }});
+                      document.addEventListener('shown.bs.tab', function() {{ Plotly.Plots.resize('islm_plot'); }});
+                    }});
+                    """),
+                    ui.output_ui("islm_summary"),
+                    class_="question-card"
+                )
+            ),
         ),
         class_="container-custom"
     )
 )
 
 def server(input, output, session):
-    @render.ui
-    @reactive.event(input.submit1)
-    def feedback1():
-        feedback = get_ai_feedback(1, input.answer1())
-        return ui.div(
-            ui.div(
-                ui.h3("AI Tutor Feedback", style="margin-top: 0; color: #2e7d32;"),
-                ui.markdown(feedback),
-                class_="feedback-box"
+    def question_outputs(num):
+        submit = input[f"submit{num}"]
+        answer = input[f"answer{num}"]
+
+        @reactive.extended_task
+        async def feedback_task(student_answer):
+            # Run the Groq call off the event loop so the checklist is sent straight away
+            return await asyncio.to_thread(get_ai_feedback, num, student_answer, session.id)
+
+        @reactive.effect
+        @reactive.event(submit)
+        def _submit():
+            feedback_task.invoke(answer())
+
+        @output(id=f"coverage{num}")
+        @render.ui
+        @reactive.event(submit)
+        def _coverage():
+            if not answer().strip():
+                return None
+            return checklist_ui(COVERAGE[num].score(answer()))
+
+        @output(id=f"feedback{num}")
+        @render.ui
+        def _feedback():
+            return ui.div(
+                ui.div(
+                    ui.h3("AI Tutor Feedback", style="margin-top: 0; color: #2e7d32;"),
+                    ui.markdown(feedback_task.result()),
+                    class_="feedback-box"
+                )
             )
-        )
 
-    @render.ui
-    @reactive.event(input.submit2)
-    def feedback2():
-        feedback = get_ai_feedback(2, input.answer2())
-        return ui.div(
-            ui.div(
-                ui.h3("AI Tutor Feedback", style="margin-top: 0; color: #2e7d32;"),
-                ui.markdown(feedback),
-                class_="feedback-box"
-            )
-        )
+    for num in INDICATIVE_ANSWERS:
+        question_outputs(num)
+
+    @reactive.calc
+    def islm_point():
+        # Sliders step on the precomputed grid, so this is a hit in the shared simulation cache
+        return islm.curves(**{name: input[f"sim_{name}"]() for name in islm.AXES})
+
+    @reactive.effect
+    async def _patch_islm():
+        # Patch the moving traces in the browser instead of re-sending the figure
+        await session.send_custom_message("islm-restyle", islm.restyle(islm_point()))
 
     @render.ui
-    @reactive.event(input.submit3)
-    def feedback3():
-        feedback = get_ai_feedback(3, input.answer3())
-        return ui.div(
-            ui.div(
-                ui.h3("AI Tutor Feedback", style="margin-top: 0; color: #2e7d32;"),
-                ui.markdown(feedback),
-                class_="feedback-box"
-            )
+    def islm_summary():
+        point = islm_point()
+        gap = point["Y"] - islm.Y_BAR
+        regime = (
+            "**Liquidity trap:** the interest rate is stuck at the floor, so more money or lower prices leave output unchanged."
+            if point["trapped"] else
+            "**Normal region:** higher real balances lower the interest rate and raise output (Keynes effect)."
         )
+        return ui.markdown(
+            f"Equilibrium output **Y = {point['Y']:.2f}**, interest rate **i = {point['i']:.2f}**, "
+            f"output gap **{gap:+.2f}**.\n\n{regime}"
+        )
+
 
-app = App(app_ui, server)
+app = with_metrics(App(app_ui, server))
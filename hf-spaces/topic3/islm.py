@@ -0,0 +1,160 @@
+"""IS-LM / AD-AS model with a liquidity trap, solved over whole parameter grids.
+
+Goods market (IS), with an optional Pigou real-balance effect ``c``::
+
+    i = A - b Y + c M/P
+
+Money market (LM). Money demand ``L = L0 + k Y - h i`` becomes infinitely
+elastic at the trap floor ``i_L``::
+
+    i = max(i_L, (L0 + k Y - M/P) / h)
+
+Every slider combination is solved once at import with NumPy broadcasting,
+so a slider move is an index lookup. The AD curve is a slice of the same
+grid along the price axis. Curve coordinates for a grid point go through the
+shared ``SimulationCache``, so every session reuses them. The page embeds the figure once; after that the
+server only sends ``Plotly.restyle`` patches for the traces that move.
+"""
+
+import numpy as np
+
+from sim_cache import SimulationCache
+
+B = 0.6        # IS slope
+K = 1.0        # income sensitivity of money demand
+H = 2.0        # interest sensitivity of money demand
+L0 = 6.0       # autonomous money demand
+Y_BAR = 7.0    # full-employment output
+
+# Slider axes: (label, start, stop, step, default). The sliders step on exactly these points.
+AXES = {
+    "M": ("Money supply M", 1.0, 12.0, 0.5, 4.0),
+    "P": ("Price level P", 0.5, 3.0, 0.1, 1.0),
+    "A": ("Autonomous demand A", 4.0, 10.0, 0.25, 8.0),
+    "i_L": ("Liquidity-trap floor i_L", 0.0, 3.0, 0.25, 0.0),
+    "c": ("Pigou effect c", 0.0, 0.5, 0.05, 0.0),
+}
+
+Y_AXIS = np.linspace(0.0, 12.0, 121)
+
+
+def axis(name):
+    _, start, stop, step, _ = AXES[name]
+    return np.round(np.arange(start, stop + step / 2, step), 6)
+
+
+def solve(M, P, A, i_L, c):
+    """Equilibrium ``(Y, i, trapped)``; arguments broadcast against each other."""
+    m = M / P
+    Y = (A + c * m - (L0 - m) / H) / (B + K / H)
+    i = A - B * Y + c * m
+    trapped = i < i_L
+    Y = np.where(trapped, (A + c * m - i_L) / B, Y)
+    i = np.where(trapped, i_L, i)
+    return Y, i, trapped
+
+
+def _build_grid():
+    names = list(AXES)
+    shaped = [axis(n).reshape([-1 if j == k else 1 for k in range(len(names))]) for j, n in enumerate(names)]
+    Y, i, trapped = solve(*shaped)
+    return Y.astype(np.float32), i.astype(np.float32), trapped
+
+
+# About a million grid points, solved in tens of milliseconds at startup
+GRID_Y, GRID_I, GRID_TRAPPED = _build_grid()
+
+
+def grid_index(**values):
+    """Snap slider values onto the grid."""
+    index = []
+    for name, (_, start, _, step, _) in AXES.items():
+        last = len(axis(name)) - 1
+        index.append(min(max(int(round((values[name] - start) / step)), 0), last))
+    return tuple(index)
+
+
+def _point(M, P, A, i_L, c):
+    """Equilibrium and curve coordinates at one grid point, as arrays for the cache."""
+    index = grid_index(M=M, P=P, A=A, i_L=i_L, c=c)
+    M, P, A, i_L, c = (float(axis(name)[j]) for name, j in zip(AXES, index))
+    m = M / P
+    return {
+        "Y": np.float32(GRID_Y[index]),
+        "i": np.float32(GRID_I[index]),
+        "trapped": np.bool_(GRID_TRAPPED[index]),
+        "P": np.float64(P),
+        "is": A - B * Y_AXIS + c * m,
+        "lm": np.maximum(i_L, (L0 + K * Y_AXIS - m) / H),
+        "ad_Y": GRID_Y[(index[0], slice(None), *index[2:])],
+    }
+
+
+# The lattice is the slider grid, so every move is an exact hit. Interpolation is
+# off: the trap floor puts a kink in the curves. Points are cheap, so nothing is written to disk.
+CACHE = SimulationCache(
+    "islm", _point, {name: (spec[1], spec[3]) for name, spec in AXES.items()},
+    tolerance=None, max_bytes=16 * 2**20, disk=False,
+)
+
+
+def curves(**values):
+    """Rounded trace coordinates at the slider ``values``, shared by every session."""
+    point = CACHE.get(**values)
+    return {
+        "Y": round(float(point["Y"]), 3),
+        "i": round(float(point["i"]), 3),
+        "trapped": bool(point["trapped"]),
+        "P": float(point["P"]),
+        "y_axis": np.round(Y_AXIS, 3).tolist(),
+        "is": np.round(point["is"], 3).tolist(),
+        "lm": np.round(point["lm"], 3).tolist(),
+        "ad_Y": np.round(point["ad_Y"], 3).tolist(),
+    }
+
+
+def default_point():
+    return curves(**{name: spec[4] for name, spec in AXES.items()})
+
+
+def figure_json(point):
+    """IS-LM and AD-AS panels as Plotly JSON, embedded once in the page."""
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+
+    fig = make_subplots(rows=1, cols=2, subplot_titles=("IS-LM", "AD-AS"), horizontal_spacing=0.12)
+    fig.add_trace(go.Scatter(x=point["y_axis"], y=point["is"], name="IS", line=dict(color="#1f4fd1", width=3)), 1, 1)
+    fig.add_trace(go.Scatter(x=point["y_axis"], y=point["lm"], name="LM", line=dict(color="#d62728", width=3)), 1, 1)
+    fig.add_trace(
+        go.Scatter(x=[point["Y"]], y=[point["i"]], mode="markers", name="Equilibrium",
+                   marker=dict(size=12, color="black")), 1, 1,
+    )
+    fig.add_trace(
+        go.Scatter(x=[Y_BAR, Y_BAR], y=[-1, 10], mode="lines", name="Full employment Ȳ",
+                   line=dict(color="gray", dash="dot")), 1, 1,
+    )
+    fig.add_trace(
+        go.Scatter(x=point["ad_Y"], y=axis("P").tolist(), name="AD", line=dict(color="#1f4fd1", width=3)), 1, 2,
+    )
+    fig.add_trace(
+        go.Scatter(x=[point["Y"]], y=[point["P"]], mode="markers", name="Current P",
+                   marker=dict(size=12, color="black"), showlegend=False), 1, 2,
+    )
+    fig.add_trace(
+        go.Scatter(x=[Y_BAR, Y_BAR], y=[0, 3.2], mode="lines", name="LRAS",
+                   line=dict(color="green", dash="dash")), 1, 2,
+    )
+    fig.update_xaxes(title_text="Output Y", range=[0, 12])
+    fig.update_yaxes(title_text="Interest rate i", range=[-1, 10], row=1, col=1)
+    fig.update_yaxes(title_text="Price level P", range=[0, 3.2], row=1, col=2)
+    fig.update_layout(height=450, margin=dict(t=40, b=40, l=50, r=20), legend=dict(orientation="h", y=-0.2))
+    return fig.to_json()
+
+
+def restyle(point):
+    """``Plotly.restyle`` patches for the traces that move; the axes and Ȳ lines are never re-sent."""
+    return [
+        [{"y": [point["is"], point["lm"]]}, [0, 1]],
+        [{"x": [point["ad_Y"]]}, [4]],
+        [{"x": [[point["Y"]], [point["Y"]]], "y": [[point["i"]], [point["P"]]]}, [2, 5]],
+    ]
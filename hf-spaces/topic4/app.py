@@ -1,11 +1,33 @@
 from shiny import App, ui, render, reactive
 from groq import Groq
+import sympy as sp
+import asyncio
+import json
 import os
 import pathlib
+import sys
 from dotenv import load_dotenv
 
+# Shared tutor modules live at the repository root; the sync workflow copies them next to app.py,
+# where the Space's /app/app.py has no repository root above it
+_APP = pathlib.Path(__file__).resolve()
+if len(_APP.parents) > 2:
+    sys.path.append(str(_APP.parents[2]))
+
+from answer_log import AnswerLog
+from budget import MAX_COMPLETION_TOKENS, TOKEN_BUDGET, estimate_tokens, with_metrics
+from concept_coverage import CoverageScorer, checklist_ui
+from misconceptions import MisconceptionLibrary
+from prescreen import prescreen
+from retrieval import format_passages, load_reading_index, reading_links
+from verifier import Check, NumericVerifier, reference_values, symbol, verdicts_prompt, verdicts_ui
+
+import money_growth
+
 load_dotenv()
 
+TOPIC = "topic4"
+
 def load_questions_from_qmd():
     qmd_path = pathlib.Path("topic4questions.qmd")
     if qmd_path.exists():
@@ -16,12 +38,80 @@ def load_questions_from_qmd():
             print(f"Warning: Could not load topic4questions.qmd: {e}")
     return None
 
+# Section-level BM25 index over the topic reading (memory-mapped after the first build)
+READINGS = load_reading_index("topic4reading.qmd")
+
+# Answers are logged for offline misconception clustering; reviewed clusters are served below
+ANSWER_LOG = AnswerLog()
+MISCONCEPTIONS = MisconceptionLibrary.for_topic(TOPIC)
+
 INDICATIVE_ANSWERS = {
     1: """Long-run equilibrium: θ = 4, N = 400, Y = 3200, P₀ = 5, W₀ = 20. When M increases to 48000: P₁ = 7.5, W₁ = 30, but θ, N, Y unchanged. Model exhibits dichotomy and neutrality—real variables determined by production and labour preferences only; money supply affects only nominal variables proportionally in long run.""",
     2: """Short-run with money illusion: W' ≈ 24.49, N' ≈ 489.8, Y' ≈ 3545.7, P' ≈ 6.76, θ' ≈ 3.62. Workers observe higher nominal wage but perceive lower inflation than actual, so supply more labour. Real wage falls below natural level (θ' < θ), employment and output expand. Shows how money illusion creates short-run monetary non-neutrality that reverses in long run as expectations adjust.""",
     3: """Initial: π = 2%, i = 4%. When gM increases to 6%: SR – output growth rises temporarily (~1.5%), inflation lags increase in money growth, real interest rates fall. LR – gY returns to 1%, π settles at 5%, i rises to 7%, r returns to 2%. Demonstrates Phillips curve trade-off in SR but vertical long-run Phillips curve; monetary policy has temporary real effects because inflation expectations lag.""",
 }
 
+TOPIC_CONCEPTS = {
+    1: "monetarist model, labour market equilibrium, production function, QTM, dichotomy of real and nominal variables, neutrality of money",
+    2: "money illusion, short-run labour supply, real vs nominal wages, Friedman's short-run monetary effects, expectations lag",
+    3: "dynamic QTM, Fisher equation, monetary growth, inflation lag, Phillips curve, expectations-augmented expectations, short-run vs long-run neutrality",
+}
+
+COVERAGE = {
+    num: CoverageScorer(TOPIC_CONCEPTS.get(num, ""), answer)
+    for num, answer in INDICATIVE_ANSWERS.items()
+}
+
+def numeric_verifiers():
+    """Reference values for Q1 and Q2, solved with SymPy and compiled once at startup."""
+    theta, W, P, M0, M1 = sp.symbols("theta W P M_0 M_1", positive=True)
+    labour_supply = 100 * theta
+    output = lambda n: 160 * sp.sqrt(n)
+
+    theta_star = sp.solve(sp.Eq(labour_supply, 6400 / theta**2), theta)[0]
+    N_star = labour_supply.subs(theta, theta_star)
+    Y_star = output(N_star)
+    P0, P1 = M0 / (2 * Y_star), M1 / (2 * Y_star)
+
+    # Money illusion: labour supply responds to W / P0 while P moves to P'
+    N_short = 100 * W / P0
+    short_run = sp.solve(
+        [sp.Eq(N_short, 6400 * P**2 / W**2), sp.Eq(M1, 2 * P * output(N_short))], [W, P], dict=True
+    )[0]
+    N_prime = N_short.subs(short_run)
+
+    ref = reference_values(
+        {
+            "theta": theta_star, "N": N_star, "Y": Y_star,
+            "P0": P0, "W0": theta_star * P0, "P1": P1, "W1": theta_star * P1,
+            "W'": short_run[W], "N'": N_prime, "Y'": output(N_prime),
+            "P'": short_run[P], "theta'": short_run[W] / short_run[P],
+        },
+        {M0: 32000, M1: 48000},
+    )
+    theta_names = ("θ", r"\\theta", "theta")
+    return {
+        1: NumericVerifier([
+            Check("(b)", "θ", ref["theta"], [symbol(*theta_names)]),
+            Check("(b)", "N", ref["N"], [symbol("N")]),
+            Check("(b)", "Y", ref["Y"], [symbol("Y")]),
+            Check("(c)", "P₀", ref["P0"], [symbol("P", sub=0)]),
+            Check("(c)", "W₀", ref["W0"], [symbol("W", sub=0)]),
+            Check("(d)", "P₁", ref["P1"], [symbol("P", sub=1)]),
+            Check("(d)", "W₁", ref["W1"], [symbol("W", sub=1)]),
+        ]),
+        2: NumericVerifier([
+            Check("(c)", "W'", ref["W'"], [symbol("W", prime=True)]),
+            Check("(c)", "N'", ref["N'"], [symbol("N", prime=True)]),
+            Check("(c)", "Y'", ref["Y'"], [symbol("Y", prime=True)]),
+            Check("(c)", "P'", ref["P'"], [symbol("P", prime=True)]),
+            Check("(c)", "θ'", ref["theta'"], [symbol(*theta_names, prime=True)]),
+        ]),
+    }
+
+# Quantitative parts are checked locally; verdicts go to the student and into the prompt
+VERIFIERS = numeric_verifiers()
+
 def get_question_text(num):
     questions = {
         1: """**Question 1: Monetarist Model of the Labour Market**
@@ -36,20 +126,28 @@ Given gY = 1% per year, gM = 3% (initially), long-run r = 2%. Using dynamic QTM
     }
     return questions.get(num, "")
 
-def create_feedback_prompt(question_num, student_answer, indicative_answer):
+def create_feedback_prompt(question_num, student_answer, indicative_answer, passages=(), verdicts=()):
     qmd_context = load_questions_from_qmd()
     context_note = ""
     if qmd_context:
         context_note = "\n\nNote: This question is from Topic 4 - Friedman's Monetarism in EC3014 Monetary Economics."
     
-    topic_concepts = {
-        1: "monetarist model, labour market equilibrium, production function, QTM, dichotomy of real and nominal variables, neutrality of money",
-        2: "money illusion, short-run labour supply, real vs nominal wages, Friedman's short-run monetary effects, expectations lag",
-        3: "dynamic QTM, Fisher equation, monetary growth, inflation lag, Phillips curve, expectations-augmented expectations, short-run vs long-run neutrality",
-    }
-    
-    key_concepts = topic_concepts.get(question_num, "Topic 4 concepts")
+    key_concepts = TOPIC_CONCEPTS.get(question_num, "Topic 4 concepts")
     
+    reading_context = ""
+    if passages:
+        reading_context = f"""
+RELEVANT SECTIONS OF THE TOPIC READING (use these to point the student to specific sections):
+{format_passages(passages)}
+"""
+
+    numeric_check = ""
+    if verdicts:
+        numeric_check = f"""
+AUTOMATED NUMERICAL CHECK (computed exactly - trust these verdicts, do not redo the arithmetic):
+{verdicts_prompt(verdicts)}
+"""
+
     return f"""You are an expert economics tutor providing feedback on a Monetary Economics question from Topic 4: Friedman's Monetarism. Your goal is to help students improve their understanding by providing hints and guidance, NOT complete answers.
 
 Key concepts for this question: {key_concepts}
@@ -62,7 +160,7 @@ STUDENT'S ANSWER:
 
 INDICATIVE ANSWER (for your reference only - DO NOT share directly):
 {indicative_answer}
-
+{reading_context}{numeric_check}
 INSTRUCTIONS:
 1. Identify what the student got right and acknowledge it
 2. If the answer is incomplete or has gaps, provide HINTS to guide them toward the correct reasoning
@@ -75,25 +173,57 @@ INSTRUCTIONS:
 
 Provide your feedback now:{context_note}"""
 
-def get_ai_feedback(question_num, student_answer):
+def get_ai_feedback(question_num, student_answer, session_id=None):
     if not student_answer.strip():
         return "Please provide an answer to receive feedback."
 
+    verdicts = VERIFIERS[question_num].verify(student_answer) if question_num in VERIFIERS else []
+
+    # Trivial answers get instant canned guidance instead of an LLM call. A stated value
+    # the verifier can check is a real attempt however terse, so it skips the screens.
+    if all(v.status == "missing" for v in verdicts):
+        screened = prescreen(student_answer, get_question_text(question_num), TOPIC_CONCEPTS.get(question_num, ""))
+        if screened:
+            return screened[1]
+
+    ANSWER_LOG.record(TOPIC, question_num, session_id, student_answer)
+
+    # Recurring misconceptions get their tutor-reviewed template without an LLM call
+    known = MISCONCEPTIONS.match(question_num, student_answer)
+    if known:
+        return known.template
+
     try:
         api_key = os.environ.get("GROQ_API_KEY")
         if not api_key:
             return "Error: GROQ_API_KEY environment variable not set. Please set your Groq API key."
 
-        client = Groq(api_key=api_key)
         indicative_answer = INDICATIVE_ANSWERS.get(question_num, "")
-        prompt = create_feedback_prompt(question_num, student_answer, indicative_answer)
+        passages = READINGS.search(f"{get_question_text(question_num)}\n{student_answer}") if READINGS else []
+        prompt = create_feedback_prompt(question_num, student_answer, indicative_answer, passages, verdicts)
 
-        message = client.chat.completions.create(
-            messages=[{"role": "user", "content": prompt}],
-            model="llama-3.3-70b-versatile",
+        # Charge the shared Groq quota before going upstream
+        admission = TOKEN_BUDGET.admit(
+            session_id, TOPIC, estimate_tokens(prompt) + MAX_COMPLETION_TOKENS
         )
+        if not admission.allowed:
+            return admission.message
 
-        return message.choices[0].message.content
+        client = Groq(api_key=api_key)
+
+        usage = None
+        try:
+            message = client.chat.completions.create(
+                messages=[{"role": "user", "content": prompt}],
+                model=admission.model,
+                max_tokens=MAX_COMPLETION_TOKENS,
+            )
+            usage = message.usage
+        finally:
+            # Settle the reservation to the actual spend, or release it if the call failed
+            TOKEN_BUDGET.record(session_id, TOPIC, admission.model, usage, admission)
+
+        return message.choices[0].message.content + reading_links(passages)
     except Exception as e:
         return f"Error getting feedback: {str(e)}. Make sure your GROQ_API_KEY environment variable is set correctly."
 
@@ -286,6 +416,7 @@ app_ui = ui.page_fluid(
         };
         """),
         ui.tags.script(src="https://cdn.jsdelivr.net/npm/mathjax@3/es5/tex-mml-chtml.js"),
+        ui.tags.script(src="https://cdn.plot.ly/plotly-2.35.2.min.js"),
         ui.tags.script("""
         function renderMath() {
           if (window.MathJax) {
@@ -328,6 +459,7 @@ app_ui = ui.page_fluid(
                         ui.input_action_button("submit1", "Get AI Feedback", class_="btn-primary"),
                         class_="answer-section"
                     ),
+                    ui.output_ui("coverage1"),
                     ui.output_ui("feedback1"),
                     class_="question-card"
                 )
@@ -342,6 +474,7 @@ app_ui = ui.page_fluid(
                         ui.input_action_button("submit2", "Get AI Feedback", class_="btn-primary"),
                         class_="answer-section"
                     ),
+                    ui.output_ui("coverage2"),
                     ui.output_ui("feedback2"),
                     class_="question-card"
                 )
@@ -356,50 +489,116 @@ app_ui = ui.page_fluid(
                         ui.input_action_button("submit3", "Get AI Feedback", class_="btn-primary"),
                         class_="answer-section"
                     ),
+                    ui.output_ui("coverage3"),
                     ui.output_ui("feedback3"),
                     class_="question-card"
                 )
             ),
+            ui.nav_panel(
+                "Money Growth Simulator",
+                ui.div(
+                    ui.markdown(
+                        "Question 3 with adaptive expectations: money growth changes in year 5 and expected "
+                        "inflation catches up at speed $\\lambda$. Output growth rises with the inflation surprise, "
+                        "and the nominal rate follows the Fisher equation $i = r + \\pi^e$. Try a temporary or "
+                        "phased-in change, or faster expectations."
+                    ),
+                    ui.layout_columns(
+                        *[
+                            ui.input_slider(f"mg_{name}", label, min=start, max=stop, step=step, value=default)
+                            for name, (label, start, stop, step, default) in money_growth.AXES.items()
+                        ],
+                        col_widths=(3, 3, 3, 3, 3, 3, 3, 3),
+                    ),
+                    ui.div(id="mg_plot", style="height: 640px;"),
+                    ui.tags.script("""
+                    document.addEventListener('DOMContentLoaded', function() {
+                      Shiny.addCustomMessageHandler('mg-plot', function(fig) {
+                        Plotly.react('mg_plot', fig.data, fig.layout, {responsive: true, displayModeBar: false});
+                      });
+                      document.addEventListener('shown.bs.tab', function() {
+                        if (document.getElementById('mg_plot').data) { Plotly.Plots.resize('mg_plot'); }
+                      });
+                    });
+                    """),
+                    ui.output_ui("mg_summary"),
+                    class_="question-card"
+                )
+            ),
         ),
         class_="container-custom"
     )
 )
 
 def server(input, output, session):
-    @render.ui
-    @reactive.event(input.submit1)
-    def feedback1():
-        feedback = get_ai_feedback(1, input.answer1())
-        return ui.div(
-            ui.div(
-                ui.h3("AI Tutor Feedback", style="margin-top: 0; color: #2e7d32;"),
-                ui.markdown(feedback),
-                class_="feedback-box"
-            )
-        )
+    def question_outputs(num):
+        submit = input[f"submit{num}"]
+        answer = input[f"answer{num}"]
 
-    @render.ui
-    @reactive.event(input.submit2)
-    def feedback2():
-        feedback = get_ai_feedback(2, input.answer2())
-        return ui.div(
-            ui.div(
-                ui.h3("AI Tutor Feedback", style="margin-top: 0; color: #2e7d32;"),
-                ui.markdown(feedback),
-                class_="feedback-box"
+        @reactive.extended_task
+        async def feedback_task(student_answer):
+            # Run the Groq call off the event loop so the checklist is sent straight away
+            return await asyncio.to_thread(get_ai_feedback, num, student_answer, session.id)
+
+        @reactive.effect
+        @reactive.event(submit)
+        def _submit():
+            feedback_task.invoke(answer())
+
+        @output(id=f"coverage{num}")
+        @render.ui
+        @reactive.event(submit)
+        def _coverage():
+            if not answer().strip():
+                return None
+            checklist = checklist_ui(COVERAGE[num].score(answer()))
+            if num not in VERIFIERS:
+                return checklist
+            return ui.TagList(checklist, verdicts_ui(VERIFIERS[num].verify(answer())))
+
+        @output(id=f"feedback{num}")
+        @render.ui
+        def _feedback():
+            return ui.div(
+                ui.div(
+                    ui.h3("AI Tutor Feedback", style="margin-top: 0; color: #2e7d32;"),
+                    ui.markdown(feedback_task.result()),
+                    class_="feedback-box"
+                )
             )
-        )
+
+    for num in INDICATIVE_ANSWERS:
+        question_outputs(num)
+
+    @reactive.calc
+    def mg_params():
+        return {name: input[f"mg_{name}"]() for name in money_growth.AXES}
+
+    @reactive.effect
+    async def _draw_mg():
+        # Figure JSON is memoised on the rounded parameters, so revisited settings are a cache hit
+        await session.send_custom_message("mg-plot", json.loads(money_growth.figure_json(**mg_params())))
 
     @render.ui
-    @reactive.event(input.submit3)
-    def feedback3():
-        feedback = get_ai_feedback(3, input.answer3())
-        return ui.div(
-            ui.div(
-                ui.h3("AI Tutor Feedback", style="margin-top: 0; color: #2e7d32;"),
-                ui.markdown(feedback),
-                class_="feedback-box"
-            )
+    def mg_summary():
+        params = mg_params()
+        g_M = money_growth.schedule(
+            params["g_before"], params["g_after"], money_growth.DEFAULTS["shock_at"], int(params["horizon"]),
+            int(params["duration"]), int(params["ramp"]),
+        )
+        paths = money_growth.simulate(g_M, params["speed"], params["alpha"], params["gamma"])
+        shock = money_growth.DEFAULTS["shock_at"]
+        peak = shock + int(paths["output_growth"][0, shock:].argmax())
+        gap = abs(paths["inflation"][0] - g_M + money_growth.G_Y_NATURAL)
+        settled = [t for t in range(shock, len(g_M)) if (gap[t:] < 0.05).all()]
+        return ui.markdown(
+            f"Output growth peaks at **{paths['output_growth'][0, peak]:.2f}%** in year {peak}. "
+            f"The nominal rate moves from **{paths['nominal_rate'][0, shock - 1]:.2f}%** to "
+            f"**{paths['nominal_rate'][0, shock]:.2f}%** on impact and ends at "
+            f"**{paths['nominal_rate'][0, -1]:.2f}%**. "
+            + (f"Inflation is within 0.05 pp of g_M − g_Y* from year {settled[0]}." if settled
+               else "Inflation has not settled by the end of the horizon.")
         )
 
-app = App(app_ui, server)
+
+app = with_metrics(App(app_ui, server))
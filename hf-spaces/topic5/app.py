@@ -1,11 +1,30 @@
 from shiny import App, ui, render, reactive
 from groq import Groq
+import asyncio
 import os
 import pathlib
+import sys
 from dotenv import load_dotenv
 
+# Shared tutor modules live at the repository root; the sync workflow copies them next to app.py,
+# where the Space's /app/app.py has no repository root above it
+_APP = pathlib.Path(__file__).resolve()
+if len(_APP.parents) > 2:
+    sys.path.append(str(_APP.parents[2]))
+
+from answer_log import AnswerLog
+from budget import MAX_COMPLETION_TOKENS, TOKEN_BUDGET, estimate_tokens, with_metrics
+from concept_coverage import CoverageScorer, checklist_ui
+from misconceptions import MisconceptionLibrary
+from prescreen import prescreen
+from retrieval import format_passages, load_reading_index, reading_links
+
+import lucas
+
 load_dotenv()
 
+TOPIC = "topic5"
+
 def load_questions_from_qmd():
     qmd_path = pathlib.Path("topic5questions.qmd")
     if qmd_path.exists():
@@ -16,6 +35,13 @@ def load_questions_from_qmd():
             print(f"Warning: Could not load topic5questions.qmd: {e}")
     return None
 
+# Section-level BM25 index over the topic reading (memory-mapped after the first build)
+READINGS = load_reading_index("topic5reading.qmd")
+
+# Answers are logged for offline misconception clustering; reviewed clusters are served below
+ANSWER_LOG = AnswerLog()
+MISCONCEPTIONS = MisconceptionLibrary.for_topic(TOPIC)
+
 INDICATIVE_ANSWERS = {
     1: """Adaptive expectations backward-looking: use historical patterns to project future, ignoring structural breaks. Rational expectations forward-looking: agents use economic models and all available information about future exogenous variables to forecast endogenously determined variables. Key difference: rational agents anticipate announced changes; adaptive agents only gradually adjust. Example—predictable money increases have no real effects under rational expectations but temporary output effects under adaptive expectations.""",
     2: """Lucas AS equation: $Y_t - Y^* = \\kappa(P_t - E_{t-1}P_t)$. Output deviates from potential only when prices surprise agents. Explains Friedman's short-run effects: unpredictable money → price surprise → labour supply response → temporary output rise. Beyond Friedman: Lucas showed $\\kappa$ inversely related to monetary volatility, so more volatile policy produces smaller real output effects—agents learn to discount monetary noise.""",
@@ -23,6 +49,18 @@ INDICATIVE_ANSWERS = {
     4: """Systematic policy normally predictable, hence ineffective. But works when: (i) technology shocks persist over multiple periods, (ii) central bank observes shock magnitude immediately while public learns later. Central bank can condition future money on observed shock size via known rule. Public knows the rule but lacks current shock info, so cannot predict exact money expansion. Information asymmetry creates room for systematic policy to generate price surprises offsetting negative supply shocks.""",
 }
 
+TOPIC_CONCEPTS = {
+    1: "adaptive expectations, rational expectations, forward-looking behaviour, information set, expectation formation, Lucas critique",
+    2: "Lucas Aggregate Supply equation, price surprises, monetary policy, Friedman's expectations hypothesis, short-run vs long-run neutrality",
+    3: "monetary volatility, New Classical model, signal extraction, price surprises, output effects, information processing",
+    4: "systematic monetary policy, technology shocks, information asymmetry, policy rules, central bank information advantage",
+}
+
+COVERAGE = {
+    num: CoverageScorer(TOPIC_CONCEPTS.get(num, ""), answer)
+    for num, answer in INDICATIVE_ANSWERS.items()
+}
+
 def get_question_text(num):
     questions = {
         1: """**Question 1: Adaptive vs Rational Expectations**
@@ -40,21 +78,21 @@ Under what circumstances can a central bank use systematic monetary policy to st
     }
     return questions.get(num, "")
 
-def create_feedback_prompt(question_num, student_answer, indicative_answer):
+def create_feedback_prompt(question_num, student_answer, indicative_answer, passages=()):
     qmd_context = load_questions_from_qmd()
     context_note = ""
     if qmd_context:
         context_note = "\n\nNote: This question is from Topic 5 - New Classical Macroeconomics in EC3014 Monetary Economics."
     
-    topic_concepts = {
-        1: "adaptive expectations, rational expectations, forward-looking behaviour, information set, expectation formation, Lucas critique",
-        2: "Lucas Aggregate Supply equation, price surprises, monetary policy, Friedman's expectations hypothesis, short-run vs long-run neutrality",
-        3: "monetary volatility, New Classical model, signal extraction, price surprises, output effects, information processing",
-        4: "systematic monetary policy, technology shocks, information asymmetry, policy rules, central bank information advantage",
-    }
-    
-    key_concepts = topic_concepts.get(question_num, "Topic 5 concepts")
+    key_concepts = TOPIC_CONCEPTS.get(question_num, "Topic 5 concepts")
     
+    reading_context = ""
+    if passages:
+        reading_context = f"""
+RELEVANT SECTIONS OF THE TOPIC READING (use these to point the student to specific sections):
+{format_passages(passages)}
+"""
+
     return f"""You are an expert economics tutor providing feedback on a Monetary Economics question from Topic 5: New Classical Macroeconomics. Your goal is to help students improve their understanding by providing hints and guidance, NOT complete answers.
 
 Key concepts for this question: {key_concepts}
@@ -67,7 +105,7 @@ STUDENT'S ANSWER:
 
 INDICATIVE ANSWER (for your reference only - DO NOT share directly):
 {indicative_answer}
-
+{reading_context}
 INSTRUCTIONS:
 1. Identify what the student got right and acknowledge it
 2. If the answer is incomplete or has gaps, provide HINTS to guide them toward the correct reasoning
@@ -80,25 +118,53 @@ INSTRUCTIONS:
 
 Provide your feedback now:{context_note}"""
 
-def get_ai_feedback(question_num, student_answer):
+def get_ai_feedback(question_num, student_answer, session_id=None):
     if not student_answer.strip():
         return "Please provide an answer to receive feedback."
 
+    # Trivial answers get instant canned guidance instead of an LLM call
+    screened = prescreen(student_answer, get_question_text(question_num), TOPIC_CONCEPTS.get(question_num, ""))
+    if screened:
+        return screened[1]
+
+    ANSWER_LOG.record(TOPIC, question_num, session_id, student_answer)
+
+    # Recurring misconceptions get their tutor-reviewed template without an LLM call
+    known = MISCONCEPTIONS.match(question_num, student_answer)
+    if known:
+        return known.template
+
     try:
         api_key = os.environ.get("GROQ_API_KEY")
         if not api_key:
             return "Error: GROQ_API_KEY environment variable not set. Please set your Groq API key."
 
-        client = Groq(api_key=api_key)
         indicative_answer = INDICATIVE_ANSWERS.get(question_num, "")
-        prompt = create_feedback_prompt(question_num, student_answer, indicative_answer)
+        passages = READINGS.search(f"{get_question_text(question_num)}\n{student_answer}") if READINGS else []
+        prompt = create_feedback_prompt(question_num, student_answer, indicative_answer, passages)
 
-        message = client.chat.completions.create(
-            messages=[{"role": "user", "content": prompt}],
-            model="llama-3.3-70b-versatile",
+        # Charge the shared Groq quota before going upstream
+        admission = TOKEN_BUDGET.admit(
+            session_id, TOPIC, estimate_tokens(prompt) + MAX_COMPLETION_TOKENS
         )
+        if not admission.allowed:
+            return admission.message
 
-        return message.choices[0].message.content
+        client = Groq(api_key=api_key)
+
+        usage = None
+        try:
+            message = client.chat.completions.create(
+                messages=[{"role": "user", "content": prompt}],
+                model=admission.model,
+                max_tokens=MAX_COMPLETION_TOKENS,
+            )
+            usage = message.usage
+        finally:
+            # Settle the reservation to the actual spend, or release it if the call failed
+            TOKEN_BUDGET.record(session_id, TOPIC, admission.model, usage, admission)
+
+        return message.choices[0].message.content + reading_links(passages)
     except Exception as e:
         return f"Error getting feedback: {str(e)}. Make sure your GROQ_API_KEY environment variable is set correctly."
 
@@ -291,6 +357,7 @@ app_ui = ui.page_fluid(
         };
         """),
         ui.tags.script(src="https://cdn.jsdelivr.net/npm/mathjax@3/es5/tex-mml-chtml.js"),
+        ui.tags.script(src="https://cdn.plot.ly/plotly-2.35.2.min.js"),
         ui.tags.script("""
         function renderMath() {
           if (window.MathJax) {
@@ -333,6 +400,7 @@ app_ui = ui.page_fluid(
                         ui.input_action_button("submit1", "Get AI Feedback", class_="btn-primary"),
                         class_="answer-section"
                     ),
+                    ui.output_ui("coverage1"),
                     ui.output_ui("feedback1"),
                     class_="question-card"
                 )
@@ -347,6 +415,7 @@ app_ui = ui.page_fluid(
                         ui.input_action_button("submit2", "Get AI Feedback", class_="btn-primary"),
                         class_="answer-section"
                     ),
+                    ui.output_ui("coverage2"),
                     ui.output_ui("feedback2"),
                     class_="question-card"
                 )
@@ -361,6 +430,7 @@ app_ui = ui.page_fluid(
                         ui.input_action_button("submit3", "Get AI Feedback", class_="btn-primary"),
                         class_="answer-section"
                     ),
+                    ui.output_ui("coverage3"),
                     ui.output_ui("feedback3"),
                     class_="question-card"
                 )
@@ -375,62 +445,106 @@ app_ui = ui.page_fluid(
                         ui.input_action_button("submit4", "Get AI Feedback", class_="btn-primary"),
                         class_="answer-section"
                     ),
+                    ui.output_ui("coverage4"),
                     ui.output_ui("feedback4"),
                     class_="question-card"
                 )
             ),
+            ui.nav_panel(
+                "Lucas Islands Simulator",
+                ui.div(
+                    ui.markdown(
+                        "1,000 simulated islands are followed for 1,000 periods. Producers see only the price on "
+                        "their own island, which mixes an aggregate monetary shock with a relative demand shock. "
+                        "They learn from the data how "
+                        "much of a price rise to believe, and κ is then estimated from the simulated output and "
+                        "price surprises. Raise the volatility of money $\\sigma_m$ and watch κ fall (Question 3)."
+                    ),
+                    ui.layout_columns(
+                        ui.input_slider("lucas_sigma_m", "Monetary volatility σ_m", min=0.1, max=3.0, step=0.1, value=1.0),
+                        ui.input_slider("lucas_sigma_z", "Relative demand volatility σ_z", min=0.5, max=2.0, step=0.25, value=1.0),
+                        ui.input_slider("lucas_b", "Supply elasticity b", min=0.5, max=2.0, step=0.25, value=1.0),
+                        col_widths=(4, 4, 4),
+                    ),
+                    ui.div(id="lucas_plot", style="height: 450px;"),
+                    ui.tags.script("""
+                    document.addEventListener('DOMContentLoaded', function() {
+                      Shiny.addCustomMessageHandler('lucas-plot', function(fig) {
+                        Plotly.react('lucas_plot', fig.data, fig.layout, {responsive: true, displayModeBar: false});
+                      });
+                      document.addEventListener('shown.bs.tab', function() {
+                        if (document.getElementById('lucas_plot').data) { Plotly.Plots.resize('lucas_plot'); }
+                      });
+                    });
+                    """),
+                    ui.output_ui("lucas_summary"),
+                    class_="question-card"
+                )
+            ),
         ),
         class_="container-custom"
     )
 )
 
 def server(input, output, session):
-    @render.ui
-    @reactive.event(input.submit1)
-    def feedback1():
-        feedback = get_ai_feedback(1, input.answer1())
-        return ui.div(
-            ui.div(
-                ui.h3("AI Tutor Feedback", style="margin-top: 0; color: #2e7d32;"),
-                ui.markdown(feedback),
-                class_="feedback-box"
-            )
-        )
+    def question_outputs(num):
+        submit = input[f"submit{num}"]
+        answer = input[f"answer{num}"]
 
-    @render.ui
-    @reactive.event(input.submit2)
-    def feedback2():
-        feedback = get_ai_feedback(2, input.answer2())
-        return ui.div(
-            ui.div(
-                ui.h3("AI Tutor Feedback", style="margin-top: 0; color: #2e7d32;"),
-                ui.markdown(feedback),
-                class_="feedback-box"
-            )
-        )
+        @reactive.extended_task
+        async def feedback_task(student_answer):
+            # Run the Groq call off the event loop so the checklist is sent straight away
+            return await asyncio.to_thread(get_ai_feedback, num, student_answer, session.id)
 
-    @render.ui
-    @reactive.event(input.submit3)
-    def feedback3():
-        feedback = get_ai_feedback(3, input.answer3())
-        return ui.div(
-            ui.div(
-                ui.h3("AI Tutor Feedback", style="margin-top: 0; color: #2e7d32;"),
-                ui.markdown(feedback),
-                class_="feedback-box"
+        @reactive.effect
+        @reactive.event(submit)
+        def _submit():
+            feedback_task.invoke(answer())
+
+        @output(id=f"coverage{num}")
+        @render.ui
+        @reactive.event(submit)
+        def _coverage():
+            if not answer().strip():
+                return None
+            return checklist_ui(COVERAGE[num].score(answer()))
+
+        @output(id=f"feedback{num}")
+        @render.ui
+        def _feedback():
+            return ui.div(
+                ui.div(
+                    ui.h3("AI Tutor Feedback", style="margin-top: 0; color: #2e7d32;"),
+                    ui.markdown(feedback_task.result()),
+                    class_="feedback-box"
+                )
             )
-        )
+
+    for num in INDICATIVE_ANSWERS:
+        question_outputs(num)
+
+    @reactive.extended_task
+    async def lucas_task(sigma_z, b):
+        # Sweeps fan out over a process pool; parameter sets anyone has visited come from the disk memo
+        return await asyncio.to_thread(lucas.sweep, sigma_z, b)
+
+    @reactive.effect
+    def _run_lucas():
+        lucas_task.invoke(input.lucas_sigma_z(), input.lucas_b())
+
+    @reactive.effect
+    async def _draw_lucas():
+        await session.send_custom_message("lucas-plot", lucas.figure(lucas_task.result(), input.lucas_sigma_m()))
 
     @render.ui
-    @reactive.event(input.submit4)
-    def feedback4():
-        feedback = get_ai_feedback(4, input.answer4())
-        return ui.div(
-            ui.div(
-                ui.h3("AI Tutor Feedback", style="margin-top: 0; color: #2e7d32;"),
-                ui.markdown(feedback),
-                class_="feedback-box"
-            )
+    def lucas_summary():
+        current = lucas.nearest(lucas_task.result(), input.lucas_sigma_m())
+        return ui.markdown(
+            f"At σ_m = {current['sigma_m']:.1f}, producers attribute **{current['beta']:.0%}** of a local price "
+            f"movement to real demand. The estimated slope of the Lucas AS curve is **κ̂ = {current['kappa_hat']:.3f}** "
+            f"(closed form {current['kappa_theory']:.3f}), so an unanticipated 1% rise in money raises output by "
+            f"about {current['kappa_hat'] / (1 + current['kappa_hat']):.2f}%."
         )
 
-app = App(app_ui, server)
+
+app = with_metrics(App(app_ui, server))
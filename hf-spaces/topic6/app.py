@@ -1,11 +1,30 @@
 from shiny import App, ui, render, reactive
 from groq import Groq
+import asyncio
 import os
 import pathlib
+import sys
 from dotenv import load_dotenv
 
+# Shared tutor modules live at the repository root; the sync workflow copies them next to app.py,
+# where the Space's /app/app.py has no repository root above it
+_APP = pathlib.Path(__file__).resolve()
+if len(_APP.parents) > 2:
+    sys.path.append(str(_APP.parents[2]))
+
+from answer_log import AnswerLog
+from budget import MAX_COMPLETION_TOKENS, TOKEN_BUDGET, estimate_tokens, with_metrics
+from concept_coverage import CoverageScorer, checklist_ui
+from misconceptions import MisconceptionLibrary
+from prescreen import prescreen
+from retrieval import format_passages, load_reading_index, reading_links
+
+import barro_gordon
+
 load_dotenv()
 
+TOPIC = "topic6"
+
 def load_questions_from_qmd():
     qmd_path = pathlib.Path("topic6questions.qmd")
     if qmd_path.exists():
@@ -16,11 +35,28 @@ def load_questions_from_qmd():
             print(f"Warning: Could not load topic6questions.qmd: {e}")
     return None
 
+# Section-level BM25 index over the topic reading (memory-mapped after the first build)
+READINGS = load_reading_index("topic6reading.qmd")
+
+# Answers are logged for offline misconception clustering; reviewed clusters are served below
+ANSWER_LOG = AnswerLog()
+MISCONCEPTIONS = MisconceptionLibrary.for_topic(TOPIC)
+
 INDICATIVE_ANSWERS = {
     1: """CB's loss function: $L = \\frac{a}{2}\\pi^2 + \\frac{b}{2}(Y - Y^T)^2$. CB has output target $Y^T = Y^* + \\lambda$ above natural rate. If public expects $\\pi = \\frac{b\\kappa\\lambda}{a}$: accommodating yields loss $\\frac{b\\lambda^2}{2}[\\frac{b\\kappa^2}{a} + 1]$. Setting $\\pi=0$ causes recession $Y - Y^* = -\\kappa\\frac{b\\kappa\\lambda}{a}$, yielding quadratically larger real loss $\\frac{b\\lambda^2}{2}[\\frac{b\\kappa^2}{a} + 1]^2$. Since squared term dominates, CB prefers accommodating expected inflation despite output bias—this is the inflation bias paradox and time-inconsistency problem.""",
     2: """Fixed exchange rate forces money supply to match anchor currency, signaling commitment. But problems: (i) not obvious commitment signal, (ii) recurring deficits if rate set too low deplete reserves, (iii) loss of monetary autonomy to handle domestic shocks, (iv) speculative attacks if sustainability questioned. Alternatives: (i) adopt policy rules limiting discretion, (ii) appoint conservative inflation-hawk CB governor with public reputation for low-inflation commitment, (iii) tie CB officials' compensation to inflation targets (bonuses for low inflation, penalties for high), aligning personal incentives with price stability.""",
 }
 
+TOPIC_CONCEPTS = {
+    1: "central bank loss function, output bias, inflation bias, time-inconsistency, Lucas AS equation, inflation expectations, accommodation",
+    2: "fixed exchange rates, commitment mechanisms, monetary autonomy, balance-of-payments, policy rules, central banker reputation, incentive schemes",
+}
+
+COVERAGE = {
+    num: CoverageScorer(TOPIC_CONCEPTS.get(num, ""), answer)
+    for num, answer in INDICATIVE_ANSWERS.items()
+}
+
 def get_question_text(num):
     questions = {
         1: """**Question 1: Central Bank Loss Function and Inflation Bias**
@@ -32,19 +68,21 @@ Discuss the pros and cons for the central bank of a country which has been exper
     }
     return questions.get(num, "")
 
-def create_feedback_prompt(question_num, student_answer, indicative_answer):
+def create_feedback_prompt(question_num, student_answer, indicative_answer, passages=()):
     qmd_context = load_questions_from_qmd()
     context_note = ""
     if qmd_context:
         context_note = "\n\nNote: This question is from Topic 6 - Central Bank Credibility and Inflation Control in EC3014 Monetary Economics."
     
-    topic_concepts = {
-        1: "central bank loss function, output bias, inflation bias, time-inconsistency, Lucas AS equation, inflation expectations, accommodation",
-        2: "fixed exchange rates, commitment mechanisms, monetary autonomy, balance-of-payments, policy rules, central banker reputation, incentive schemes",
-    }
-    
-    key_concepts = topic_concepts.get(question_num, "Topic 6 concepts")
+    key_concepts = TOPIC_CONCEPTS.get(question_num, "Topic 6 concepts")
     
+    reading_context = ""
+    if passages:
+        reading_context = f"""
+RELEVANT SECTIONS OF THE TOPIC READING (use these to point the student to specific sections):
+{format_passages(passages)}
+"""
+
     return f"""You are an expert economics tutor providing feedback on a Monetary Economics question from Topic 6: Central Bank Credibility and Inflation Control. Your goal is to help students improve their understanding by providing hints and guidance, NOT complete answers.
 
 Key concepts for this question: {key_concepts}
@@ -57,7 +95,7 @@ STUDENT'S ANSWER:
 
 INDICATIVE ANSWER (for your reference only - DO NOT share directly):
 {indicative_answer}
-
+{reading_context}
 INSTRUCTIONS:
 1. Identify what the student got right and acknowledge it
 2. If the answer is incomplete or has gaps, provide HINTS to guide them toward the correct reasoning
@@ -70,25 +108,53 @@ INSTRUCTIONS:
 
 Provide your feedback now:{context_note}"""
 
-def get_ai_feedback(question_num, student_answer):
+def get_ai_feedback(question_num, student_answer, session_id=None):
     if not student_answer.strip():
         return "Please provide an answer to receive feedback."
 
+    # Trivial answers get instant canned guidance instead of an LLM call
+    screened = prescreen(student_answer, get_question_text(question_num), TOPIC_CONCEPTS.get(question_num, ""))
+    if screened:
+        return screened[1]
+
+    ANSWER_LOG.record(TOPIC, question_num, session_id, student_answer)
+
+    # Recurring misconceptions get their tutor-reviewed template without an LLM call
+    known = MISCONCEPTIONS.match(question_num, student_answer)
+    if known:
+        return known.template
+
     try:
         api_key = os.environ.get("GROQ_API_KEY")
         if not api_key:
             return "Error: GROQ_API_KEY environment variable not set. Please set your Groq API key."
 
-        client = Groq(api_key=api_key)
         indicative_answer = INDICATIVE_ANSWERS.get(question_num, "")
-        prompt = create_feedback_prompt(question_num, student_answer, indicative_answer)
+        passages = READINGS.search(f"{get_question_text(question_num)}\n{student_answer}") if READINGS else []
+        prompt = create_feedback_prompt(question_num, student_answer, indicative_answer, passages)
 
-        message = client.chat.completions.create(
-            messages=[{"role": "user", "content": prompt}],
-            model="llama-3.3-70b-versatile",
+        # Charge the shared Groq quota before going upstream
+        admission = TOKEN_BUDGET.admit(
+            session_id, TOPIC, estimate_tokens(prompt) + MAX_COMPLETION_TOKENS
         )
+        if not admission.allowed:
+            return admission.message
 
-        return message.choices[0].message.content
+        client = Groq(api_key=api_key)
+
+        usage = None
+        try:
+            message = client.chat.completions.create(
+                messages=[{"role": "user", "content": prompt}],
+                model=admission.model,
+                max_tokens=MAX_COMPLETION_TOKENS,
+            )
+            usage = message.usage
+        finally:
+            # Settle the reservation to the actual spend, or release it if the call failed
+            TOKEN_BUDGET.record(session_id, TOPIC, admission.model, usage, admission)
+
+        return message.choices[0].message.content + reading_links(passages)
     except Exception as e:
         return f"Error getting feedback: {str(e)}. Make sure your GROQ_API_KEY environment variable is set correctly."
 
@@ -281,6 +347,7 @@ app_ui = ui.page_fluid(
         };
         """),
         ui.tags.script(src="https://cdn.jsdelivr.net/npm/mathjax@3/es5/tex-mml-chtml.js"),
+        ui.tags.script(src="https://cdn.plot.ly/plotly-2.35.2.min.js"),
         ui.tags.script("""
         function renderMath() {
           if (window.MathJax) {
@@ -323,6 +390,7 @@ app_ui = ui.page_fluid(
                         ui.input_action_button("submit1", "Get AI Feedback", class_="btn-primary"),
                         class_="answer-section"
                     ),
+                    ui.output_ui("coverage1"),
                     ui.output_ui("feedback1"),
                     class_="question-card"
                 )
@@ -337,38 +405,112 @@ app_ui = ui.page_fluid(
                         ui.input_action_button("submit2", "Get AI Feedback", class_="btn-primary"),
                         class_="answer-section"
                     ),
+                    ui.output_ui("coverage2"),
                     ui.output_ui("feedback2"),
                     class_="question-card"
                 )
             ),
+            ui.nav_panel(
+                "Barro-Gordon Game",
+                ui.div(
+                    ui.markdown(
+                        "The grey lines are the central bank's loss contours in expected versus actual "
+                        "inflation. Its best response cuts the rational-expectations line at the discretionary "
+                        "equilibrium $\\pi = b\\kappa\\lambda/a$ (Question 1). Compare commitment, one-period cheating, "
+                        "reputation in the repeated game and a conservative central banker."
+                    ),
+                    ui.layout_columns(
+                        *[
+                            ui.input_slider(f"bg_{name}", label, min=start, max=stop, step=step, value=default)
+                            for name, (label, start, stop, step, default) in barro_gordon.AXES.items()
+                        ],
+                        col_widths=(4, 4, 4, 4, 4, 4),
+                    ),
+                    ui.div(id="bg_plot", style="height: 480px;"),
+                    ui.tags.script("""
+                    document.addEventListener('DOMContentLoaded', function() {
+                      Shiny.addCustomMessageHandler('bg-plot', function(fig) {
+                        Plotly.react('bg_plot', fig.data, fig.layout, {responsive: true, displayModeBar: false});
+                      });
+                      document.addEventListener('shown.bs.tab', function() {
+                        if (document.getElementById('bg_plot').data) { Plotly.Plots.resize('bg_plot'); }
+                      });
+                    });
+                    """),
+                    ui.output_ui("bg_summary"),
+                    class_="question-card"
+                )
+            ),
         ),
         class_="container-custom"
     )
 )
 
 def server(input, output, session):
-    @render.ui
-    @reactive.event(input.submit1)
-    def feedback1():
-        feedback = get_ai_feedback(1, input.answer1())
-        return ui.div(
-            ui.div(
-                ui.h3("AI Tutor Feedback", style="margin-top: 0; color: #2e7d32;"),
-                ui.markdown(feedback),
-                class_="feedback-box"
+    def question_outputs(num):
+        submit = input[f"submit{num}"]
+        answer = input[f"answer{num}"]
+
+        @reactive.extended_task
+        async def feedback_task(student_answer):
+            # Run the Groq call off the event loop so the checklist is sent straight away
+            return await asyncio.to_thread(get_ai_feedback, num, student_answer, session.id)
+
+        @reactive.effect
+        @reactive.event(submit)
+        def _submit():
+            feedback_task.invoke(answer())
+
+        @output(id=f"coverage{num}")
+        @render.ui
+        @reactive.event(submit)
+        def _coverage():
+            if not answer().strip():
+                return None
+            return checklist_ui(COVERAGE[num].score(answer()))
+
+        @output(id=f"feedback{num}")
+        @render.ui
+        def _feedback():
+            return ui.div(
+                ui.div(
+                    ui.h3("AI Tutor Feedback", style="margin-top: 0; color: #2e7d32;"),
+                    ui.markdown(feedback_task.result()),
+                    class_="feedback-box"
+                )
             )
-        )
+
+    for num in INDICATIVE_ANSWERS:
+        question_outputs(num)
+
+    @reactive.calc
+    def bg_panel():
+        # Rounded so slider floats hit the same LRU entry; a miss solves in about a millisecond
+        return barro_gordon.panel(*(round(input[f"bg_{name}"](), 4) for name in barro_gordon.AXES))
+
+    @reactive.effect
+    async def _draw_bg():
+        await session.send_custom_message("bg-plot", bg_panel()[0])
 
     @render.ui
-    @reactive.event(input.submit2)
-    def feedback2():
-        feedback = get_ai_feedback(2, input.answer2())
+    def bg_summary():
+        _, summary, a_c, threshold, (loss_discretion, loss_conservative) = bg_panel()
+        rows = "".join(
+            f"<tr><td>{name}</td><td>{pi:.3f}</td><td>{loss:.3f}</td></tr>" for name, (pi, loss) in summary.items()
+        )
         return ui.div(
-            ui.div(
-                ui.h3("AI Tutor Feedback", style="margin-top: 0; color: #2e7d32;"),
-                ui.markdown(feedback),
-                class_="feedback-box"
-            )
+            ui.HTML(
+                "<table class='table table-sm' style='max-width: 480px;'>"
+                "<thead><tr><th>Regime</th><th>Inflation π</th><th>Loss (no shocks)</th></tr></thead>"
+                f"<tbody>{rows}</tbody></table>"
+            ),
+            ui.markdown(
+                f"Zero inflation is sustainable by reputation once δ ≥ **{threshold:.2f}**. "
+                f"With supply shocks, the best conservative banker has inflation weight "
+                f"**a_c = {a_c:.2f}** ({a_c / input.bg_a():.1f} × society's). Expected loss is "
+                f"**{loss_conservative:.3f}**, against **{loss_discretion:.3f}** under discretion."
+            ),
         )
 
-app = App(app_ui, server)
+
+app = with_metrics(App(app_ui, server))
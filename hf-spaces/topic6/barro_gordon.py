@@ -0,0 +1,160 @@
+"""Barro-Gordon time-inconsistency game, solved in closed form over parameter grids.
+
+Output follows the Lucas supply curve ``Y = Y* + κ(π - πᵉ) + ε`` and the
+central bank minimises ``L = a/2 π² + b/2 (Y - Y*  - λ)²``, where ``λ`` is the
+gap between its output target and the natural level. The regimes are:
+
+- discretion: the public expects the bank's best response, so ``π = bκλ/a``;
+- commitment: ``π = 0`` with loss ``bλ²/2``;
+- cheating: ``πᵉ = 0`` and the bank best-responds;
+- reputation: a trigger strategy in which the public reverts to discretion
+  forever after a surprise. The lowest inflation sustainable at discount
+  factor ``δ`` is found on a grid of candidate rates;
+- conservative central banker (Rogoff): the bank's inflation weight is
+  delegated to ``a_c``. With supply shocks of standard deviation ``σ``, the
+  socially optimal ``a_c`` trades the inflation bias against stabilisation.
+
+Every function broadcasts over NumPy arrays, so whole parameter grids solve in
+one call. ``panel`` builds the loss-contour / best-response figure for one
+slider setting and keeps it in an LRU cache.
+"""
+
+from functools import lru_cache
+
+import numpy as np
+
+# Slider axes: (label, start, stop, step, default)
+AXES = {
+    "a": ("Inflation aversion a", 0.5, 3.0, 0.25, 1.0),
+    "b": ("Output weight b", 0.5, 3.0, 0.25, 1.0),
+    "kappa": ("Phillips-curve slope κ", 0.25, 2.0, 0.25, 1.0),
+    "lam": ("Output ambition λ", 0.25, 3.0, 0.25, 1.0),
+    "delta": ("Discount factor δ", 0.05, 0.95, 0.05, 0.5),
+    "sigma": ("Supply-shock s.d. σ", 0.0, 2.0, 0.25, 1.0),
+}
+
+CONTOUR_POINTS = 61
+_CANDIDATES = np.linspace(0.0, 1.0, 201)
+_DELEGATION = np.linspace(1.0, 10.0, 181)
+
+
+def loss(pi, pi_e, a, b, kappa, lam):
+    return a / 2 * pi**2 + b / 2 * (kappa * (pi - pi_e) - lam) ** 2
+
+
+def best_response(pi_e, a, b, kappa, lam):
+    """The bank's optimal inflation given expectations ``pi_e``."""
+    return b * kappa * (kappa * pi_e + lam) / (a + b * kappa**2)
+
+
+def discretion(a, b, kappa, lam):
+    return b * kappa * lam / a
+
+
+def reputation_threshold(a, b, kappa):
+    """Smallest δ at which zero inflation is sustainable under the trigger strategy."""
+    return a / (2 * a + b * kappa**2)
+
+
+def reputation(a, b, kappa, lam, delta):
+    """Lowest inflation sustainable by reputation, searched over a grid of candidate rates."""
+    a, b, kappa, lam, delta = np.broadcast_arrays(*map(np.asarray, (a, b, kappa, lam, delta)))
+    pi_d = discretion(a, b, kappa, lam)[..., None]
+    pi_bar = _CANDIDATES * pi_d
+    args = (a[..., None], b[..., None], kappa[..., None], lam[..., None])
+    on_path = loss(pi_bar, pi_bar, *args)
+    temptation = on_path - loss(best_response(pi_bar, *args), pi_bar, *args)
+    punishment = loss(pi_d, pi_d, *args) - on_path
+    d = delta[..., None]
+    sustainable = temptation * (1 - d) <= d * punishment + 1e-12
+    first = sustainable.argmax(axis=-1)
+    return np.take_along_axis(pi_bar, first[..., None], axis=-1)[..., 0]
+
+
+def expected_social_loss(a_c, a, b, kappa, lam, sigma):
+    """Society's expected loss when a bank with inflation weight ``a_c`` runs policy."""
+    stabilise = a_c + b * kappa**2
+    inflation = (b * kappa * lam / a_c) ** 2 + (b * kappa / stabilise) ** 2 * sigma**2
+    output = lam**2 + (a_c / stabilise) ** 2 * sigma**2
+    return a / 2 * inflation + b / 2 * output
+
+
+def conservative(a, b, kappa, lam, sigma):
+    """Rogoff's optimal delegated weight ``a_c`` and the resulting average inflation."""
+    a, b, kappa, lam, sigma = np.broadcast_arrays(*map(np.asarray, (a, b, kappa, lam, sigma)))
+    a_c = a[..., None] * _DELEGATION
+    losses = expected_social_loss(a_c, a[..., None], b[..., None], kappa[..., None], lam[..., None], sigma[..., None])
+    best = np.take_along_axis(a_c, losses.argmin(axis=-1)[..., None], axis=-1)[..., 0]
+    return best, discretion(best, b, kappa, lam)
+
+
+def equilibria(a, b, kappa, lam, delta, sigma):
+    """Inflation and (shock-free) loss in every regime; all arguments broadcast."""
+    pi_d = discretion(a, b, kappa, lam)
+    pi_cheat = best_response(0.0, a, b, kappa, lam)
+    pi_rep = reputation(a, b, kappa, lam, delta)
+    a_c, pi_cons = conservative(a, b, kappa, lam, sigma)
+    return {
+        "discretion": (pi_d, loss(pi_d, pi_d, a, b, kappa, lam)),
+        "commitment": (np.zeros_like(pi_d), loss(0.0, 0.0, a, b, kappa, lam)),
+        "cheating": (pi_cheat, loss(pi_cheat, 0.0, a, b, kappa, lam)),
+        "reputation": (pi_rep, loss(pi_rep, pi_rep, a, b, kappa, lam)),
+        "conservative": (pi_cons, loss(pi_cons, pi_cons, a, b, kappa, lam)),
+        "a_c": a_c,
+        # With supply shocks: what delegation gains on bias versus loses on stabilisation
+        "shock_loss": (expected_social_loss(a, a, b, kappa, lam, sigma), expected_social_loss(a_c, a, b, kappa, lam, sigma)),
+    }
+
+
+def _round(values):
+    return np.round(np.asarray(values, dtype=float), 4).tolist()
+
+
+@lru_cache(maxsize=512)
+def panel(a, b, kappa, lam, delta, sigma):
+    """Plotly figure dict and summary numbers for one slider setting."""
+    eq = equilibria(a, b, kappa, lam, delta, sigma)
+    pi_d = float(eq["discretion"][0])
+    top = max(1.5 * pi_d, 0.5)
+    grid = np.linspace(-0.1 * top, top, CONTOUR_POINTS)
+    pi_e, pi = np.meshgrid(grid, grid)
+    surface = loss(pi, pi_e, a, b, kappa, lam)
+    a_c = float(eq["a_c"])
+
+    points = {
+        "Discretion": (pi_d, pi_d, "#d62728"),
+        "Commitment": (0.0, 0.0, "#2ca02c"),
+        "Cheating": (0.0, float(eq["cheating"][0]), "#ff7f0e"),
+        "Reputation": (float(eq["reputation"][0]), float(eq["reputation"][0]), "#1f77b4"),
+        "Conservative banker": (float(eq["conservative"][0]), float(eq["conservative"][0]), "#9467bd"),
+    }
+    data = [
+        {"type": "contour", "x": _round(grid), "y": _round(grid), "z": _round(surface), "showscale": False,
+         "contours": {"coloring": "lines"}, "colorscale": "Greys", "ncontours": 18, "name": "Loss contours",
+         "hoverinfo": "skip"},
+        {"x": _round(grid), "y": _round(best_response(grid, a, b, kappa, lam)), "mode": "lines",
+         "name": "Bank's best response", "line": {"color": "#d62728", "width": 3}},
+        {"x": _round(grid), "y": _round(best_response(grid, a_c, b, kappa, lam)), "mode": "lines",
+         "name": "Conservative bank's best response", "line": {"color": "#9467bd", "dash": "dash"}},
+        {"x": _round(grid), "y": _round(grid), "mode": "lines", "name": "Rational expectations πᵉ = π",
+         "line": {"color": "black", "dash": "dot"}},
+    ]
+    for name, (x, y, colour) in points.items():
+        data.append({"x": [round(x, 4)], "y": [round(y, 4)], "mode": "markers", "name": name,
+                     "marker": {"size": 13, "color": colour, "line": {"width": 1, "color": "white"}}})
+    figure = {
+        "data": data,
+        "layout": {
+            "height": 480,
+            "margin": {"t": 30, "b": 40, "l": 50, "r": 20},
+            "xaxis": {"title": {"text": "Expected inflation πᵉ"}, "range": [float(grid[0]), float(grid[-1])]},
+            "yaxis": {"title": {"text": "Inflation π"}, "range": [float(grid[0]), float(grid[-1])], "scaleanchor": "x"},
+            "legend": {"orientation": "v", "x": 1.02, "y": 1},
+        },
+    }
+    summary = {name: (float(eq[key][0]), float(eq[key][1])) for name, key in (
+        ("Discretion", "discretion"), ("Commitment", "commitment"), ("Cheating (one period)", "cheating"),
+        ("Reputation", "reputation"), ("Conservative banker", "conservative"),
+    )}
+    shock_loss = tuple(float(v) for v in eq["shock_loss"])
+    return figure, summary, a_c, float(reputation_threshold(a, b, kappa)), shock_loss
@@ -1,11 +1,30 @@
 from shiny import App, ui, render, reactive
 from groq import Groq
+import asyncio
 import os
 import pathlib
+import sys
 from dotenv import load_dotenv
 
+# Shared tutor modules live at the repository root; the sync workflow copies them next to app.py,
+# where the Space's /app/app.py has no repository root above it
+_APP = pathlib.Path(__file__).resolve()
+if len(_APP.parents) > 2:
+    sys.path.append(str(_APP.parents[2]))
+
+from answer_log import AnswerLog
+from budget import MAX_COMPLETION_TOKENS, TOKEN_BUDGET, estimate_tokens, with_metrics
+from concept_coverage import CoverageScorer, checklist_ui
+from misconceptions import MisconceptionLibrary
+from prescreen import prescreen
+from retrieval import format_passages, load_reading_index, reading_links
+
+import nk
+
 load_dotenv()
 
+TOPIC = "topic7"
+
 def load_questions_from_qmd():
     qmd_path = pathlib.Path("topic7questions.qmd")
     if qmd_path.exists():
@@ -16,12 +35,30 @@ def load_questions_from_qmd():
             print(f"Warning: Could not load topic7questions.qmd: {e}")
     return None
 
+# Section-level BM25 index over the topic reading (memory-mapped after the first build)
+READINGS = load_reading_index("topic7reading.qmd")
+
+# Answers are logged for offline misconception clustering; reviewed clusters are served below
+ANSWER_LOG = AnswerLog()
+MISCONCEPTIONS = MisconceptionLibrary.for_topic(TOPIC)
+
 INDICATIVE_ANSWERS = {
     1: """Two key problems: (i) Central banks control only the monetary base (M₀), but broader money aggregates (M₁, M₂) include demand deposits created by commercial banks. The money multiplier depends on bank reserve decisions and public preferences, which are unstable. (ii) Money demand is not stable—financial innovation (money market funds, sweep accounts), payment technology changes (credit cards, digital payments), and deregulation shifted money demand unpredictably. Without stable money demand, targeting money growth didn't reliably control inflation. These problems motivated shift to interest rate targeting.""",
     2: """Three key problems: (i) Deflation risk—inflation fluctuates around target; with zero target, deflation risk is high and one-sided. Deflation is self-reinforcing and triggers zero lower bound, making monetary policy ineffective. (ii) Interest rate constraint—with 2% target, CB has buffer before hitting zero bound; with zero target, little room to cut rates during recessions. (iii) Wage adjustment mechanism—positive inflation allows real wage falls without nominal cuts. Workers resist nominal wage cuts; moderate inflation (e.g. 2%) erodes real wages naturally, helping labour markets clear during downturns. Zero inflation requires explicit wage cuts, prolonging unemployment.""",
     3: """Policy rate is overnight lending rate between CB and banks; primary instrument for most central banks. Three transmission channels: (i) Credit channel (indirect)—rate ↑ → bank lending rates ↑ → investment/spending ↓ → labour/goods demand ↓ → wages/prices ↓; (ii) Expectations channel (direct)—rate ↑ → CB signals π will ↓ → wage/price setters expect lower inflation → moderate wage/price setting → π↓ (faster); (iii) Exchange rate channel—rate ↑ → foreign capital inflows → currency appreciates → import prices ↓ → π↓. See diagram for all three channels operating simultaneously.""",
 }
 
+TOPIC_CONCEPTS = {
+    1: "monetary base, money supply, money multiplier, financial innovation, money demand stability, commercial banks, interest rate targeting",
+    2: "zero inflation, deflation risk, zero lower bound, nominal interest rates, wage rigidity, real wages, labour market adjustment",
+    3: "policy interest rate, transmission channels, credit channel, expectations channel, exchange rate channel, inflation dynamics",
+}
+
+COVERAGE = {
+    num: CoverageScorer(TOPIC_CONCEPTS.get(num, ""), answer)
+    for num, answer in INDICATIVE_ANSWERS.items()
+}
+
 def get_question_text(num):
     questions = {
         1: """**Question 1: Problems Leading to Abandonment of Money Supply Targeting**
@@ -36,20 +73,21 @@ What instrument is normally used to keep inflation close to its target and throu
     }
     return questions.get(num, "")
 
-def create_feedback_prompt(question_num, student_answer, indicative_answer):
+def create_feedback_prompt(question_num, student_answer, indicative_answer, passages=()):
     qmd_context = load_questions_from_qmd()
     context_note = ""
     if qmd_context:
         context_note = "\n\nNote: This question is from Topic 7 - Monetary Policy Instruments and Inflation Targeting in EC3014 Monetary Economics."
     
-    topic_concepts = {
-        1: "monetary base, money supply, money multiplier, financial innovation, money demand stability, commercial banks, interest rate targeting",
-        2: "zero inflation, deflation risk, zero lower bound, nominal interest rates, wage rigidity, real wages, labour market adjustment",
-        3: "policy interest rate, transmission channels, credit channel, expectations channel, exchange rate channel, inflation dynamics",
-    }
-    
-    key_concepts = topic_concepts.get(question_num, "Topic 7 concepts")
+    key_concepts = TOPIC_CONCEPTS.get(question_num, "Topic 7 concepts")
     
+    reading_context = ""
+    if passages:
+        reading_context = f"""
+RELEVANT SECTIONS OF THE TOPIC READING (use these to point the student to specific sections):
+{format_passages(passages)}
+"""
+
     return f"""You are an expert economics tutor providing feedback on a Monetary Economics question from Topic 7: Monetary Policy Instruments and Inflation Targeting. Your goal is to help students improve their understanding by providing hints and guidance, NOT complete answers.
 
 Key concepts for this question: {key_concepts}
@@ -62,7 +100,7 @@ STUDENT'S ANSWER:
 
 INDICATIVE ANSWER (for your reference only - DO NOT share directly):
 {indicative_answer}
-
+{reading_context}
 INSTRUCTIONS:
 1. Identify what the student got right and acknowledge it
 2. If the answer is incomplete or has gaps, provide HINTS to guide them toward the correct reasoning
@@ -75,25 +113,53 @@ INSTRUCTIONS:
 
 Provide your feedback now:{context_note}"""
 
-def get_ai_feedback(question_num, student_answer):
+def get_ai_feedback(question_num, student_answer, session_id=None):
     if not student_answer.strip():
         return "Please provide an answer to receive feedback."
 
+    # Trivial answers get instant canned guidance instead of an LLM call
+    screened = prescreen(student_answer, get_question_text(question_num), TOPIC_CONCEPTS.get(question_num, ""))
+    if screened:
+        return screened[1]
+
+    ANSWER_LOG.record(TOPIC, question_num, session_id, student_answer)
+
+    # Recurring misconceptions get their tutor-reviewed template without an LLM call
+    known = MISCONCEPTIONS.match(question_num, student_answer)
+    if known:
+        return known.template
+
     try:
         api_key = os.environ.get("GROQ_API_KEY")
         if not api_key:
             return "Error: GROQ_API_KEY environment variable not set. Please set your Groq API key."
 
-        client = Groq(api_key=api_key)
         indicative_answer = INDICATIVE_ANSWERS.get(question_num, "")
-        prompt = create_feedback_prompt(question_num, student_answer, indicative_answer)
+        passages = READINGS.search(f"{get_question_text(question_num)}\n{student_answer}") if READINGS else []
+        prompt = create_feedback_prompt(question_num, student_answer, indicative_answer, passages)
 
-        message = client.chat.completions.create(
-            messages=[{"role": "user", "content": prompt}],
-            model="llama-3.3-70b-versatile",
+        # Charge the shared Groq quota before going upstream
+        admission = TOKEN_BUDGET.admit(
+            session_id, TOPIC, estimate_tokens(prompt) + MAX_COMPLETION_TOKENS
         )
+        if not admission.allowed:
+            return admission.message
+
+        client = Groq(api_key=api_key)
+
+        usage = None
+        try:
+            message = client.chat.completions.create(
+                messages=[{"role": "user", "content": prompt}],
+                model=admission.model,
+                max_tokens=MAX_COMPLETION_TOKENS,
+            )
+            usage = message.usage
+        finally:
+            # Settle the reservation to the actual spend, or release it if the call failed
+            TOKEN_BUDGET.record(session_id, TOPIC, admission.model, usage, admission)
 
-        return message.choices[0].message.content
+        return message.choices[0].message.content + reading_links(passages)
     except Exception as e:
         return f"Error getting feedback: {str(e)}. Make sure your GROQ_API_KEY environment variable is set correctly."
 
@@ -286,6 +352,7 @@ app_ui = ui.page_fluid(
         };
         """),
         ui.tags.script(src="https://cdn.jsdelivr.net/npm/mathjax@3/es5/tex-mml-chtml.js"),
+        ui.tags.script(src="https://cdn.plot.ly/plotly-2.35.2.min.js"),
         ui.tags.script("""
         function renderMath() {
           if (window.MathJax) {
@@ -328,6 +395,7 @@ app_ui = ui.page_fluid(
                         ui.input_action_button("submit1", "Get AI Feedback", class_="btn-primary"),
                         class_="answer-section"
                     ),
+                    ui.output_ui("coverage1"),
                     ui.output_ui("feedback1"),
                     class_="question-card"
                 )
@@ -342,6 +410,7 @@ app_ui = ui.page_fluid(
                         ui.input_action_button("submit2", "Get AI Feedback", class_="btn-primary"),
                         class_="answer-section"
                     ),
+                    ui.output_ui("coverage2"),
                     ui.output_ui("feedback2"),
                     class_="question-card"
                 )
@@ -356,38 +425,107 @@ app_ui = ui.page_fluid(
                         ui.input_action_button("submit3", "Get AI Feedback", class_="btn-primary"),
                         class_="answer-section"
                     ),
+                    ui.output_ui("coverage3"),
                     ui.output_ui("feedback3"),
                     class_="question-card"
                 )
             ),
+            ui.nav_panel(
+                "Policy Rate Simulator",
+                ui.div(
+                    ui.markdown(
+                        "Impulse responses to a one percentage point monetary policy shock, a rise in the Taylor-rule "
+                        "disturbance v, in a small New Keynesian model (Question 3). The policy rate rises by less, "
+                        "because the rule also responds to the fall in output and inflation. The dashed lines switch off the credit, exchange-rate and "
+                        "expectations channels one at a time; the gap to the solid line is that channel's contribution. "
+                        "Change the Taylor-rule coefficients to see how a more aggressive or smoother rule alters the transmission."
+                    ),
+                    ui.layout_columns(
+                        *[
+                            ui.input_slider(f"nk_{name}", label, min=start, max=stop, step=step, value=default)
+                            for name, (label, start, stop, step, default) in nk.AXES.items()
+                        ],
+                        col_widths=(4, 4, 4),
+                    ),
+                    ui.div(id="nk_plot", style="height: 560px;"),
+                    ui.tags.script(f"""
+                    document.addEventListener('DOMContentLoaded', function() {{
+                      const fig = {nk.figure_json()};
+                      Plotly.newPlot('nk_plot', fig.data, fig.layout, {{responsive: true, displayModeBar: false}});
+                      Shiny.addCustomMessageHandler('nk-restyle', function(msg) {{
+                        Plotly.restyle('nk_plot', msg.update, msg.traces);
+                      }});
+                      document.addEventListener('shown.bs.tab', function() {{ Plotly.Plots.resize('nk_plot'); }});
+                    }});
+                    """),
+                    ui.output_ui("nk_summary"),
+                    class_="question-card"
+                )
+            ),
         ),
         class_="container-custom"
     )
 )
 
 def server(input, output, session):
-    @render.ui
-    @reactive.event(input.submit1)
-    def feedback1():
-        feedback = get_ai_feedback(1, input.answer1())
-        return ui.div(
-            ui.div(
-                ui.h3("AI Tutor Feedback", style="margin-top: 0; color: #2e7d32;"),
-                ui.markdown(feedback),
-                class_="feedback-box"
+    def question_outputs(num):
+        submit = input[f"submit{num}"]
+        answer = input[f"answer{num}"]
+
+        @reactive.extended_task
+        async def feedback_task(student_answer):
+            # Run the Groq call off the event loop so the checklist is sent straight away
+            return await asyncio.to_thread(get_ai_feedback, num, student_answer, session.id)
+
+        @reactive.effect
+        @reactive.event(submit)
+        def _submit():
+            feedback_task.invoke(answer())
+
+        @output(id=f"coverage{num}")
+        @render.ui
+        @reactive.event(submit)
+        def _coverage():
+            if not answer().strip():
+                return None
+            return checklist_ui(COVERAGE[num].score(answer()))
+
+        @output(id=f"feedback{num}")
+        @render.ui
+        def _feedback():
+            return ui.div(
+                ui.div(
+                    ui.h3("AI Tutor Feedback", style="margin-top: 0; color: #2e7d32;"),
+                    ui.markdown(feedback_task.result()),
+                    class_="feedback-box"
+                )
             )
-        )
+
+    for num in INDICATIVE_ANSWERS:
+        question_outputs(num)
+
+    @reactive.calc
+    def nk_index():
+        # Every rule on the slider grid was solved at startup, so this is a lookup
+        return nk.grid_index(**{name: input[f"nk_{name}"]() for name in nk.AXES})
+
+    @reactive.effect
+    async def _patch_nk():
+        await session.send_custom_message("nk-restyle", nk.restyle(nk_index()))
 
     @render.ui
-    @reactive.event(input.submit2)
-    def feedback2():
-        feedback = get_ai_feedback(2, input.answer2())
-        return ui.div(
-            ui.div(
-                ui.h3("AI Tutor Feedback", style="margin-top: 0; color: #2e7d32;"),
-                ui.markdown(feedback),
-                class_="feedback-box"
-            )
-        )
+    def nk_summary():
+        irf = nk.responses(nk_index())
+        full = irf[0]
+        lines = [
+            f"Output troughs at **{full[:, 0].min():.2f}%** and inflation at **{full[:, 1].min():.2f} pp** "
+            f"in the full model. Contributions to the first-year fall in inflation:"
+        ]
+        for v, (name, *_) in enumerate(nk.VARIANTS[1:], start=1):
+            channel = name.removeprefix("No ").removesuffix(" channel")
+            contribution = full[:4, 1].sum() - irf[v, :4, 1].sum()
+            lines.append(f"- {channel}: {contribution:+.2f} pp")
+        return ui.markdown("\n".join(lines))
+
 
-app = App(app_ui, server)
+app = with_metrics(App(app_ui, server))
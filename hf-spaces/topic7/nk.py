@@ -0,0 +1,182 @@
+"""Three-equation New Keynesian model with credit, exchange-rate and expectations channels.
+
+Quarterly log-deviations; ``r^L = (1 + χ) i`` is the lending rate and ``q`` the
+real exchange rate (a rise is a depreciation)::
+
+    IS      y = e E y' - σ (r^L - e E π') + δ q
+    PC      π = e β E π' + κ y + ω q
+    UIP     q = e E q' - (i - e E π')
+    Taylor  i = ρ i₋₁ + (1 - ρ)(φ_π π + φ_y y) + v,    v' = ρ_v v + ε
+
+``e`` switches the expectations terms on or off, ``χ`` the credit channel and
+``δ, ω`` the exchange-rate channel. A channel's contribution is the full
+impulse response minus the response with that channel switched off.
+
+The model is solved by time iteration on the linear policy ``x = F s``, with
+jumps ``x = (y, π, q, i)`` and states ``s = (i₋₁, v)``. The iteration is
+batched: every system is a row in stacked matrices and each step is one
+``np.linalg.solve``. All rule coefficients on the slider grid are solved
+with every channel variant at import, and the impulse responses are kept in
+one array. A slider move is then an index lookup.
+"""
+
+import numpy as np
+
+SIGMA = 1.0
+BETA = 0.99
+KAPPA = 0.1
+CHI = 0.5
+DELTA_Q = 0.1
+OMEGA = 0.05
+RHO_V = 0.5
+HORIZON = 20
+
+# Slider axes: (label, start, stop, step, default)
+AXES = {
+    "phi_pi": ("Inflation response φ_π", 1.1, 3.0, 0.1, 1.5),
+    "phi_y": ("Output response φ_y", 0.0, 1.5, 0.1, 0.5),
+    "rho": ("Interest-rate smoothing ρ", 0.0, 0.9, 0.1, 0.7),
+}
+
+# (name, expectations on, credit χ, exchange-rate channel on)
+VARIANTS = [
+    ("Full model", 1.0, CHI, 1.0),
+    ("No credit channel", 1.0, 0.0, 1.0),
+    ("No exchange-rate channel", 1.0, CHI, 0.0),
+    ("No expectations channel", 0.0, CHI, 1.0),
+]
+VARIABLES = ["Output gap y", "Inflation π", "Real exchange rate q", "Policy rate i"]
+
+
+def axis(name):
+    _, start, stop, step, _ = AXES[name]
+    return np.round(np.arange(start, stop + step / 2, step), 6)
+
+
+def _system(phi_pi, phi_y, rho, e, chi, fx):
+    """Stacked ``A0 x = A1 E x' + B s`` matrices, one system per row of the inputs."""
+    n = len(phi_pi)
+    A0 = np.zeros((n, 4, 4))
+    A1 = np.zeros((n, 4, 4))
+    B = np.zeros((n, 4, 2))
+    y, pi, q, i = range(4)
+    # IS
+    A0[:, 0, y] = 1.0
+    A0[:, 0, i] = SIGMA * (1.0 + chi)
+    A0[:, 0, q] = -DELTA_Q * fx
+    A1[:, 0, y] = e
+    A1[:, 0, pi] = SIGMA * e
+    # Phillips curve
+    A0[:, 1, pi] = 1.0
+    A0[:, 1, y] = -KAPPA
+    A0[:, 1, q] = -OMEGA * fx
+    A1[:, 1, pi] = BETA * e
+    # UIP
+    A0[:, 2, q] = 1.0
+    A0[:, 2, i] = 1.0
+    A1[:, 2, q] = e
+    A1[:, 2, pi] = e
+    # Taylor rule
+    A0[:, 3, i] = 1.0
+    A0[:, 3, pi] = -(1.0 - rho) * phi_pi
+    A0[:, 3, y] = -(1.0 - rho) * phi_y
+    B[:, 3, 0] = rho
+    B[:, 3, 1] = 1.0
+    return A0, A1, B
+
+
+def _transition(F):
+    """State law of motion ``s' = M s`` implied by policy ``F``: i₋₁' = i, v' = ρ_v v."""
+    M = np.zeros((F.shape[0], 2, 2))
+    M[:, 0, :] = F[:, 3, :]
+    M[:, 1, 1] = RHO_V
+    return M
+
+
+def solve(phi_pi, phi_y, rho, e, chi, fx, iterations=2000, tol=1e-10):
+    """Policy matrices ``F`` (n x 4 x 2) for a batch of systems; NaN rows did not converge."""
+    A0, A1, B = _system(*np.broadcast_arrays(*map(np.atleast_1d, (phi_pi, phi_y, rho, e, chi, fx))))
+    F = np.zeros_like(B)
+    for _ in range(iterations):
+        updated = np.linalg.solve(A0, A1 @ F @ _transition(F) + B)
+        if np.nanmax(np.abs(updated - F)) < tol:
+            F = updated
+            break
+        F = updated
+    F[~np.isfinite(F).all(axis=(1, 2)) | (np.abs(F) > 1e6).any(axis=(1, 2))] = np.nan
+    return F
+
+
+def impulse_responses(F, horizon=HORIZON, shock=1.0):
+    """Responses to a monetary policy disturbance ``ε = shock``: array of shape (n, horizon, 4).
+
+    The shock moves the Taylor-rule residual ``v``; the policy rate itself
+    rises by less, because the rule also responds to the fall in output and
+    inflation.
+    """
+    M = _transition(F)
+    s = np.zeros((F.shape[0], 2))
+    s[:, 1] = shock
+    out = np.empty((F.shape[0], horizon, 4))
+    for t in range(horizon):
+        out[:, t] = np.einsum("nij,nj->ni", F, s)
+        s = np.einsum("nij,nj->ni", M, s)
+    return out
+
+
+def _build_store():
+    grids = np.meshgrid(axis("phi_pi"), axis("phi_y"), axis("rho"), np.arange(len(VARIANTS)), indexing="ij")
+    phi_pi, phi_y, rho, variant = (g.ravel() for g in grids)
+    e, chi, fx = (np.array([v[k] for v in VARIANTS])[variant] for k in (1, 2, 3))
+    irfs = impulse_responses(solve(phi_pi, phi_y, rho, e, chi, fx))
+    shape = (len(axis("phi_pi")), len(axis("phi_y")), len(axis("rho")), len(VARIANTS), HORIZON, 4)
+    return irfs.reshape(shape).astype(np.float32)
+
+
+# Every rule on the slider grid x every channel variant, solved in one batch at startup
+STORE = _build_store()
+
+
+def grid_index(**values):
+    index = []
+    for name, (_, start, _, step, _) in AXES.items():
+        index.append(min(max(int(round((values[name] - start) / step)), 0), len(axis(name)) - 1))
+    return tuple(index)
+
+
+def responses(index):
+    """(variants, horizon, variables) impulse responses for one rule."""
+    return STORE[index]
+
+
+def figure_json():
+    """2x2 grid of impulse responses, one trace per (variable, variant), embedded once in the page."""
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+
+    default = responses(grid_index(**{name: spec[4] for name, spec in AXES.items()})).astype(float)
+    fig = make_subplots(rows=2, cols=2, subplot_titles=VARIABLES, vertical_spacing=0.15)
+    colours = ["#1f1f1f", "#d62728", "#1f77b4", "#2ca02c"]
+    quarters = list(range(HORIZON))
+    for k, _ in enumerate(VARIABLES):
+        for v, (name, *_) in enumerate(VARIANTS):
+            fig.add_trace(
+                go.Scatter(
+                    x=quarters, y=np.round(default[v, :, k], 4).tolist(), name=name, legendgroup=name,
+                    showlegend=k == 0,
+                    line=dict(color=colours[v], width=3 if v == 0 else 2, dash="solid" if v == 0 else "dash"),
+                ),
+                row=k // 2 + 1, col=k % 2 + 1,
+            )
+    fig.update_xaxes(title_text="Quarters after a 1 pp monetary policy shock (Taylor-rule residual v)")
+    fig.update_layout(height=560, margin=dict(t=40, b=40, l=50, r=20), legend=dict(orientation="h", y=-0.15))
+    return fig.to_json()
+
+
+def restyle(index):
+    """``Plotly.restyle`` patch replacing the y values of every trace, in figure order."""
+    irf = np.round(responses(index).astype(float), 4)
+    return {
+        "update": {"y": [irf[v, :, k].tolist() for k in range(len(VARIABLES)) for v in range(len(VARIANTS))]},
+        "traces": list(range(len(VARIABLES) * len(VARIANTS))),
+    }
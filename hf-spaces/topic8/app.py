@@ -1,11 +1,31 @@
 from shiny import App, ui, render, reactive
 from groq import Groq
+import asyncio
 import os
 import pathlib
+import sys
 from dotenv import load_dotenv
 
+# Shared tutor modules live at the repository root; the sync workflow copies them next to app.py,
+# where the Space's /app/app.py has no repository root above it
+_APP = pathlib.Path(__file__).resolve()
+if len(_APP.parents) > 2:
+    sys.path.append(str(_APP.parents[2]))
+
+from answer_log import AnswerLog
+from budget import MAX_COMPLETION_TOKENS, TOKEN_BUDGET, estimate_tokens, with_metrics
+from concept_coverage import CoverageScorer, checklist_ui
+from misconceptions import MisconceptionLibrary
+from prescreen import prescreen
+from retrieval import format_passages, load_reading_index, reading_links
+
+import uk_data
+import zlb
+
 load_dotenv()
 
+TOPIC = "topic8"
+
 def load_questions_from_qmd():
     qmd_path = pathlib.Path("topic8questions.qmd")
     if qmd_path.exists():
@@ -16,11 +36,28 @@ def load_questions_from_qmd():
             print(f"Warning: Could not load topic8questions.qmd: {e}")
     return None
 
+# Section-level BM25 index over the topic reading (memory-mapped after the first build)
+READINGS = load_reading_index("topic8reading.qmd")
+
+# Answers are logged for offline misconception clustering; reviewed clusters are served below
+ANSWER_LOG = AnswerLog()
+MISCONCEPTIONS = MisconceptionLibrary.for_topic(TOPIC)
+
 INDICATIVE_ANSWERS = {
     1: """Four shocks: (i) Eurozone sovereign debt crisis (2009-2012)—BoE provided expansionary support via QE while eurozone pursued austerity; (ii) Brexit (2016)—BoE cut rates, restarted QE, managed inflation from currency depreciation; (iii) COVID-19 (2020)—immediate near-zero rates, large QE, lending facilities, coordination with other CBs and governments; (iv) Post-COVID inflation (2021-2023)—rapid rate rises to 5.25%, QT, aggressive communication. Compared to 2007: initial response was gradual; post-2010 responses were immediate, large-scale, multi-dimensional, coordinated, and explicitly supporting real economy with transparent communication.""",
     2: """Great Moderation consensus: (i) inflation stability ensures overall stability, (ii) target inflation via policy rate. Post-Great Recession challenges this in two ways: (i) Policy rate insufficient at zero lower bound—led to QE and unconventional tools. Central banks use interest rates + QE + forward guidance + lending facilities, not just policy rate. (ii) Price stability ≠ overall stability—2008 crash showed low inflation didn't prevent recession. CBs now balance inflation + financial stability + employment. Modifications: (i) Tool expansion (policy rate → QE), (ii) Objective expansion (inflation → inflation+stability+employment), (iii) Philosophy shift (rigid rules → flexible, context-dependent with communication), (iv) Coordination (independent → coordinated with other CBs/governments).""",
 }
 
+TOPIC_CONCEPTS = {
+    1: "eurozone debt crisis, Brexit, COVID-19, energy shocks, BoE responses, QE, forward guidance, fiscal austerity, monetary coordination, real economy support",
+    2: "Great Moderation consensus, price stability, financial stability, zero lower bound, QE, monetary mandates, unconventional policy, central bank coordination, policy flexibility",
+}
+
+COVERAGE = {
+    num: CoverageScorer(TOPIC_CONCEPTS.get(num, ""), answer)
+    for num, answer in INDICATIVE_ANSWERS.items()
+}
+
 def get_question_text(num):
     questions = {
         1: """**Question 1: Four UK Economic Shocks Since 2010 and BoE Responses**
@@ -32,19 +69,21 @@ How did the conduct of monetary policy by major central banks in the period afte
     }
     return questions.get(num, "")
 
-def create_feedback_prompt(question_num, student_answer, indicative_answer):
+def create_feedback_prompt(question_num, student_answer, indicative_answer, passages=()):
     qmd_context = load_questions_from_qmd()
     context_note = ""
     if qmd_context:
         context_note = "\n\nNote: This question is from Topic 8 - Monetary Policy in Crisis and Recovery in EC3014 Monetary Economics."
     
-    topic_concepts = {
-        1: "eurozone debt crisis, Brexit, COVID-19, energy shocks, BoE responses, QE, forward guidance, fiscal austerity, monetary coordination, real economy support",
-        2: "Great Moderation consensus, price stability, financial stability, zero lower bound, QE, monetary mandates, unconventional policy, central bank coordination, policy flexibility",
-    }
-    
-    key_concepts = topic_concepts.get(question_num, "Topic 8 concepts")
+    key_concepts = TOPIC_CONCEPTS.get(question_num, "Topic 8 concepts")
     
+    reading_context = ""
+    if passages:
+        reading_context = f"""
+RELEVANT SECTIONS OF THE TOPIC READING (use these to point the student to specific sections):
+{format_passages(passages)}
+"""
+
     return f"""You are an expert economics tutor providing feedback on a Monetary Economics question from Topic 8: Monetary Policy in Crisis and Recovery. Your goal is to help students improve their understanding by providing hints and guidance, NOT complete answers.
 
 Key concepts for this question: {key_concepts}
@@ -57,7 +96,7 @@ STUDENT'S ANSWER:
 
 INDICATIVE ANSWER (for your reference only - DO NOT share directly):
 {indicative_answer}
-
+{reading_context}
 INSTRUCTIONS:
 1. Identify what the student got right and acknowledge it
 2. If the answer is incomplete or has gaps, provide HINTS to guide them toward the correct reasoning
@@ -70,25 +109,53 @@ INSTRUCTIONS:
 
 Provide your feedback now:{context_note}"""
 
-def get_ai_feedback(question_num, student_answer):
+def get_ai_feedback(question_num, student_answer, session_id=None):
     if not student_answer.strip():
         return "Please provide an answer to receive feedback."
 
+    # Trivial answers get instant canned guidance instead of an LLM call
+    screened = prescreen(student_answer, get_question_text(question_num), TOPIC_CONCEPTS.get(question_num, ""))
+    if screened:
+        return screened[1]
+
+    ANSWER_LOG.record(TOPIC, question_num, session_id, student_answer)
+
+    # Recurring misconceptions get their tutor-reviewed template without an LLM call
+    known = MISCONCEPTIONS.match(question_num, student_answer)
+    if known:
+        return known.template
+
     try:
         api_key = os.environ.get("GROQ_API_KEY")
         if not api_key:
             return "Error: GROQ_API_KEY environment variable not set. Please set your Groq API key."
 
-        client = Groq(api_key=api_key)
         indicative_answer = INDICATIVE_ANSWERS.get(question_num, "")
-        prompt = create_feedback_prompt(question_num, student_answer, indicative_answer)
+        passages = READINGS.search(f"{get_question_text(question_num)}\n{student_answer}") if READINGS else []
+        prompt = create_feedback_prompt(question_num, student_answer, indicative_answer, passages)
 
-        message = client.chat.completions.create(
-            messages=[{"role": "user", "content": prompt}],
-            model="llama-3.3-70b-versatile",
+        # Charge the shared Groq quota before going upstream
+        admission = TOKEN_BUDGET.admit(
+            session_id, TOPIC, estimate_tokens(prompt) + MAX_COMPLETION_TOKENS
         )
+        if not admission.allowed:
+            return admission.message
+
+        client = Groq(api_key=api_key)
+
+        usage = None
+        try:
+            message = client.chat.completions.create(
+                messages=[{"role": "user", "content": prompt}],
+                model=admission.model,
+                max_tokens=MAX_COMPLETION_TOKENS,
+            )
+            usage = message.usage
+        finally:
+            # Settle the reservation to the actual spend, or release it if the call failed
+            TOKEN_BUDGET.record(session_id, TOPIC, admission.model, usage, admission)
 
-        return message.choices[0].message.content
+        return message.choices[0].message.content + reading_links(passages)
     except Exception as e:
         return f"Error getting feedback: {str(e)}. Make sure your GROQ_API_KEY environment variable is set correctly."
 
@@ -275,6 +342,7 @@ app_ui = ui.page_fluid(
         };
         """),
         ui.tags.script(src="https://cdn.jsdelivr.net/npm/mathjax@3/es5/tex-mml-chtml.js"),
+        ui.tags.script(src="https://cdn.plot.ly/plotly-2.35.2.min.js"),
         ui.tags.script("""
         function renderMath() {
           if (window.MathJax) {
@@ -317,6 +385,7 @@ app_ui = ui.page_fluid(
                         ui.input_action_button("submit1", "Get AI Feedback", class_="btn-primary"),
                         class_="answer-section"
                     ),
+                    ui.output_ui("coverage1"),
                     ui.output_ui("feedback1"),
                     class_="question-card"
                 )
@@ -331,38 +400,185 @@ app_ui = ui.page_fluid(
                         ui.input_action_button("submit2", "Get AI Feedback", class_="btn-primary"),
                         class_="answer-section"
                     ),
+                    ui.output_ui("coverage2"),
                     ui.output_ui("feedback2"),
                     class_="question-card"
                 )
             ),
+            ui.nav_panel(
+                "Policy Scenarios",
+                ui.div(
+                    ui.markdown(
+                        "The four shocks from Question 1 in a New Keynesian model with an effective lower bound "
+                        "on the policy rate. Grey dashed lines follow the Taylor rule alone. Red lines add the QE "
+                        "and forward guidance set below. The dotted line is the shadow rate the rule would set "
+                        "without the bound. QE compresses the term premium, and forward guidance holds the rate at "
+                        "the bound for a promised number of quarters. Question 2 asks why the policy rate alone "
+                        "stopped being enough."
+                    ),
+                    ui.layout_columns(
+                        *[
+                            ui.input_slider(f"zlb_{name}", label, min=start, max=stop, step=step, value=default)
+                            for name, (label, start, stop, step, default) in zlb.AXES.items()
+                        ],
+                        col_widths=(4, 4, 4, 4, 4),
+                    ),
+                    ui.div(id="zlb_plot", style="height: 640px;"),
+                    ui.tags.script("""
+                    document.addEventListener('DOMContentLoaded', function() {
+                      Shiny.addCustomMessageHandler('zlb-plot', function(fig) {
+                        Plotly.react('zlb_plot', fig.data, fig.layout, {responsive: true, displayModeBar: false});
+                      });
+                      document.addEventListener('shown.bs.tab', function() {
+                        if (document.getElementById('zlb_plot').data) { Plotly.Plots.resize('zlb_plot'); }
+                      });
+                    });
+                    """),
+                    ui.output_ui("zlb_summary"),
+                    class_="question-card"
+                )
+            ),
+            ui.nav_panel(
+                "UK Data",
+                ui.div(
+                    ui.markdown(
+                        "The UK series behind Question 1: CPI inflation, Bank Rate, the output gap and M4 growth. "
+                        "Shaded bands mark the four shocks since 2010 and the sub-prime crash they are compared "
+                        "with. How far did Bank Rate fall in each episode, and what was left to cut by 2016 and 2020?"
+                    ),
+                    ui.layout_columns(
+                        ui.input_slider("uk_since", "From", min=1990, max=2020, value=2005, step=1, sep=""),
+                        ui.input_radio_buttons("uk_frequency", "Frequency", {"M": "Monthly", "Q": "Quarterly"},
+                                               inline=True),
+                        col_widths=(6, 6),
+                    ),
+                    ui.div(id="uk_plot", style="height: 640px;"),
+                    ui.tags.script("""
+                    document.addEventListener('DOMContentLoaded', function() {
+                      Shiny.addCustomMessageHandler('uk-plot', function(fig) {
+                        Plotly.react('uk_plot', fig.data, fig.layout, {responsive: true, displayModeBar: false});
+                      });
+                      document.addEventListener('shown.bs.tab', function() {
+                        if (document.getElementById('uk_plot').data) { Plotly.Plots.resize('uk_plot'); }
+                      });
+                    });
+                    """),
+                    ui.output_ui("uk_summary"),
+                    class_="question-card"
+                )
+            ),
         ),
         class_="container-custom"
     )
 )
 
 def server(input, output, session):
+    def question_outputs(num):
+        submit = input[f"submit{num}"]
+        answer = input[f"answer{num}"]
+
+        @reactive.extended_task
+        async def feedback_task(student_answer):
+            # Run the Groq call off the event loop so the checklist is sent straight away
+            return await asyncio.to_thread(get_ai_feedback, num, student_answer, session.id)
+
+        @reactive.effect
+        @reactive.event(submit)
+        def _submit():
+            feedback_task.invoke(answer())
+
+        @output(id=f"coverage{num}")
+        @render.ui
+        @reactive.event(submit)
+        def _coverage():
+            if not answer().strip():
+                return None
+            return checklist_ui(COVERAGE[num].score(answer()))
+
+        @output(id=f"feedback{num}")
+        @render.ui
+        def _feedback():
+            return ui.div(
+                ui.div(
+                    ui.h3("AI Tutor Feedback", style="margin-top: 0; color: #2e7d32;"),
+                    ui.markdown(feedback_task.result()),
+                    class_="feedback-box"
+                )
+            )
+
+    for num in INDICATIVE_ANSWERS:
+        question_outputs(num)
+
+    @reactive.calc
+    def zlb_comparison():
+        # Slider settings sit on the shared cache's lattice; a miss solves all scenarios and the policy grid
+        return zlb.compare(**{name: input[f"zlb_{name}"]() for name in zlb.AXES})
+
+    @reactive.effect
+    async def _draw_zlb():
+        await session.send_custom_message("zlb-plot", zlb_comparison()[0])
+
     @render.ui
-    @reactive.event(input.submit1)
-    def feedback1():
-        feedback = get_ai_feedback(1, input.answer1())
+    def zlb_summary():
+        rows = "".join(
+            f"<tr><td>{row['scenario']}</td>"
+            f"<td>{row['quarters_at_bound'][0]} / {row['quarters_at_bound'][1]}</td>"
+            f"<td>{row['trough_y'][0]:.1f} / {row['trough_y'][1]:.1f}</td>"
+            f"<td>{row['peak_pi'][0]:.1f} / {row['peak_pi'][1]:.1f}</td>"
+            f"<td>{row['loss'][0]:.1f} / {row['loss'][1]:.1f}</td>"
+            f"<td>QE {row['best'][0]:+.2f}, FG {row['best'][1]} q (loss {row['best'][2]:.1f})</td></tr>"
+            for row in zlb_comparison()[1]
+        )
         return ui.div(
-            ui.div(
-                ui.h3("AI Tutor Feedback", style="margin-top: 0; color: #2e7d32;"),
-                ui.markdown(feedback),
-                class_="feedback-box"
-            )
+            ui.HTML(
+                "<table class='table table-sm'>"
+                "<thead><tr><th>Shock</th><th>Quarters at bound</th><th>Trough output gap</th>"
+                "<th>Peak inflation gap</th><th>Loss</th><th>Best mix on the grid</th></tr></thead>"
+                f"<tbody>{rows}</tbody></table>"
+            ),
+            ui.markdown(
+                "Each pair is *Taylor rule only / with your QE and forward guidance*. The loss is the discounted "
+                "sum of squared inflation gaps plus half the squared output gaps. The last column searches every "
+                "QE size and guidance horizon on the slider grid."
+            ),
         )
 
+
+    @reactive.calc
+    def uk_comparison():
+        # Memory-mapped columns shared by every session; a redraw is a few slices and a resample
+        return uk_data.compare(input.uk_since(), input.uk_frequency())
+
+    @reactive.effect
+    async def _draw_uk():
+        if uk_data.STORE is not None:
+            await session.send_custom_message("uk-plot", uk_comparison()[0])
+
     @render.ui
-    @reactive.event(input.submit2)
-    def feedback2():
-        feedback = get_ai_feedback(2, input.answer2())
+    def uk_summary():
+        if uk_data.STORE is None:
+            return ui.markdown("No UK data in this Space yet. Run `python macro_store.py build` and redeploy.")
+        rows = "".join(
+            f"<tr><td>{row['episode']}</td>"
+            f"<td>{row['bank_rate'][0]:.2f}% → {row['bank_rate'][1]:.2f}%</td>"
+            f"<td>{row['peak_inflation']:.1f}%</td>"
+            f"<td>{row['trough_gap']:.1f}%</td>"
+            f"<td>{row['m4_growth']:.1f}%</td></tr>"
+            for row in uk_comparison()[1]
+        )
         return ui.div(
-            ui.div(
-                ui.h3("AI Tutor Feedback", style="margin-top: 0; color: #2e7d32;"),
-                ui.markdown(feedback),
-                class_="feedback-box"
-            )
+            ui.HTML(
+                "<table class='table table-sm'>"
+                "<thead><tr><th>Episode</th><th>Bank Rate before → after</th><th>Peak CPI inflation</th>"
+                "<th>Trough output gap</th><th>Average M4 growth</th></tr></thead>"
+                f"<tbody>{rows}</tbody></table>"
+            ),
+            ui.markdown(
+                f"Macro store version `{uk_data.STORE.version}`. Sources: ONS D7BT (CPI) and ABMI (GDP), Bank "
+                "of England IUDBEDR (Bank Rate) and LPMAUYN (M4). The output gap is the Hodrick-Prescott "
+                "(λ = 1600) gap of log GDP."
+            ),
         )
 
-app = App(app_ui, server)
+
+app = with_metrics(App(app_ui, server))
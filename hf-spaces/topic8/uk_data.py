@@ -0,0 +1,114 @@
+"""UK data behind Question 1: CPI inflation, Bank Rate, the output gap and M4 growth.
+
+The series come from the versioned macro store (``macro_store.py``), which
+the sync workflow builds and ships next to the app. ``STORE`` is ``None``
+until then, and the panel says how to build it.
+"""
+
+import numpy as np
+
+from macro_store import MacroStore
+
+STORE = MacroStore.find()
+
+# The four shocks in Question 1, and the sub-prime crash they are compared with
+EPISODES = {
+    "Sub-prime crash (2007–09)": ("2007-07-01", "2009-06-30"),
+    "Eurozone crisis (2010–12)": ("2010-01-01", "2012-12-31"),
+    "Brexit vote (2016)": ("2016-06-01", "2016-12-31"),
+    "COVID-19 (2020)": ("2020-03-01", "2021-03-31"),
+    "Post-COVID inflation (2021–23)": ("2021-06-01", "2023-12-31"),
+}
+
+# Figure rows: (title, series on that row)
+_ROWS = [
+    ("Per cent", ("CPI inflation (yoy)", "Bank Rate")),
+    ("Output gap, % of trend", ("Output gap",)),
+    ("M4 growth, % yoy", ("M4 growth (yoy)",)),
+]
+_COLOURS = {"CPI inflation (yoy)": "#d62728", "Bank Rate": "#1f77b4", "Output gap": "#2ca02c",
+            "M4 growth (yoy)": "#9467bd"}
+_V_SPACING = 0.06
+
+
+def series(since, frequency):
+    """``{label: Series}`` from ``since`` at ``frequency`` ("M" or "Q"); the output gap is quarterly only."""
+    return {
+        "CPI inflation (yoy)": STORE.query("cpi", since, frequency=frequency, growth="yoy"),
+        "Bank Rate": STORE.query("bank_rate", since, frequency=frequency, how="last"),
+        "Output gap": STORE.query("output_gap", since),
+        "M4 growth (yoy)": STORE.query("m4", since, frequency=frequency, how="last", growth="yoy"),
+    }
+
+
+def _points(s):
+    # Missing months are stored as NaN, which JSON can't carry
+    values = np.round(np.asarray(s.values, dtype=np.float64), 3)
+    return np.datetime_as_string(s.dates).tolist(), [None if np.isnan(v) else float(v) for v in values]
+
+
+def figure(paths):
+    """Plotly figure dict: one row per panel of ``_ROWS`` on a shared date axis, with the episodes shaded."""
+    height = (1.0 - (len(_ROWS) - 1) * _V_SPACING) / len(_ROWS)
+    layout = {
+        "height": 640,
+        "margin": {"t": 60, "b": 40, "l": 60, "r": 20},
+        "legend": {"orientation": "h", "y": -0.08},
+        "xaxis": {"type": "date", "anchor": f"y{len(_ROWS)}"},
+        "shapes": [],
+        "annotations": [],
+    }
+    data = []
+    for r, (title, labels) in enumerate(_ROWS):
+        top = 1.0 - r * (height + _V_SPACING)
+        suffix = "" if r == 0 else str(r + 1)
+        layout[f"yaxis{suffix}"] = {"domain": [top - height, top], "anchor": "x", "title": {"text": title},
+                                    "zeroline": True}
+        for label in labels:
+            x, y = _points(paths[label])
+            data.append({"type": "scatter", "x": x, "y": y, "name": label, "yaxis": f"y{suffix}",
+                         "line": {"color": _COLOURS[label], "width": 2}, "connectgaps": False})
+    for name, (start, end) in EPISODES.items():
+        layout["shapes"].append({"type": "rect", "xref": "x", "yref": "paper", "x0": start, "x1": end, "y0": 0,
+                                 "y1": 1, "fillcolor": "#7f7f7f", "opacity": 0.12, "line": {"width": 0},
+                                 "layer": "below"})
+        layout["annotations"].append({"text": name.split(" (")[0], "x": start, "xanchor": "left", "y": 1.0,
+                                      "yanchor": "bottom", "xref": "x", "yref": "paper", "showarrow": False,
+                                      "textangle": -20, "font": {"size": 10}})
+    return {"data": data, "layout": layout}
+
+
+def _at(s, date, offset=0):
+    """Value of the period containing ``date``, or of the period ``offset`` periods from it."""
+    k = int(np.searchsorted(s.dates, np.datetime64(date, "D"), side="right")) - 1 + offset
+    return float(s.values[k]) if 0 <= k < len(s) else float("nan")
+
+
+def _summary(fn, s):
+    values = np.asarray(s.values, dtype=np.float64)
+    return float(fn(values)) if np.isfinite(values).any() else float("nan")
+
+
+def episodes(paths):
+    """One row per episode: Bank Rate going in and coming out, peak inflation and the output-gap trough."""
+    rows = []
+    for name, (start, end) in EPISODES.items():
+        # Going in is the period before the one containing the start, which may already hold the cut
+        going_in = _at(paths["Bank Rate"], start, offset=-1)
+        if np.isnan(going_in):
+            continue
+        window = {label: s.between(start, end) for label, s in paths.items()}
+        rows.append({
+            "episode": name,
+            "bank_rate": (going_in, _at(paths["Bank Rate"], end)),
+            "peak_inflation": _summary(np.nanmax, window["CPI inflation (yoy)"]),
+            "trough_gap": _summary(np.nanmin, window["Output gap"]),
+            "m4_growth": _summary(np.nanmean, window["M4 growth (yoy)"]),
+        })
+    return rows
+
+
+def compare(since, frequency="M"):
+    """The figure and the episode rows from ``since`` (a year) at ``frequency``."""
+    paths = series(f"{int(since)}-01-01", frequency)
+    return figure(paths), episodes(paths)
@@ -0,0 +1,257 @@
+"""New Keynesian model with an effective lower bound, QE and forward guidance.
+
+Quarterly periods, rates annualised in percent; ``y`` and ``π`` are gaps::
+
+    IS      y_t = y_t+1 - σ (i_t - i* - π_t+1 - rⁿ_t) + σ qe_t
+    PC      π_t = β π_t+1 + κ y_t + u_t
+    rule    i_t = max(lb, i* + φ_π π_t + φ_y y_t)
+
+``rⁿ`` is a natural-rate (demand) shock and ``u`` a cost-push shock. QE
+compresses the term premium by ``qe_t`` points, which works like an equal
+cut in the policy rate and decays at ``RHO_QE``. Forward guidance holds the
+rate at the bound for the first ``fg`` quarters whatever the rule says.
+
+The model has no endogenous state, so for a given sequence of regimes
+(bound binding or not in each quarter) the perfect-foresight path is one
+backward sweep from the steady state. The occasionally binding constraint is
+solved piecewise-linearly: guess the regimes, sweep, and reset each quarter
+to binding where the shadow rate is below the bound. Repeat until the
+regimes stop changing. Every array holds a batch of scenarios, so one sweep
+solves them all. Very large batches are split across a process pool.
+Scenario comparisons go through the shared ``SimulationCache`` keyed on the
+slider lattice, so a setting any session has tried is a lookup. The figure
+is built as a plain Plotly dict, so rebuilding it from cached paths is cheap.
+"""
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from sim_cache import SimulationCache
+
+SIGMA = 0.5
+BETA = 0.995
+KAPPA = 0.05
+I_STAR = 2.5
+RHO_QE = 0.9
+LOSS_WEIGHT_Y = 0.5
+HORIZON = 40
+POOL_MIN = 50_000
+
+# (natural-rate shock, its persistence, cost-push shock, its persistence), annualised pp
+SCENARIOS = {
+    "Eurozone crisis (2010–12)": (-3.0, 0.9, 0.5, 0.5),
+    "Brexit vote (2016)": (-2.0, 0.85, 1.0, 0.5),
+    "COVID-19 (2020)": (-10.0, 0.75, 0.0, 0.0),
+    "Post-COVID inflation (2021–23)": (1.5, 0.8, 2.0, 0.6),
+}
+
+# Slider axes: (label, start, stop, step, default)
+AXES = {
+    "qe": ("QE: term-premium compression (pp, negative = QT)", -1.0, 3.0, 0.25, 1.0),
+    "fg": ("Forward guidance: quarters held at the bound", 0, 12, 1, 4),
+    "phi_pi": ("Taylor-rule inflation response φ_π", 1.1, 3.0, 0.1, 1.5),
+    "phi_y": ("Taylor-rule output response φ_y", 0.0, 1.5, 0.1, 0.5),
+    "lb": ("Effective lower bound (%)", -0.5, 1.0, 0.1, 0.1),
+}
+QE_GRID = np.round(np.arange(-1.0, 3.01, 0.25), 2)
+FG_GRID = np.arange(0, 13)
+
+_POOL = None
+_POOL_LOCK = threading.Lock()
+
+
+def shocks(demand, demand_rho, cost, cost_rho, qe, horizon=HORIZON):
+    """AR(1) paths (n, horizon) for the natural rate, cost push and QE; arguments broadcast."""
+    t = np.arange(horizon)
+    args = np.broadcast_arrays(*map(np.atleast_1d, (demand, demand_rho, cost, cost_rho, qe)))
+    demand, demand_rho, cost, cost_rho, qe = (np.asarray(a, dtype=float)[:, None] for a in args)
+    return demand * demand_rho**t, cost * cost_rho**t, qe * RHO_QE**t
+
+
+def _sweep(rn, u, qe, bind, phi_pi, phi_y, lb):
+    """One backward pass for fixed regimes; returns (y, π, i, shadow rate)."""
+    n, horizon = rn.shape
+    y, pi, i, shadow = (np.empty((n, horizon)) for _ in range(4))
+    y_next = pi_next = np.zeros(n)
+    for t in reversed(range(horizon)):
+        a = BETA * pi_next + u[:, t]
+        demand = y_next + SIGMA * (pi_next + rn[:, t]) + SIGMA * qe[:, t]
+        slack = (demand - SIGMA * phi_pi * a) / (1.0 + SIGMA * phi_y + SIGMA * phi_pi * KAPPA)
+        bound = demand - SIGMA * (lb - I_STAR)
+        y[:, t] = np.where(bind[:, t], bound, slack)
+        pi[:, t] = a + KAPPA * y[:, t]
+        shadow[:, t] = I_STAR + phi_pi * pi[:, t] + phi_y * y[:, t]
+        i[:, t] = np.where(bind[:, t], lb, shadow[:, t])
+        y_next, pi_next = y[:, t], pi[:, t]
+    return y, pi, i, shadow
+
+
+def solve_batch(demand, demand_rho, cost, cost_rho, qe, fg, phi_pi, phi_y, lb, horizon=HORIZON):
+    """Paths for a batch of scenarios; every argument broadcasts to one value per scenario."""
+    args = np.broadcast_arrays(*map(np.atleast_1d, (demand, demand_rho, cost, cost_rho, qe, fg, phi_pi, phi_y, lb)))
+    demand, demand_rho, cost, cost_rho, qe, fg, phi_pi, phi_y, lb = (np.asarray(a, dtype=float) for a in args)
+    rn, u, qe_path = shocks(demand, demand_rho, cost, cost_rho, qe, horizon)
+    forced = np.arange(horizon)[None, :] < fg[:, None]
+    bind = forced.copy()
+    for iterations in range(1, horizon + 2):
+        y, pi, i, shadow = _sweep(rn, u, qe_path, bind, phi_pi, phi_y, lb)
+        updated = forced | (shadow < lb[:, None])
+        if np.array_equal(updated, bind):
+            break
+        bind = updated
+    discount = BETA ** np.arange(horizon)
+    return {
+        "y": y, "pi": pi, "i": i, "shadow": shadow, "bind": bind,
+        "loss": (discount * (pi**2 + LOSS_WEIGHT_Y * y**2)).sum(axis=1),
+        "iterations": iterations,
+    }
+
+
+def _pool():
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            # spawn: forking a threaded web server is unsafe
+            _POOL = ProcessPoolExecutor(
+                max_workers=os.cpu_count() or 1, mp_context=multiprocessing.get_context("spawn")
+            )
+        return _POOL
+
+
+def run(**batch):
+    """``solve_batch`` over a large batch, split into chunks across the process pool when worthwhile."""
+    arrays = dict(zip(batch, np.broadcast_arrays(*map(np.atleast_1d, batch.values()))))
+    n = len(next(iter(arrays.values())))
+    workers = os.cpu_count() or 1
+    if n < POOL_MIN or workers == 1:
+        return solve_batch(**arrays)
+    bounds = np.linspace(0, n, workers + 1).astype(int)
+    futures = [
+        _pool().submit(solve_batch, **{k: v[lo:hi] for k, v in arrays.items()})
+        for lo, hi in zip(bounds[:-1], bounds[1:])
+    ]
+    parts = [future.result() for future in futures]
+    merged = {k: np.concatenate([p[k] for p in parts]) for k in parts[0] if k != "iterations"}
+    merged["iterations"] = max(p["iterations"] for p in parts)
+    return merged
+
+
+def _scenario_arrays():
+    return [np.array([spec[k] for spec in SCENARIOS.values()]) for k in range(4)]
+
+
+def _solve(qe, fg, phi_pi, phi_y, lb):
+    """Paths for all four scenarios with and without unconventional policy, and the QE/FG loss grid."""
+    demand, demand_rho, cost, cost_rho = _scenario_arrays()
+    k = len(SCENARIOS)
+    # Rows 0..k-1: rule only; rows k..2k-1: rule plus the chosen QE and forward guidance
+    paths = run(
+        demand=np.tile(demand, 2), demand_rho=np.tile(demand_rho, 2), cost=np.tile(cost, 2),
+        cost_rho=np.tile(cost_rho, 2), qe=np.repeat([0.0, qe], k), fg=np.repeat([0, fg], k),
+        phi_pi=phi_pi, phi_y=phi_y, lb=lb,
+    )
+    # Policy grid: every scenario x QE x FG in one batch
+    s, q, f = (g.ravel() for g in np.meshgrid(np.arange(k), QE_GRID, FG_GRID, indexing="ij"))
+    grid = run(demand=demand[s], demand_rho=demand_rho[s], cost=cost[s], cost_rho=cost_rho[s], qe=q, fg=f,
+               phi_pi=phi_pi, phi_y=phi_y, lb=lb)
+    result = {key: paths[key] for key in ("y", "pi", "i", "shadow", "bind", "loss")}
+    result["grid_loss"] = grid["loss"].reshape(k, len(QE_GRID), len(FG_GRID))
+    return result
+
+
+# Sliders step on the lattice, so settings are exact hits. Interpolation is off: the bound
+# switches regimes, and blended paths would not be a solution.
+CACHE = SimulationCache(
+    "zlb", _solve, {name: (spec[1], spec[3]) for name, spec in AXES.items()}, tolerance=None,
+)
+
+
+def compare(**values):
+    """All four scenarios with and without unconventional policy, plus the best QE/FG mix for each.
+
+    ``values`` are the slider settings. Returns the figure and one summary row per scenario.
+    """
+    paths = CACHE.get(**values)
+    k = len(SCENARIOS)
+    losses = paths["grid_loss"]
+    rows = []
+    for j, name in enumerate(SCENARIOS):
+        best_q, best_f = np.unravel_index(losses[j].argmin(), losses[j].shape)
+        rows.append({
+            "scenario": name,
+            "quarters_at_bound": (int(paths["bind"][j].sum()), int(paths["bind"][k + j].sum())),
+            "trough_y": (float(paths["y"][j].min()), float(paths["y"][k + j].min())),
+            "peak_pi": (float(paths["pi"][j].max()), float(paths["pi"][k + j].max())),
+            "loss": (float(paths["loss"][j]), float(paths["loss"][k + j])),
+            "best": (float(QE_GRID[best_q]), int(FG_GRID[best_f]), float(losses[j].min())),
+        })
+    return figure(paths, k), rows
+
+
+# Subplot grid of the figure: one column per scenario, one row per variable
+_ROWS = [("y", "Output gap"), ("pi", "Inflation gap"), ("i", "Policy rate")]
+_H_SPACING, _V_SPACING, _RIGHT = 0.04, 0.06, 0.98
+
+
+def _layout(k):
+    width = (_RIGHT - (k - 1) * _H_SPACING) / k
+    height = (1.0 - (len(_ROWS) - 1) * _V_SPACING) / len(_ROWS)
+    bottom = (len(_ROWS) - 1) * k + 1
+    layout = {
+        "height": 640,
+        "margin": {"t": 60, "b": 40, "l": 50, "r": 40},
+        "legend": {"orientation": "h", "y": -0.12},
+        "annotations": [],
+    }
+    for r in range(len(_ROWS)):
+        top = 1.0 - r * (height + _V_SPACING)
+        for j in range(k):
+            n = r * k + j + 1
+            suffix = "" if n == 1 else str(n)
+            left = j * (width + _H_SPACING)
+            xaxis = {"anchor": f"y{suffix}", "domain": [left, left + width]}
+            if r < len(_ROWS) - 1:
+                # Shared quarters axis: only the bottom row is labelled
+                xaxis.update(matches=f"x{bottom + j}", showticklabels=False)
+            else:
+                xaxis["title"] = {"text": "Quarters"}
+            layout[f"xaxis{suffix}"] = xaxis
+            layout[f"yaxis{suffix}"] = {"anchor": f"x{suffix}", "domain": [top - height, top]}
+        layout["annotations"].append({
+            "text": _ROWS[r][1], "textangle": 90, "x": _RIGHT, "xanchor": "left", "y": top - height / 2,
+            "yanchor": "middle", "xref": "paper", "yref": "paper", "showarrow": False, "font": {"size": 12},
+        })
+    for j, name in enumerate(SCENARIOS):
+        layout["annotations"].append({
+            "text": name, "x": j * (width + _H_SPACING) + width / 2, "xanchor": "center", "y": 1.0,
+            "yanchor": "bottom", "xref": "paper", "yref": "paper", "showarrow": False, "font": {"size": 12},
+        })
+    return layout
+
+
+def figure(paths, k):
+    """Plotly figure dict: output, inflation and the policy rate for each scenario, with and without QE/FG."""
+    quarters = list(range(HORIZON))
+    data = []
+    for j in range(k):
+        for r, (key, _) in enumerate(_ROWS):
+            n = r * k + j + 1
+            axes = {"xaxis": f"x{n if n > 1 else ''}", "yaxis": f"y{n if n > 1 else ''}"}
+            for offset, name, colour, dash in ((0, "Taylor rule only", "#7f7f7f", "dash"),
+                                               (k, "With QE and forward guidance", "#d62728", "solid")):
+                data.append({
+                    "type": "scatter", "x": quarters, "y": np.round(paths[key][offset + j], 3).tolist(),
+                    "name": name, "legendgroup": name, "showlegend": j == 0 and r == 0,
+                    "line": {"color": colour, "dash": dash, "width": 2.5}, **axes,
+                })
+            if key == "i":
+                data.append({
+                    "type": "scatter", "x": quarters, "y": np.round(paths["shadow"][k + j], 3).tolist(),
+                    "name": "Shadow rate", "legendgroup": "shadow", "showlegend": j == 0,
+                    "line": {"color": "#d62728", "dash": "dot", "width": 1.5}, **axes,
+                })
+    return {"data": data, "layout": _layout(k)}
@@ -0,0 +1,228 @@
+"""Two-parameter logistic (2PL) item response model for the MCQ quizzes, with adaptive item selection.
+
+A student of ability ``θ`` answers item ``j`` correctly with probability::
+
+    P_j(θ) = 1 / (1 + exp(-a_j (θ - b_j)))
+
+where ``b_j`` is the item's difficulty and ``a_j`` its discrimination.
+
+Offline, ``python irt.py topic1`` calibrates ``a`` and ``b`` from the stored
+attempts by marginal maximum likelihood (Bock-Aitkin EM). Abilities are
+integrated out over a fixed grid with a standard normal prior. The E-step
+for the whole response matrix is two matrix products. The M-step is a
+Newton step on every item's (slope, intercept) at once, using closed-form
+2 x 2 inverses. The job writes ``irt/topic1.json``.
+
+Online, ``AdaptiveSelector`` precomputes the log-likelihood and Fisher
+information of every item on a fine ability grid. It also stores the items
+ranked by information at each grid point. To choose the next question, it
+sums the answered items' log-likelihood rows into an EAP ability estimate,
+then walks the ranking at that ability to the first unused item. It
+balances SK/AN/PS/MT categories as it goes. A step takes tens of
+microseconds and keeps no per-student state: the page sends its responses
+so far with each request.
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+
+CALIBRATION_DIR = "irt"
+QUIZ_PAGES = "{topic}mcqs.qmd"
+QUIZ_NAMES = {"topic1": "Week1"}
+
+QUADRATURE = np.linspace(-4.0, 4.0, 41)
+GRID = np.linspace(-4.0, 4.0, 161)
+MAX_ITEMS = 15
+TARGET_SE = 0.35
+
+
+def _prior(grid):
+    log_prior = -0.5 * grid**2
+    return log_prior - np.logaddexp.reduce(log_prior)
+
+
+def _probabilities(a, b, grid):
+    return 1.0 / (1.0 + np.exp(-a[:, None] * (grid[None, :] - b[:, None])))
+
+
+def calibrate(correct, answered=None, max_iter=200, tol=1e-5, grid=QUADRATURE):
+    """2PL parameters ``(a, b, log-likelihood history)`` for an attempts x items 0/1 matrix.
+
+    ``answered`` masks items a student did not see (adaptive attempts), which
+    then carry no information instead of counting as wrong.
+    """
+    correct = np.asarray(correct, dtype=np.float64)
+    answered = np.ones_like(correct) if answered is None else np.asarray(answered, dtype=np.float64)
+    right = correct * answered
+    wrong = answered - right
+    log_prior = _prior(grid)
+    m = correct.shape[1]
+    slope, intercept = np.ones(m), np.zeros(m)
+    history = []
+    for _ in range(max_iter):
+        P = np.clip(1.0 / (1.0 + np.exp(-(slope[:, None] * grid[None, :] + intercept[:, None]))), 1e-9, 1 - 1e-9)
+
+        # E-step: posterior over the ability grid for every attempt
+        log_joint = right @ np.log(P) + wrong @ np.log1p(-P) + log_prior
+        marginal = np.logaddexp.reduce(log_joint, axis=1)
+        posterior = np.exp(log_joint - marginal[:, None])
+        history.append(float(marginal.sum()))
+        r = right.T @ posterior
+        n = answered.T @ posterior
+
+        # M-step: one Newton step per item on (slope, intercept), with weak normal priors for stability
+        residual = r - n * P
+        weight = n * P * (1 - P)
+        g_s = (residual * grid).sum(axis=1) - (slope - 1.0) / 4.0
+        g_c = residual.sum(axis=1) - intercept / 9.0
+        h_ss = (weight * grid**2).sum(axis=1) + 1 / 4.0
+        h_sc = (weight * grid).sum(axis=1)
+        h_cc = weight.sum(axis=1) + 1 / 9.0
+        det = h_ss * h_cc - h_sc**2
+        slope = np.clip(slope + (h_cc * g_s - h_sc * g_c) / det, 0.05, 6.0)
+        intercept = intercept + (h_ss * g_c - h_sc * g_s) / det
+
+        if len(history) > 1 and abs(history[-1] - history[-2]) < tol * max(abs(history[-1]), 1.0):
+            break
+    return slope, -intercept / slope, history
+
+
+class AdaptiveSelector:
+    """Next-item choice and ability estimates for one calibrated quiz."""
+
+    def __init__(self, items, a, b, categories=None, grid=GRID, max_items=MAX_ITEMS, target_se=TARGET_SE):
+        self.items = list(items)
+        self.index = {item: j for j, item in enumerate(self.items)}
+        self.a, self.b = np.asarray(a, dtype=float), np.asarray(b, dtype=float)
+        self.categories = list(categories or [""] * len(self.items))
+        self.grid = grid
+        self.max_items = max_items
+        self.target_se = target_se
+        P = np.clip(_probabilities(self.a, self.b, grid), 1e-9, 1 - 1e-9)
+        self.log_right, self.log_wrong = np.log(P), np.log1p(-P)
+        self.information = self.a[:, None] ** 2 * P * (1 - P)
+        # Items by decreasing information at each grid point
+        self.ranking = np.argsort(-self.information, axis=0).T.copy()
+        self.log_prior = _prior(grid)
+
+    @classmethod
+    def from_file(cls, path, **kwargs):
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+        return cls(data["items"], data["a"], data["b"], data.get("categories"), **kwargs)
+
+    @classmethod
+    def for_topic(cls, topic, *search_dirs, **kwargs):
+        """The topic's calibration, or ``None`` until ``python irt.py <topic>`` has been run."""
+        for directory in (*search_dirs, Path.cwd(), Path(__file__).parent):
+            path = Path(directory) / CALIBRATION_DIR / f"{topic}.json"
+            if path.exists():
+                try:
+                    return cls.from_file(path, **kwargs)
+                except (OSError, ValueError, KeyError) as e:
+                    print(f"Warning: Could not load IRT calibration {path}: {e}")
+        return None
+
+    def estimate(self, responses):
+        """EAP ability and its posterior standard deviation from ``{item: 0 or 1}``."""
+        right = [self.index[q] for q, ok in responses.items() if ok and q in self.index]
+        wrong = [self.index[q] for q, ok in responses.items() if not ok and q in self.index]
+        log_post = self.log_prior + self.log_right[right].sum(axis=0) + self.log_wrong[wrong].sum(axis=0)
+        weights = np.exp(log_post - log_post.max())
+        weights /= weights.sum()
+        theta = float(weights @ self.grid)
+        return theta, float(np.sqrt(max(weights @ self.grid**2 - theta**2, 0.0)))
+
+    def next_item(self, responses):
+        """``{"next", "theta", "se", "done"}``; ``next`` is ``None`` once the quiz should stop."""
+        theta, se = self.estimate(responses)
+        seen = {self.index[q] for q in responses if q in self.index}
+        done = len(seen) >= min(self.max_items, len(self.items)) or (len(seen) >= 3 and se <= self.target_se)
+        choice = None
+        if not done:
+            # Prefer the categories asked least so far, so every category gets a score
+            asked = {c: 0 for c in self.categories}
+            for j in seen:
+                asked[self.categories[j]] += 1
+            fewest = min(asked[self.categories[j]] for j in range(len(self.items)) if j not in seen)
+            row = self.ranking[int(np.abs(self.grid - theta).argmin())]
+            choice = next(int(j) for j in row if j not in seen and asked[self.categories[j]] == fewest)
+        return {
+            "next": None if choice is None else self.items[choice],
+            "theta": round(theta, 3),
+            "se": round(se, 3),
+            "done": choice is None,
+            "answered": len(seen),
+        }
+
+
+def adaptive_routes(selectors):
+    """Starlette route for ``POST /adaptive``; ``selectors`` maps quiz names to ``AdaptiveSelector``."""
+    from starlette.responses import JSONResponse, Response
+    from starlette.routing import Route
+
+    from attempts import CORS_HEADERS, MAX_BODY_BYTES
+
+    async def adaptive(request):
+        if request.method == "OPTIONS":
+            return Response(status_code=204, headers=CORS_HEADERS)
+        body = await request.body()
+        try:
+            if len(body) > MAX_BODY_BYTES:
+                raise ValueError
+            payload = json.loads(body)
+            selector = selectors[payload["quiz"]]
+            responses = {str(q): bool(ok) for q, ok in payload.get("responses", {}).items()}
+        except (ValueError, KeyError, TypeError, AttributeError):
+            return JSONResponse({"error": "expected {quiz, responses} for a calibrated quiz"}, status_code=400,
+                                headers=CORS_HEADERS)
+        return JSONResponse(selector.next_item(responses), headers=CORS_HEADERS)
+
+    return [Route("/adaptive", adaptive, methods=["POST", "OPTIONS"])]
+
+
+def main(argv=None):
+    from attempts import AttemptStore
+    from mcq_analytics import UNANSWERED, ItemBank, ResponseMatrix
+
+    parser = argparse.ArgumentParser(description="Calibrate a 2PL IRT model from stored MCQ attempts.")
+    parser.add_argument("topic", help='e.g. "topic1"')
+    parser.add_argument("--quiz", help="quiz name the page posts (default: the topic's, e.g. Week1)")
+    parser.add_argument("--db", help="attempt store (defaults to the tutor data directory)")
+    parser.add_argument("--out", help=f"calibration file (defaults to {CALIBRATION_DIR}/<topic>.json)")
+    parser.add_argument("--min-attempts", type=int, default=200, help="refuse to calibrate on fewer attempts")
+    args = parser.parse_args(argv)
+    quiz = args.quiz or QUIZ_NAMES.get(args.topic, args.topic)
+    bank = ItemBank.from_qmd(Path(__file__).parent / QUIZ_PAGES.format(topic=args.topic))
+    store = AttemptStore(args.db)
+    matrix = ResponseMatrix(bank)
+    matrix.append(store.rows(quiz))
+    fixed = len(matrix)
+    # Adaptive attempts are posted under their own quiz name and only cover the items they asked
+    matrix.append(store.rows(f"{quiz}-adaptive"))
+    if len(matrix) < args.min_attempts:
+        print(f"Only {len(matrix)} attempts for {quiz}; need at least {args.min_attempts}.")
+        return 1
+    choices = matrix.choices
+    answered = (np.arange(len(matrix)) < fixed)[:, None] | (choices != UNANSWERED)
+    a, b, history = calibrate(choices == matrix.keys, answered)
+    out = Path(args.out) if args.out else Path(__file__).parent / CALIBRATION_DIR / f"{args.topic}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps({
+        "quiz": quiz,
+        "attempts": len(matrix),
+        "items": [f"Q{j + 1}" for j in range(len(bank))],
+        "categories": bank.categories,
+        "a": np.round(a, 4).tolist(),
+        "b": np.round(b, 4).tolist(),
+        "log_likelihood": round(history[-1], 3),
+        "iterations": len(history),
+    }, indent=1), encoding="utf-8")
+    print(f"Calibrated {len(bank)} items on {len(matrix)} attempts in {len(history)} EM iterations -> {out}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
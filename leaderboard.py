@@ -0,0 +1,166 @@
+"""MCQ leaderboards kept up to date as quiz attempts are stored.
+
+A ``Leaderboard`` registers as a listener on an ``AttemptStore`` and folds each
+committed batch into per-quiz state:
+
+- each nickname's best attempt, ranked by score and then by who reached it
+  first;
+- the top ``size`` of those, held in a bounded min-heap (a nickname's best
+  only ever improves, so an entry pushed out of the heap can only come back
+  through a new attempt);
+- running sums of questions answered and answered correctly per category
+  (SK, AN, PS, MT), taken from the ``cat`` and ``ok`` fields of each
+  attempt's details.
+
+After each batch the affected quizzes' JSON is rebuilt once, and a read is a
+dictionary lookup. Readers revalidate with ``If-None-Match`` and get a 304
+while nothing has changed. Open pages subscribe to a server-sent event
+stream and receive the new JSON as soon as it is built.
+"""
+
+import asyncio
+import hashlib
+import heapq
+import json
+import threading
+import time
+from collections import defaultdict
+
+HEARTBEAT_SECONDS = 15
+
+
+class _Quiz:
+    def __init__(self):
+        self.best = {}
+        self.top = []
+        self.categories = defaultdict(lambda: [0, 0])
+        self.attempts = 0
+
+    def add(self, received, nickname, score, total, details, size):
+        self.attempts += 1
+        for answer in details.values():
+            if isinstance(answer, dict) and isinstance(answer.get("cat"), str):
+                sums = self.categories[answer["cat"][:8]]
+                sums[0] += 1
+                sums[1] += bool(answer.get("ok"))
+        previous = self.best.get(nickname)
+        if previous is not None and score <= previous[0]:
+            return
+        # Heap keys order worst first: lower score, then later time
+        self.best[nickname] = (score, total, received)
+        key = (score, -received, nickname)
+        if previous is not None and (previous[0], -previous[2], nickname) in self.top:
+            self.top.remove((previous[0], -previous[2], nickname))
+            self.top.append(key)
+            heapq.heapify(self.top)
+        elif len(self.top) < size:
+            heapq.heappush(self.top, key)
+        elif key > self.top[0]:
+            heapq.heapreplace(self.top, key)
+
+    def payload(self, quiz):
+        ranked = sorted(self.top, reverse=True)
+        return {
+            "quiz": quiz,
+            "attempts": self.attempts,
+            "players": len(self.best),
+            "top": [
+                {"rank": rank, "nickname": nickname, "score": score, "total": self.best[nickname][1],
+                 "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(-negative_time))}
+                for rank, (score, negative_time, nickname) in enumerate(ranked, start=1)
+            ],
+            "categories": {
+                cat: {"answered": answered, "correct": correct, "rate": round(correct / answered, 4)}
+                for cat, (answered, correct) in sorted(self.categories.items())
+            },
+        }
+
+
+class Leaderboard:
+    """Top-``size`` tables and category sums for every quiz in ``store``, updated per batch."""
+
+    def __init__(self, store=None, size=30):
+        self.size = size
+        self._quizzes = defaultdict(_Quiz)
+        self._bodies = {}
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+        if store is not None:
+            self.update(store.rows())
+            store.listeners.append(self.update)
+
+    def update(self, rows):
+        """Fold stored rows ``(received, submitted, quiz, nickname, score, total, details)`` in."""
+        touched = set()
+        with self._lock:
+            for received, _, quiz, nickname, score, total, details in rows:
+                self._quizzes[quiz].add(received, nickname, score, total, json.loads(details), self.size)
+                touched.add(quiz)
+            for quiz in touched:
+                body = json.dumps(self._quizzes[quiz].payload(quiz), separators=(",", ":")).encode()
+                self._bodies[quiz] = (f'"{hashlib.sha1(body).hexdigest()[:16]}"', body)
+            subscribers = {quiz: list(self._subscribers[quiz]) for quiz in touched}
+        for quiz, queues in subscribers.items():
+            body = self._bodies[quiz][1]
+            for loop, q in queues:
+                loop.call_soon_threadsafe(q.put_nowait, body)
+
+    def read(self, quiz):
+        """``(etag, JSON bytes)`` for ``quiz``; a quiz with no attempts has an empty table."""
+        entry = self._bodies.get(quiz)
+        if entry is None:
+            body = json.dumps(_Quiz().payload(quiz), separators=(",", ":")).encode()
+            entry = (f'"{hashlib.sha1(body).hexdigest()[:16]}"', body)
+        return entry
+
+    def subscribe(self, quiz):
+        """An ``asyncio.Queue`` that receives the JSON for ``quiz`` after every change."""
+        q = asyncio.Queue()
+        with self._lock:
+            self._subscribers[quiz].add((asyncio.get_running_loop(), q))
+        return q
+
+    def unsubscribe(self, quiz, q):
+        with self._lock:
+            self._subscribers[quiz] = {entry for entry in self._subscribers[quiz] if entry[1] is not q}
+
+    def subscriber_count(self):
+        return sum(len(s) for s in self._subscribers.values())
+
+
+def leaderboard_routes(board):
+    """Starlette routes for ``/leaderboard`` and its event stream, to pass to ``with_metrics``."""
+    from starlette.responses import Response, StreamingResponse
+    from starlette.routing import Route
+
+    from attempts import CORS_HEADERS
+
+    async def leaderboard(request):
+        etag, body = board.read(request.query_params.get("quiz", ""))
+        # no-cache: browsers keep the copy but revalidate it, which costs a 304 while nothing changed
+        headers = {**CORS_HEADERS, "ETag": etag, "Cache-Control": "no-cache"}
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers=headers)
+        return Response(body, media_type="application/json", headers=headers)
+
+    async def stream(request):
+        quiz = request.query_params.get("quiz", "")
+        q = board.subscribe(quiz)
+
+        async def events():
+            try:
+                yield b"data: " + board.read(quiz)[1] + b"\n\n"
+                while True:
+                    try:
+                        body = await asyncio.wait_for(q.get(), HEARTBEAT_SECONDS)
+                        yield b"data: " + body + b"\n\n"
+                    except asyncio.TimeoutError:
+                        # Comment line: keeps proxies from closing an idle stream
+                        yield b": heartbeat\n\n"
+            finally:
+                board.unsubscribe(quiz, q)
+
+        headers = {**CORS_HEADERS, "Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        return StreamingResponse(events(), media_type="text/event-stream", headers=headers)
+
+    return [Route("/leaderboard", leaderboard), Route("/leaderboard/stream", stream)]
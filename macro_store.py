@@ -0,0 +1,387 @@
+"""Versioned store of UK macro time series for the data-driven exercises.
+
+Topics 7 and 8 discuss real episodes: the Great Moderation, and the UK shocks
+since 2010. This store gives the apps the series behind them:
+
+- ``cpi``: the CPI index, 2015 = 100 (ONS D7BT, monthly);
+- ``bank_rate``: Bank Rate in per cent (Bank of England IUDBEDR). It is held
+  on every calendar day, so the build fills the published dates forward;
+- ``m4``: the M4 money stock, £ million, seasonally adjusted (Bank of
+  England LPMAUYN, monthly);
+- ``gdp``: real GDP, chained volume £ million (ONS ABMI, quarterly);
+- ``output_gap``: the percentage gap between GDP and its Hodrick-Prescott
+  trend (λ = 1600), derived from ``gdp`` at build time.
+
+Every series is regular at its own frequency. It is stored as one ``.npy``
+column of float64 values plus, in ``manifest.json``, its first period. A
+date therefore maps to a row by arithmetic, with no date column to search.
+Each build writes a new version directory, ``macro/<version>/``, named by
+build date and content hash, and ``macro/CURRENT`` names the version apps
+use. An exercise can pin an older version and keep getting the same numbers.
+
+Columns are opened memory-mapped on first use and shared by every session
+in the process. ``Series.between`` is a slice. ``Series.resample`` converts to
+a coarser frequency with one ``np.add.reduceat`` over the group boundaries;
+incomplete periods at either end are dropped. ``Series.growth`` is one
+vectorised ratio. Each takes microseconds.
+
+``python macro_store.py build`` downloads the sources and writes a new
+version. ``--sources DIR`` builds from CSVs downloaded earlier, and ``--keep
+DIR`` saves the downloads. ``python macro_store.py show cpi --from 2010
+--to Q --growth yoy`` prints a query.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+import urllib.request
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+MACRO_DIR = "macro"
+FREQUENCIES = ("D", "M", "Q", "A")
+PERIODS_PER_YEAR = {"D": 365.25, "M": 12, "Q": 4, "A": 1}
+HP_LAMBDA = 1600
+
+_ONS = "https://www.ons.gov.uk/generator?format=csv&uri=/economy/{path}"
+_BOE = ("https://www.bankofengland.co.uk/boeapps/database/_iadb-fromshowcolumns.asp?csv.x=yes"
+        "&Datefrom=01/Jan/1960&Dateto=now&SeriesCodes={code}&CSVF=TN&UsingCodes=Y&VPD=Y&VFD=N")
+SOURCES = {
+    "cpi": {"url": _ONS.format(path="inflationandpriceindices/timeseries/d7bt/mm23"), "frequency": "M",
+            "units": "index, 2015 = 100", "source": "ONS D7BT"},
+    "bank_rate": {"url": _BOE.format(code="IUDBEDR"), "frequency": "D", "units": "per cent",
+                  "source": "Bank of England IUDBEDR"},
+    "m4": {"url": _BOE.format(code="LPMAUYN"), "frequency": "M", "units": "£ million, seasonally adjusted",
+           "source": "Bank of England LPMAUYN"},
+    "gdp": {"url": _ONS.format(path="grossdomesticproductgdp/timeseries/abmi/pn2"), "frequency": "Q",
+            "units": "£ million, chained volume", "source": "ONS ABMI"},
+}
+_MONTHS = {m: k for k, m in enumerate("JAN FEB MAR APR MAY JUN JUL AUG SEP OCT NOV DEC".split())}
+
+
+def ordinal(date, frequency):
+    """Period number of ``date`` (anything ``np.datetime64`` accepts) at ``frequency``, counted from 1970."""
+    day = np.datetime64(date, "D")
+    if frequency == "D":
+        return int(day.astype(np.int64))
+    months = int(day.astype("datetime64[M]").astype(np.int64))
+    return {"M": months, "Q": months // 3, "A": months // 12}[frequency]
+
+
+def period_starts(ordinals, frequency):
+    """First day of each period, as ``datetime64[D]``."""
+    ordinals = np.asarray(ordinals, dtype=np.int64)
+    if frequency == "D":
+        return ordinals.astype("datetime64[D]")
+    months = ordinals * {"M": 1, "Q": 3, "A": 12}[frequency]
+    return months.astype("datetime64[M]").astype("datetime64[D]")
+
+
+def _edges(start, n, frequency, target):
+    """First target period covering ``n`` periods from ``start``, and where each target period starts.
+
+    Edges are source period ordinals, one more than there are target periods,
+    so only the target periods are enumerated, never the source ones.
+    """
+    if frequency == "D":
+        first, last = ordinal(period_starts(start, "D"), target), ordinal(period_starts(start + n - 1, "D"), target)
+        edges = period_starts(np.arange(first, last + 2), target).astype(np.int64)
+    else:
+        per = {("M", "Q"): 3, ("M", "A"): 12, ("Q", "A"): 4}[frequency, target]
+        first, last = start // per, (start + n - 1) // per
+        edges = np.arange(first, last + 2, dtype=np.int64) * per
+    return first, edges
+
+
+@dataclass
+class Series:
+    """A regular time series: ``values[k]`` is period ``start + k`` at ``frequency``."""
+
+    name: str
+    frequency: str
+    start: int
+    values: np.ndarray
+    units: str = ""
+
+    def __len__(self):
+        return len(self.values)
+
+    @property
+    def dates(self):
+        return period_starts(np.arange(self.start, self.start + len(self.values)), self.frequency)
+
+    def between(self, first=None, last=None):
+        """The periods containing ``first`` to ``last`` inclusive, as a view of the same values."""
+        lo = 0 if first is None else max(ordinal(first, self.frequency) - self.start, 0)
+        hi = len(self.values) if last is None else max(ordinal(last, self.frequency) - self.start + 1, lo)
+        return Series(self.name, self.frequency, self.start + lo, self.values[lo:hi], self.units)
+
+    def resample(self, frequency, how="mean"):
+        """Convert to the coarser ``frequency`` by ``how`` (mean, sum, first or last) over each complete period."""
+        if frequency == self.frequency:
+            return self
+        if FREQUENCIES.index(frequency) < FREQUENCIES.index(self.frequency):
+            raise ValueError(f"cannot resample {self.frequency} to the finer frequency {frequency}")
+        if not len(self.values):
+            return Series(self.name, frequency, 0, self.values[:0], self.units)
+        first, edges = _edges(self.start, len(self.values), self.frequency, frequency)
+        offsets = np.clip(edges - self.start, 0, len(self.values))
+        bounds, counts = offsets[:-1], np.diff(offsets)
+        values = np.asarray(self.values, dtype=np.float64)
+        if how in ("mean", "sum"):
+            out = np.add.reduceat(values, bounds)
+            if how == "mean":
+                out /= counts
+        elif how == "first":
+            out = values[bounds]
+        elif how == "last":
+            out = values[offsets[1:] - 1]
+        else:
+            raise ValueError(f"unknown aggregation {how!r}")
+        # Only the first and last periods can be incomplete
+        complete = counts == np.diff(edges)
+        lo = 0 if complete[0] else 1
+        hi = len(out) if complete[-1] else len(out) - 1
+        return Series(self.name, frequency, first + lo, out[lo:max(hi, lo)], self.units)
+
+    def growth(self, periods=1, annualise=False):
+        """Percentage change over ``periods``; ``periods="yoy"`` compares with a year earlier."""
+        if periods == "yoy":
+            periods = round(PERIODS_PER_YEAR[self.frequency])
+        values = np.asarray(self.values, dtype=np.float64)
+        ratio = values[periods:] / values[:-periods] if periods < len(values) else values[:0]
+        if annualise:
+            out = 100.0 * (ratio ** (PERIODS_PER_YEAR[self.frequency] / periods) - 1.0)
+        else:
+            out = 100.0 * (ratio - 1.0)
+        return Series(f"{self.name} growth", self.frequency, self.start + periods, out, "per cent")
+
+    def to_pandas(self):
+        import pandas as pd
+
+        return pd.Series(np.asarray(self.values), index=pd.DatetimeIndex(self.dates), name=self.name)
+
+
+class MacroStore:
+    """One version of the store, with columns opened memory-mapped on first use."""
+
+    def __init__(self, root, version=None):
+        self.root = Path(root)
+        self.version = version or (self.root / "CURRENT").read_text(encoding="utf-8").strip()
+        self.manifest = json.loads((self.root / self.version / "manifest.json").read_text(encoding="utf-8"))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def find(cls, *search_dirs, version=None):
+        """The store shipped next to the app, or ``None`` until ``python macro_store.py build`` has been run."""
+        for directory in (*search_dirs, Path.cwd(), Path(__file__).parent):
+            root = Path(directory) / MACRO_DIR
+            if (root / "CURRENT").exists():
+                try:
+                    return cls(root, version)
+                except (OSError, ValueError, KeyError) as e:
+                    print(f"Warning: Could not open macro store {root}: {e}")
+        return None
+
+    def versions(self):
+        return sorted(p.name for p in self.root.iterdir() if (p / "manifest.json").exists())
+
+    @property
+    def names(self):
+        return sorted(self.manifest["series"])
+
+    def series(self, name):
+        found = self._series.get(name)
+        if found is None:
+            with self._lock:
+                found = self._series.get(name)
+                if found is None:
+                    meta = self.manifest["series"][name]
+                    values = np.load(self.root / self.version / f"{name}.npy", mmap_mode="r")
+                    found = self._series[name] = Series(name, meta["frequency"], meta["start"], values, meta["units"])
+        return found
+
+    def query(self, name, first=None, last=None, frequency=None, how="mean", growth=None, annualise=False):
+        """``name`` from ``first`` to ``last``, converted to ``frequency``, optionally as growth rates."""
+        series = self.series(name)
+        if frequency:
+            # Resample whole periods first, so the range doesn't cut a period short
+            series = series.resample(frequency, how)
+        if growth:
+            series = series.growth(growth, annualise)
+        return series.between(first, last)
+
+
+def write_store(series, root, sources=None):
+    """Write ``{name: Series}`` as a new version under ``root`` and make it current; returns the version."""
+    root = Path(root)
+    digest = hashlib.sha256()
+    for name in sorted(series):
+        s = series[name]
+        digest.update(f"{name}:{s.frequency}:{s.start}:".encode())
+        digest.update(np.ascontiguousarray(s.values, dtype="<f8").tobytes())
+    version = f"{time.strftime('%Y%m%d')}-{digest.hexdigest()[:8]}"
+    target = root / version
+    if not (target / "manifest.json").exists():
+        stage = root / f".{version}.{os.getpid()}"
+        stage.mkdir(parents=True, exist_ok=True)
+        manifest = {"version": version, "built": time.strftime("%Y-%m-%dT%H:%M:%S"), "series": {}}
+        for name, s in series.items():
+            np.save(stage / f"{name}.npy", np.ascontiguousarray(s.values, dtype="<f8"))
+            first, last = period_starts([s.start, s.start + len(s) - 1], s.frequency)
+            manifest["series"][name] = {
+                "frequency": s.frequency, "start": s.start, "length": len(s), "units": s.units,
+                "first": str(first), "last": str(last), "source": (sources or {}).get(name, ""),
+            }
+        (stage / "manifest.json").write_text(json.dumps(manifest, indent=1, ensure_ascii=False), encoding="utf-8")
+        stage.rename(target)
+    tmp = root / f"CURRENT.{os.getpid()}"
+    tmp.write_text(version + "\n", encoding="utf-8")
+    os.replace(tmp, root / "CURRENT")
+    return version
+
+
+def _ons_period(label):
+    parts = label.split()
+    if len(parts) == 2 and parts[1] in _MONTHS:
+        return f"{parts[0]}-{_MONTHS[parts[1]] + 1:02d}-01"
+    if len(parts) == 2 and parts[1][:1] == "Q":
+        return f"{parts[0]}-{3 * (int(parts[1][1]) - 1) + 1:02d}-01"
+    return None
+
+
+def parse_ons(text, frequency):
+    """Periods and values of one frequency from an ONS time series CSV (metadata rows first)."""
+    dates, values = [], []
+    for line in text.splitlines():
+        cells = [c.strip().strip('"') for c in line.split('","')]
+        if len(cells) != 2:
+            continue
+        date = _ons_period(cells[0])
+        if date is None or (frequency == "M") != (cells[0].split()[1] in _MONTHS):
+            continue
+        try:
+            values.append(float(cells[1]))
+        except ValueError:
+            continue
+        dates.append(date)
+    return dates, values
+
+
+def parse_boe(text):
+    """Dates and values from a Bank of England database CSV (``DATE,<code>`` with dates like 02 Jan 1975)."""
+    dates, values = [], []
+    for line in text.splitlines():
+        cells = [c.strip().strip('"') for c in line.split(",")]
+        parts = cells[0].split()
+        # Skips the header, blank lines and any notes the database appends
+        if len(cells) < 2 or len(parts) != 3 or parts[1].upper()[:3] not in _MONTHS:
+            continue
+        try:
+            value = float(cells[1])
+            date = f"{int(parts[2])}-{_MONTHS[parts[1].upper()[:3]] + 1:02d}-{int(parts[0]):02d}"
+        except ValueError:
+            continue
+        dates.append(date)
+        values.append(value)
+    return dates, values
+
+
+def regular(name, dates, values, frequency, units=""):
+    """A ``Series`` from dated observations; days between observations carry the last value forward."""
+    ordinals = np.array([ordinal(d, frequency) for d in dates], dtype=np.int64)
+    order = np.argsort(ordinals, kind="stable")
+    ordinals, values = ordinals[order], np.asarray(values, dtype=np.float64)[order]
+    start = int(ordinals[0])
+    # Index of the latest observation at or before every period
+    latest = np.searchsorted(ordinals, np.arange(start, int(ordinals[-1]) + 1), side="right") - 1
+    filled = values[latest]
+    if frequency != "D":
+        filled[~np.isin(np.arange(start, int(ordinals[-1]) + 1), ordinals)] = np.nan
+    return Series(name, frequency, start, filled, units)
+
+
+def hp_trend(y, lam=HP_LAMBDA):
+    """Hodrick-Prescott trend of ``y``: solves ``(I + lam D'D) trend = y`` with ``D`` the second difference."""
+    n = len(y)
+    second = np.diff(np.eye(n), n=2, axis=0)
+    return np.linalg.solve(np.eye(n) + lam * second.T @ second, y)
+
+
+def output_gap(gdp):
+    """Percentage gap between real GDP and its HP trend."""
+    log_gdp = np.log(np.asarray(gdp.values, dtype=np.float64))
+    return Series("output_gap", gdp.frequency, gdp.start, 100.0 * (log_gdp - hp_trend(log_gdp)), "per cent of trend")
+
+
+def _download(url):
+    request = urllib.request.Request(url, headers={"User-Agent": "Mozilla/5.0 (monetary-economics macro_store)"})
+    with urllib.request.urlopen(request, timeout=60) as response:
+        return response.read().decode("utf-8", errors="replace")
+
+
+def build(root, sources_dir=None, keep=None):
+    """Fetch (or read) every source, derive the output gap and write a new version."""
+    series = {}
+    for name, spec in SOURCES.items():
+        if sources_dir:
+            text = (Path(sources_dir) / f"{name}.csv").read_text(encoding="utf-8")
+        else:
+            text = _download(spec["url"])
+            if keep:
+                Path(keep).mkdir(parents=True, exist_ok=True)
+                (Path(keep) / f"{name}.csv").write_text(text, encoding="utf-8")
+        dates, values = parse_boe(text) if spec["source"].startswith("Bank") else parse_ons(text, spec["frequency"])
+        if not dates:
+            raise ValueError(f"{name}: no observations in the {spec['source']} download")
+        series[name] = regular(name, dates, values, spec["frequency"], spec["units"])
+    series["output_gap"] = output_gap(series["gdp"])
+    sources = {name: spec["source"] for name, spec in SOURCES.items()}
+    sources["output_gap"] = f"HP filter (lambda {HP_LAMBDA}) of log ONS ABMI"
+    return write_store(series, root, sources), series
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or query the macro time-series store.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    make = commands.add_parser("build", help="download the sources and write a new version")
+    make.add_argument("--sources", help="build from CSVs saved earlier (<name>.csv) instead of downloading")
+    make.add_argument("--keep", help="save the downloaded CSVs here")
+    show = commands.add_parser("show", help="print a query")
+    show.add_argument("name")
+    show.add_argument("--from", dest="first")
+    show.add_argument("--until", dest="last")
+    show.add_argument("--to", dest="frequency", choices=FREQUENCIES)
+    show.add_argument("--how", default="mean", choices=("mean", "sum", "first", "last"))
+    show.add_argument("--growth", help='periods to compare over, or "yoy"')
+    show.add_argument("--version")
+    args = parser.parse_args(argv)
+
+    root = Path(__file__).parent / MACRO_DIR
+    if args.command == "build":
+        version, series = build(root, args.sources, args.keep)
+        for name, s in series.items():
+            first, last = period_starts([s.start, s.start + len(s) - 1], s.frequency)
+            print(f"{name:11s} {s.frequency} {first} to {last} ({len(s)} periods)")
+        print(f"Wrote version {version} to {root}")
+        return 0
+    store = MacroStore.find(version=args.version)
+    if store is None:
+        print("No macro store yet; run `python macro_store.py build`.")
+        return 1
+    growth = args.growth if args.growth in (None, "yoy") else int(args.growth)
+    result = store.query(args.name, args.first, args.last, args.frequency, args.how, growth)
+    for date, value in zip(result.dates, result.values):
+        print(f"{date}  {value:10.3f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,223 @@
+"""Cohort analytics for the category-tagged MCQ quizzes.
+
+Stored quiz attempts (see ``attempts.py``) are unpacked once into an attempts
+x items response matrix: the option each student chose as a small integer
+code, and whether it was the key. ``ResponseMatrix`` grows as batches arrive,
+so it can sit on the attempt store's listeners like the leaderboard does.
+
+``analyse`` then computes everything for the whole cohort in one vectorised
+pass over the matrix:
+
+- category scores: correct answers per SK/AN/PS/MT category, per attempt;
+- item difficulty: the share answering each item correctly;
+- discrimination: the point-biserial correlation between each item and the
+  rest score (total minus that item), so an item is not correlated with itself;
+- distractor analysis: how often each option was chosen and the mean total
+  score of those who chose it. A distractor that attracts stronger students
+  than the key flags an item to review;
+- KR-20 reliability of the whole quiz.
+
+Offline, ``python mcq_analytics.py topic1mcqs.qmd --quiz Week1`` prints the
+report for the stored attempts.
+"""
+
+import argparse
+import json
+import re
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+CATEGORIES = {
+    "SK": "Subject Knowledge",
+    "AN": "Analysis",
+    "PS": "Problem Solving",
+    "MT": "Mathematical Thinking",
+}
+UNANSWERED = -1
+
+_ITEM = re.compile(r"<div class=\"mcq-we-q\">\s*\*\*(?:(SK|AN|PS|MT)\d+\)\s*)?(.*?)\*\*(.*?)</div>", re.S)
+_OPTION = re.compile(r"(answer\s*=\s*)?\"((?:[^\"\\]|\\.)*)\"")
+_LONGMCQ = re.compile(r"longmcq\(c\((.*?)\)\)`", re.S)
+
+
+def _norm(text):
+    return " ".join(str(text or "").split())
+
+
+@dataclass
+class ItemBank:
+    """The items of one quiz page in page order; item ``j`` is posted as ``Q{j+1}``."""
+
+    stems: list
+    categories: list
+    options: list
+    keys: list
+
+    @classmethod
+    def from_qmd(cls, path):
+        """Parse the ``mcq-we-q`` blocks of a ``topicNmcqs.qmd`` page."""
+        stems, categories, options, keys = [], [], [], []
+        for category, stem, body in _ITEM.findall(Path(path).read_text(encoding="utf-8")):
+            mcq = _LONGMCQ.search(body)
+            if not mcq:
+                continue
+            choices = [(bool(answer), re.sub(r"\\(.)", r"\1", text)) for answer, text in _OPTION.findall(mcq.group(1))]
+            stems.append(_norm(stem))
+            categories.append(category or "")
+            options.append([_norm(text) for _, text in choices])
+            keys.append(next((k for k, (answer, _) in enumerate(choices) if answer), 0))
+        return cls(stems, categories, options, keys)
+
+    def __len__(self):
+        return len(self.stems)
+
+
+class ResponseMatrix:
+    """Attempts x items option codes, grown in place as attempts are stored.
+
+    Codes index ``bank.options[j]``; answers that are not in the bank get new
+    codes, and ``UNANSWERED`` marks skipped items.
+    """
+
+    def __init__(self, bank, quiz=None):
+        self.bank = bank
+        self.quiz = quiz
+        self.options = [{text: k for k, text in enumerate(opts)} for opts in bank.options]
+        self.keys = np.array(bank.keys, dtype=np.int16)
+        self.nicknames = []
+        self._choices = np.full((1024, len(bank)), UNANSWERED, dtype=np.int16)
+        self._n = 0
+
+    def __len__(self):
+        return self._n
+
+    @property
+    def choices(self):
+        return self._choices[:self._n]
+
+    def _code(self, j, text):
+        codes = self.options[j]
+        code = codes.get(text)
+        if code is None:
+            code = codes.setdefault(_norm(text), len(codes))
+            # Remember the raw spelling too, so the next identical answer skips normalising
+            codes[text] = code
+        return code
+
+    def append(self, rows):
+        """Add stored rows ``(received, submitted, quiz, nickname, score, total, details)``."""
+        m = len(self.bank)
+        block = []
+        for row in rows:
+            if self.quiz is not None and row[2] != self.quiz:
+                continue
+            codes = [UNANSWERED] * m
+            for name, answer in json.loads(row[6]).items():
+                j = int(name[1:]) - 1 if name[:1] == "Q" and name[1:].isdigit() else -1
+                if 0 <= j < m and isinstance(answer, dict) and answer.get("selected"):
+                    codes[j] = self._code(j, answer["selected"])
+            self.nicknames.append(row[3])
+            block.append(codes)
+        needed = self._n + len(block)
+        if needed > len(self._choices):
+            grown = np.full((max(needed, 2 * len(self._choices)), m), UNANSWERED, dtype=np.int16)
+            grown[:self._n] = self._choices[:self._n]
+            self._choices = grown
+        if block:
+            self._choices[self._n:needed] = block
+        self._n = needed
+
+
+def analyse(choices, keys, categories):
+    """Cohort statistics for option codes ``choices`` (n x m), answer ``keys`` (m) and item ``categories`` (m).
+
+    Returns a dict of arrays; see the module docstring.
+    """
+    choices = np.asarray(choices)
+    n, m = choices.shape
+    X = (choices == np.asarray(keys)).astype(np.float32)
+    totals = X.sum(axis=1)
+
+    names = sorted(set(categories))
+    onehot = (np.asarray(categories)[:, None] == np.array(names)[None, :]).astype(np.float32)
+    category_scores = X @ onehot
+
+    p = X.mean(axis=0)
+    rest = totals[:, None] - X
+    covariance = (X * rest).mean(axis=0) - p * rest.mean(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        discrimination = covariance / (np.sqrt(p * (1 - p)) * rest.std(axis=0))
+
+    # Option counts and choosers' mean totals for every item at once: one bincount over item*width + code
+    width = int(max(choices.max(initial=0), np.max(keys, initial=0))) + 2
+    flat = (np.arange(m) * width)[None, :] + choices + 1
+    counts = np.bincount(flat.ravel(), minlength=m * width).reshape(m, width)
+    sums = np.bincount(flat.ravel(), weights=np.repeat(totals, m), minlength=m * width).reshape(m, width)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        chooser_mean = sums / counts
+    key_mean = chooser_mean[np.arange(m), np.asarray(keys) + 1]
+    distractor = np.ones((m, width), dtype=bool)
+    distractor[:, 0] = False
+    distractor[np.arange(m), np.asarray(keys) + 1] = False
+    attractive = distractor & (counts > 0) & (chooser_mean >= key_mean[:, None])
+
+    variance = totals.var()
+    reliability = m / (m - 1) * (1 - (p * (1 - p)).sum() / variance) if m > 1 and variance > 0 else float("nan")
+    return {
+        "attempts": n,
+        "totals": totals,
+        "categories": names,
+        "category_scores": category_scores,
+        "category_items": onehot.sum(axis=0),
+        "difficulty": p,
+        "discrimination": discrimination,
+        "option_counts": counts[:, 1:],
+        "unanswered": counts[:, 0],
+        "option_mean_total": chooser_mean[:, 1:],
+        "review": attractive[:, 1:].any(axis=1) | (discrimination < 0.1),
+        "reliability": float(reliability),
+    }
+
+
+def report(matrix, stats):
+    """Plain-text summary: category means, then one line per item."""
+    bank = matrix.bank
+    lines = [f"{stats['attempts']} attempts, KR-20 reliability {stats['reliability']:.2f}", ""]
+    for k, name in enumerate(stats["categories"]):
+        share = stats["category_scores"][:, k].mean() / max(stats["category_items"][k], 1)
+        lines.append(f"{CATEGORIES.get(name, name or 'Untagged'):24s} {share:6.1%}")
+    lines += ["", f"{'item':6s} {'cat':3s} {'p':>5s} {'r_pb':>5s}  options (share, mean total of choosers)"]
+    for j in range(len(bank)):
+        total = stats["option_counts"][j].sum() + stats["unanswered"][j]
+        options = "  ".join(
+            f"{'*' if k == bank.keys[j] else ' '}{chr(65 + k) if k < 26 else k}"
+            f" {stats['option_counts'][j, k] / max(total, 1):4.0%} {stats['option_mean_total'][j, k]:4.1f}"
+            for k in range(len(bank.options[j]))
+        )
+        flag = "  REVIEW" if stats["review"][j] else ""
+        lines.append(f"Q{j + 1:<5d} {bank.categories[j]:3s} {stats['difficulty'][j]:5.2f} "
+                     f"{stats['discrimination'][j]:5.2f}  {options}{flag}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    from attempts import AttemptStore
+
+    parser = argparse.ArgumentParser(description="Item analysis for stored MCQ attempts.")
+    parser.add_argument("qmd", help='quiz page, e.g. "topic1mcqs.qmd"')
+    parser.add_argument("--quiz", default="Week1", help="quiz name the page posts")
+    parser.add_argument("--db", help="attempt store (defaults to the tutor data directory)")
+    args = parser.parse_args(argv)
+    matrix = ResponseMatrix(ItemBank.from_qmd(args.qmd), quiz=args.quiz)
+    matrix.append(AttemptStore(args.db).rows(args.quiz))
+    if not len(matrix):
+        print(f"No attempts stored for {args.quiz}.")
+        return 1
+    print(report(matrix, analyse(matrix.choices, matrix.keys, matrix.bank.categories)))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
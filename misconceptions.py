@@ -0,0 +1,263 @@
+"""Misconception clusters over logged answers, served as reviewed feedback templates.
+
+Offline, ``python misconceptions.py topic1`` clusters the answers in the
+answer log per question (TF-IDF over normalised stems, spherical k-means
+with k-means++ seeding, all in NumPy) and writes
+``misconceptions/topic1.json``. Each cluster carries its centroid, a few
+representative answers and an empty ``template``; ``--draft`` asks the LLM to
+draft one. Nothing is served until a tutor edits the template and sets
+``"reviewed": true``. Re-running keeps reviewed clusters and drops new
+clusters that duplicate them. Each cluster names the IDF weights its
+centroid was built with, under the question's ``"idfs"``, so a re-run
+doesn't shift the weights a reviewed centroid is matched on.
+
+Online, ``MisconceptionLibrary.match`` projects an answer onto the reviewed
+centroids with one matrix-vector product per set of IDF weights and returns the template when the
+cosine similarity clears the threshold, so only novel answers reach the LLM.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+from answer_log import AnswerLog
+from concept_coverage import normalise
+
+LIBRARY_DIR = "misconceptions"
+DEFAULT_THRESHOLD = 0.6
+# New clusters this close to a reviewed one are treated as the same misconception.
+DUPLICATE_SIMILARITY = 0.8
+
+
+@dataclass
+class Match:
+    cluster_id: str
+    similarity: float
+    template: str
+
+
+def _term_counts(answer, index):
+    counts = np.zeros(len(index), dtype=np.float32)
+    for term in normalise(answer):
+        column = index.get(term)
+        if column is not None:
+            counts[column] += 1.0
+    return counts
+
+
+def _unit_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+
+
+def tfidf(answers, min_df=2):
+    """L2-normalised sublinear TF-IDF matrix, vocabulary and idf weights."""
+    docs = [normalise(answer) for answer in answers]
+    df = {}
+    for doc in docs:
+        for term in set(doc):
+            df[term] = df.get(term, 0) + 1
+    vocabulary = sorted(term for term, count in df.items() if count >= min_df)
+    index = {term: i for i, term in enumerate(vocabulary)}
+    idf = np.array(
+        [np.log((1 + len(docs)) / (1 + df[term])) + 1.0 for term in vocabulary], dtype=np.float32
+    )
+    counts = np.stack([_term_counts(answer, index) for answer in answers]) if answers else np.zeros((0, 0))
+    weights = np.log1p(counts) * idf
+    return _unit_rows(weights.astype(np.float32)), vocabulary, idf
+
+
+def spherical_kmeans(X, k, iterations=50, seed=0):
+    """Cluster unit rows of ``X`` by cosine similarity; returns labels and unit centroids."""
+    rng = np.random.default_rng(seed)
+    n = X.shape[0]
+    k = max(1, min(k, n))
+    centroids = X[[rng.integers(n)]]
+    while len(centroids) < k:
+        distance = np.clip(1.0 - (X @ centroids.T).max(axis=1), 0.0, None)
+        total = distance.sum()
+        pick = rng.choice(n, p=distance / total) if total > 0 else rng.integers(n)
+        centroids = np.vstack([centroids, X[pick]])
+
+    labels = np.zeros(n, dtype=np.int64)
+    for _ in range(iterations):
+        labels = (X @ centroids.T).argmax(axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, X)
+        updated = np.where(np.linalg.norm(sums, axis=1, keepdims=True) > 0, _unit_rows(sums), centroids)
+        if np.allclose(updated, centroids, atol=1e-6):
+            break
+        centroids = updated
+    return labels, centroids
+
+
+def draft_template(examples):
+    """Ask the LLM for a first-draft template; a tutor reviews it before it is served."""
+    from groq import Groq
+
+    client = Groq(api_key=os.environ["GROQ_API_KEY"])
+    joined = "\n\n".join(f"- {example}" for example in examples)
+    prompt = f"""The following student answers to the same Monetary Economics question were grouped together because they share the same reasoning:
+
+{joined}
+
+Write 120-180 words of feedback that any student giving this kind of answer could receive. Acknowledge what is right, name the shared gap or misconception, and give HINTS and a probing question rather than the full answer."""
+    message = client.chat.completions.create(
+        messages=[{"role": "user", "content": prompt}],
+        model="llama-3.3-70b-versatile",
+    )
+    return message.choices[0].message.content
+
+
+def cluster_question(answers, k=None, min_size=5, examples=3):
+    """Cluster one question's answers into library entries plus their idf weights."""
+    X, vocabulary, idf = tfidf(answers)
+    if not vocabulary:
+        return [], {}
+    k = k or min(20, max(1, round((len(answers) / 2) ** 0.5)))
+    labels, centroids = spherical_kmeans(X, k)
+    clusters = []
+    for label, centroid in enumerate(centroids):
+        members = np.flatnonzero(labels == label)
+        if len(members) < min_size:
+            continue
+        closest = members[np.argsort(-(X[members] @ centroid))][:examples]
+        sample = [answers[i] for i in closest]
+        clusters.append({
+            "size": int(len(members)),
+            "centroid": {vocabulary[i]: round(float(w), 5) for i, w in enumerate(centroid) if w > 1e-4},
+            "examples": sample,
+            "template": "",
+            "reviewed": False,
+        })
+    return clusters, {term: round(float(w), 5) for term, w in zip(vocabulary, idf)}
+
+
+def _centroid_similarity(a, b):
+    dot = sum(w * b.get(term, 0.0) for term, w in a.items())
+    norm = np.sqrt(sum(w * w for w in a.values()) * sum(w * w for w in b.values()))
+    return dot / norm if norm else 0.0
+
+
+def _idf_key(idf):
+    return hashlib.sha1(json.dumps(idf, sort_keys=True).encode("utf-8")).hexdigest()[:8]
+
+
+def build_library(topic, log, out, k=None, min_size=5, draft=False):
+    """Re-cluster every question for ``topic`` and merge with the reviewed entries in ``out``."""
+    library = {"topic": topic, "threshold": DEFAULT_THRESHOLD, "questions": {}}
+    if out.exists():
+        library = json.loads(out.read_text(encoding="utf-8"))
+
+    by_question = {}
+    for question, answer in log.answers(topic):
+        by_question.setdefault(str(question), []).append(answer)
+
+    for question, answers in sorted(by_question.items()):
+        entry = library["questions"].setdefault(question, {"idfs": {}, "clusters": []})
+        if "idf" in entry:
+            # Libraries written before per-cluster weights: every cluster used the one shared idf
+            legacy = entry.pop("idf")
+            entry.setdefault("idfs", {})[_idf_key(legacy)] = legacy
+            for cluster in entry["clusters"]:
+                cluster.setdefault("idf", _idf_key(legacy))
+        reviewed = [c for c in entry["clusters"] if c.get("reviewed")]
+        clusters, idf = cluster_question(answers, k=k, min_size=min_size)
+        fresh = [
+            c for c in clusters
+            if all(_centroid_similarity(c["centroid"], r["centroid"]) < DUPLICATE_SIMILARITY for r in reviewed)
+        ]
+        key = _idf_key(idf)
+        for cluster in fresh:
+            cluster["idf"] = key
+        entry["clusters"] = reviewed + fresh
+        # Keep the weights each reviewed centroid was built with; drop any no cluster uses
+        entry["idfs"] = {**entry["idfs"], key: idf}
+        entry["idfs"] = {k: v for k, v in entry["idfs"].items() if any(c["idf"] == k for c in entry["clusters"])}
+        used = {int(c["id"].rsplit("-", 1)[1]) for c in reviewed}
+        numbers = (n for n in range(len(entry["clusters"]) + len(used)) if n not in used)
+        for cluster in fresh:
+            cluster["id"] = f"q{question}-{next(numbers)}"
+            if draft:
+                cluster["template"] = draft_template(cluster["examples"])
+        print(f"{topic} Q{question}: {len(answers)} answers, {len(reviewed)} reviewed, {len(fresh)} new clusters")
+
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(library, indent=2, ensure_ascii=False), encoding="utf-8")
+    return library
+
+
+class MisconceptionLibrary:
+    """Reviewed cluster centroids per question, grouped by the idf weights they were built with."""
+
+    def __init__(self, library):
+        self.threshold = float(os.environ.get("TUTOR_MISCONCEPTION_THRESHOLD", library.get("threshold", DEFAULT_THRESHOLD)))
+        self.questions = {}
+        for question, entry in library.get("questions", {}).items():
+            idfs = entry.get("idfs", {None: entry.get("idf", {})})
+            groups = {}
+            for cluster in entry["clusters"]:
+                if cluster.get("reviewed") and cluster.get("template", "").strip():
+                    groups.setdefault(cluster.get("idf"), []).append(cluster)
+            if groups:
+                self.questions[int(question)] = [self._group(idfs[key], clusters) for key, clusters in groups.items()]
+
+    @staticmethod
+    def _group(weights, clusters):
+        terms = sorted(set(weights).union(*(c["centroid"] for c in clusters)))
+        index = {term: i for i, term in enumerate(terms)}
+        idf = np.array([weights.get(term, 1.0) for term in terms], dtype=np.float32)
+        centroids = np.zeros((len(clusters), len(terms)), dtype=np.float32)
+        for row, cluster in enumerate(clusters):
+            for term, weight in cluster["centroid"].items():
+                centroids[row, index[term]] = weight
+        return index, idf, _unit_rows(centroids), clusters
+
+    @classmethod
+    def for_topic(cls, topic, search_dirs=()):
+        """Load ``misconceptions/<topic>.json``; an empty library if there is none yet."""
+        for directory in (*search_dirs, Path.cwd(), Path(__file__).parent):
+            path = Path(directory) / LIBRARY_DIR / f"{topic}.json"
+            if path.exists():
+                try:
+                    return cls(json.loads(path.read_text(encoding="utf-8")))
+                except (OSError, ValueError, KeyError) as e:
+                    print(f"Warning: Could not load misconception library {path}: {e}")
+        return cls({})
+
+    def match(self, question, answer):
+        """The reviewed template for ``answer`` if it sits in a known cluster."""
+        best = None
+        for index, idf, centroids, clusters in self.questions.get(question, ()):
+            vector = np.log1p(_term_counts(answer, index)) * idf
+            norm = np.linalg.norm(vector)
+            if not norm:
+                continue
+            similarities = centroids @ (vector / norm)
+            row = int(similarities.argmax())
+            if similarities[row] >= self.threshold and (best is None or similarities[row] > best.similarity):
+                best = Match(clusters[row]["id"], float(similarities[row]), clusters[row]["template"])
+        return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cluster logged answers into misconception templates.")
+    parser.add_argument("topic", help='e.g. "topic1"')
+    parser.add_argument("--db", help="answer log (defaults to the tutor data directory)")
+    parser.add_argument("--out", help=f"library file (defaults to {LIBRARY_DIR}/<topic>.json)")
+    parser.add_argument("-k", type=int, help="clusters per question (default: sqrt(n/2), at most 20)")
+    parser.add_argument("--min-size", type=int, default=5, help="smallest cluster worth a template")
+    parser.add_argument("--draft", action="store_true", help="draft templates with the LLM for review")
+    args = parser.parse_args(argv)
+    out = Path(args.out) if args.out else Path(__file__).parent / LIBRARY_DIR / f"{args.topic}.json"
+    build_library(args.topic, AnswerLog(args.db), out, k=args.k, min_size=args.min_size, draft=args.draft)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,146 @@
+"""Adaptive-expectations simulation of a change in money growth (topic 4, Question 3).
+
+Annual periods, rates in percent::
+
+    dynamic QTM         π_t   = g_M,t - g_Y,t                      (constant velocity)
+    output growth       g_Y,t = g_Y* + α (π_t - πᵉ_t)              (expectations-augmented)
+    adaptive            πᵉ_t  = πᵉ_t-1 + λ (π_t-1 - πᵉ_t-1)
+    real rate           r_t   = r* - γ (g_M,t - π_t - g_Y*)          (liquidity effect of real balances)
+    Fisher              i_t   = r_t + πᵉ_t
+
+The first two lines give ``π_t = (g_M,t - g_Y* + α πᵉ_t) / (1 + α)``, so each
+period is a few array operations. ``simulate`` runs any number of money-growth
+schedules and parameter sets at once, one row per path. The figures in
+``topic4answers.qmd`` and the topic 4 Space's simulator tab come from
+``figure``, which is memoised on its parameters.
+"""
+
+import json
+from functools import lru_cache
+
+import numpy as np
+
+G_Y_NATURAL = 1.0
+R_NATURAL = 2.0
+
+# Slider axes: (label, start, stop, step, default)
+AXES = {
+    "g_before": ("Initial money growth (%)", 0.0, 10.0, 0.5, 3.0),
+    "g_after": ("New money growth (%)", 0.0, 20.0, 0.5, 6.0),
+    "duration": ("Years at new rate (0 = permanent)", 0, 20, 1, 0),
+    "ramp": ("Years to phase in", 0, 10, 1, 0),
+    "speed": ("Expectations adjustment speed λ", 0.05, 1.0, 0.05, 0.35),
+    "alpha": ("Output response to surprises α", 0.0, 2.0, 0.1, 0.5),
+    "gamma": ("Liquidity effect γ", 0.0, 1.5, 0.1, 0.6),
+    "horizon": ("Horizon (years)", 15, 60, 5, 30),
+}
+DEFAULTS = {"shock_at": 5, **{name: spec[4] for name, spec in AXES.items()}}
+
+SERIES = {
+    "money_growth": ("Money growth g_M", "darkblue"),
+    "output_growth": ("Output growth g_Y", "darkgreen"),
+    "inflation": ("Inflation π", "darkorange"),
+    "real_rate": ("Real interest rate r", "darkred"),
+    "nominal_rate": ("Nominal interest rate i", "purple"),
+}
+
+
+def schedule(g_before, g_after, shock_at, horizon, duration=0, ramp=0):
+    """Money-growth path: ``g_before`` until ``shock_at``, then ``g_after``.
+
+    ``ramp`` spreads the change over several periods and ``duration`` > 0
+    returns to ``g_before`` after that many periods.
+    """
+    t = np.arange(horizon, dtype=float)
+    weight = np.clip((t - shock_at + 1) / max(ramp, 1), 0.0, 1.0)
+    if duration:
+        weight = np.where(t >= shock_at + duration, 0.0, weight)
+    return g_before + (g_after - g_before) * weight
+
+
+def simulate(g_M, speed=0.35, alpha=0.5, gamma=0.6):
+    """Paths for money-growth schedules ``g_M`` (paths x periods); parameters broadcast per path.
+
+    Expectations start in the steady state of the first period's money growth.
+    """
+    g_M = np.atleast_2d(np.asarray(g_M, dtype=float))
+    speed, alpha, gamma = (np.broadcast_to(np.asarray(p, dtype=float), g_M.shape[:1]) for p in (speed, alpha, gamma))
+    n, horizon = g_M.shape
+    expected = np.empty((n, horizon))
+    inflation = np.empty((n, horizon))
+    expected_t = g_M[:, 0] - G_Y_NATURAL
+    for t in range(horizon):
+        expected[:, t] = expected_t
+        inflation[:, t] = (g_M[:, t] - G_Y_NATURAL + alpha * expected_t) / (1.0 + alpha)
+        expected_t = expected_t + speed * (inflation[:, t] - expected_t)
+    output = G_Y_NATURAL + alpha[:, None] * (inflation - expected)
+    real_rate = R_NATURAL - gamma[:, None] * (g_M - inflation - G_Y_NATURAL)
+    return {
+        "money_growth": g_M,
+        "output_growth": output,
+        "inflation": inflation,
+        "expected_inflation": expected,
+        "real_rate": real_rate,
+        "nominal_rate": real_rate + expected,
+    }
+
+
+def _params_key(params):
+    merged = {**DEFAULTS, **params}
+    return tuple(sorted((k, round(float(v), 4)) for k, v in merged.items()))
+
+
+@lru_cache(maxsize=1024)
+def _figure_cached(key, series):
+    p = dict(key)
+    horizon = int(p["horizon"])
+    g_M = schedule(p["g_before"], p["g_after"], int(p["shock_at"]), horizon, int(p["duration"]), int(p["ramp"]))
+    paths = {k: v[0] for k, v in simulate(g_M, p["speed"], p["alpha"], p["gamma"]).items()}
+    t = list(range(horizon))
+    names = list(SERIES) if series == "all" else [series]
+
+    data, layout = [], {
+        "height": 320 if len(names) == 1 else 640,
+        "margin": {"t": 40, "b": 40, "l": 60, "r": 20},
+        "showlegend": series in ("all", "inflation"),
+        "legend": {"orientation": "h", "y": -0.15},
+        "shapes": [],
+        "annotations": [],
+    }
+    for k, name in enumerate(names, start=1):
+        title, colour = SERIES[name]
+        suffix = "" if k == 1 else str(k)
+        axes = {"xaxis": f"x{suffix}", "yaxis": f"y{suffix}"}
+        data.append({"x": t, "y": np.round(paths[name], 3).tolist(), "mode": "lines", "name": title,
+                     "line": {"color": colour, "width": 3}, **axes})
+        if name == "inflation":
+            data.append({"x": t, "y": np.round(paths["expected_inflation"], 3).tolist(), "mode": "lines",
+                         "name": "Expected inflation πᵉ", "line": {"color": colour, "dash": "dot"}, **axes})
+        if len(names) > 1:
+            row, col = divmod(k - 1, 2)
+            layout[f"xaxis{suffix}"] = {"domain": [0.55 * col, 0.55 * col + 0.45], "anchor": f"y{suffix}",
+                                        "title": {"text": "Year"}}
+            layout[f"yaxis{suffix}"] = {"domain": [1 - (row + 1) * 0.34 + 0.06, 1 - row * 0.34],
+                                        "anchor": f"x{suffix}", "ticksuffix": "%"}
+            layout["annotations"].append({"text": title, "xref": f"x{suffix} domain", "yref": f"y{suffix} domain",
+                                          "x": 0.5, "y": 1.12, "showarrow": False})
+        else:
+            layout["xaxis"] = {"title": {"text": "Year"}}
+            layout["yaxis"] = {"title": {"text": title}, "ticksuffix": "%"}
+            layout["title"] = {"text": title}
+        layout["shapes"].append({"type": "line", "xref": f"x{suffix}", "yref": f"y{suffix} domain",
+                                 "x0": p["shock_at"] - 0.5, "x1": p["shock_at"] - 0.5, "y0": 0, "y1": 1,
+                                 "line": {"color": "gray", "dash": "dash", "width": 1}})
+    return json.dumps({"data": data, "layout": layout})
+
+
+def figure_json(series="all", **params):
+    """Plotly figure JSON for one series (or ``"all"``), memoised on the rounded parameters."""
+    return _figure_cached(_params_key(params), series)
+
+
+def figure(series="all", **params):
+    """``plotly.graph_objects.Figure`` for Quarto documents."""
+    import plotly.io as pio
+
+    return pio.from_json(figure_json(series, **params))
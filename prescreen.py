@@ -0,0 +1,158 @@
+"""Local pre-screening of student answers before they reach the LLM.
+
+Trivial submissions (a few words, the placeholder text, the question pasted
+back, a non-English answer, or keyboard mashing) get instant canned guidance
+instead of a 70b completion. Only substantive answers are sent upstream.
+Everything here is plain string work so a screen costs microseconds.
+"""
+
+import re
+from functools import lru_cache
+
+PLACEHOLDER = "Type your answer here..."
+
+MIN_WORDS = 15
+# Short answers must mention at least one key concept to be worth a completion.
+SHORT_ANSWER_WORDS = 40
+# Share of the answer's words that may come straight from the question.
+MAX_QUESTION_OVERLAP = 0.8
+# English prose is roughly 40% stopwords; a tenth of another language's is telling.
+MIN_STOPWORD_RATIO = 0.1
+
+_WORD = re.compile(r"[^\W\d_]+")
+
+STOPWORDS = frozenset(
+    """a about above after again all also an and any are as at be because been before
+    being between both but by can could did do does doing down during each few for from
+    further had has have having he her here him his how i if in into is it its itself
+    just more most my no nor not now of off on once only or other our out over own same
+    she should so some such than that the their them then there these they this those
+    through to too under until up very was we were what when where which while who whom
+    why will with would you your""".split()
+)
+
+# Frequent function words of the other languages most often seen in submissions.
+_FOREIGN_STOPWORDS = frozenset(
+    """el la los las del que por para con una es pero como más le les des est pas pour
+    avec dans qui sur ce cette sont der die das und ist nicht mit von den eine auch sich
+    il di che non sono della delle gli não os das dos uma são""".split()
+) - STOPWORDS
+
+_VOWELS = frozenset("aeiouy")
+
+_INFLECTIONS = (("ies", "y"), ("es", ""), ("ed", ""), ("ing", ""), ("ly", ""), ("s", ""))
+_DERIVATIONS = ("isation", "ization", "ation", "ity", "ness", "ment", "ary")
+
+MESSAGES = {
+    "placeholder": (
+        "It looks like the answer box still contains the placeholder text. "
+        "Type your own answer and then ask for feedback."
+    ),
+    "too_short": (
+        "Your answer is very short. Try to write at least a few sentences: state your "
+        "main argument, explain the economic reasoning behind it and, where you can, "
+        "give an example. Then ask for feedback again."
+    ),
+    "restates_question": (
+        "Your answer mostly repeats the question. Rather than restating it, explain "
+        "*why*: set out the mechanism, define the key terms you rely on, and support "
+        "your argument with an example or a short derivation."
+    ),
+    "not_english": (
+        "The AI tutor can only give feedback on answers written in English. "
+        "Please rewrite your answer in English and try again."
+    ),
+    "gibberish": (
+        "Your answer doesn't look like readable text yet. Write out your reasoning "
+        "in full sentences and then ask for feedback."
+    ),
+    "off_topic": (
+        "Your answer is short and doesn't yet use any of the key ideas for this question. "
+        "Re-read the question and the relevant part of the reading, then build your answer "
+        "around concepts such as: {concepts}."
+    ),
+}
+
+
+def tokenize(text):
+    return _WORD.findall(text.lower())
+
+
+@lru_cache(maxsize=64)
+def _question_vocabulary(question_text):
+    return frozenset(tokenize(question_text))
+
+
+@lru_cache(maxsize=64)
+def _concept_terms(concepts):
+    """Split a comma-separated concept list into (label, content-word set) pairs."""
+    terms = []
+    for label in (part.strip() for part in concepts.split(",")):
+        words = frozenset(w for w in tokenize(label) if w not in STOPWORDS and len(w) > 2)
+        if words:
+            terms.append((label, words))
+    return tuple(terms)
+
+
+def stem(word):
+    """Light suffix stripping, enough to match "expectations" with "expected"."""
+    for suffix, replacement in _INFLECTIONS:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            if suffix == "s" and word[-2] in "su":
+                break
+            word = word[: -len(suffix)] + replacement
+            break
+    for _ in range(2):
+        for suffix in _DERIVATIONS:
+            if word.endswith(suffix) and len(word) - len(suffix) >= 4:
+                word = word[: -len(suffix)]
+                break
+        else:
+            break
+    if word.endswith("e") and len(word) >= 4:
+        word = word[:-1]
+    return word
+
+
+def concept_hits(words, concepts):
+    """Concept labels from ``concepts`` with at least half their content words in ``words``."""
+    stems = {stem(w) for w in words}
+    return [
+        label
+        for label, terms in _concept_terms(concepts)
+        if 2 * sum(1 for t in terms if stem(t) in stems) >= len(terms)
+    ]
+
+
+def prescreen(answer, question_text="", concepts="", placeholder=PLACEHOLDER):
+    """Return ``(reason, guidance)`` for trivial answers, or ``None`` to go upstream."""
+    stripped = answer.strip()
+    if stripped.lower() == placeholder.lower():
+        return "placeholder", MESSAGES["placeholder"]
+
+    words = tokenize(stripped)
+    if len(words) < MIN_WORDS:
+        return "too_short", MESSAGES["too_short"]
+
+    english = sum(1 for w in words if w in STOPWORDS)
+    foreign = sum(1 for w in words if w in _FOREIGN_STOPWORDS)
+    if foreign > english and foreign >= MIN_STOPWORD_RATIO * len(words):
+        return "not_english", MESSAGES["not_english"]
+    if english < MIN_STOPWORD_RATIO * len(words):
+        # Terse bullet-point English is fine; other scripts and keyboard mashing are not.
+        letters = "".join(words)
+        if sum(1 for ch in letters if not ch.isascii()) > 0.3 * len(letters):
+            return "not_english", MESSAGES["not_english"]
+        if sum(1 for ch in letters if ch in _VOWELS) < 0.2 * len(letters):
+            return "gibberish", MESSAGES["gibberish"]
+
+    if question_text:
+        vocabulary = _question_vocabulary(question_text)
+        copied = sum(1 for w in words if w in vocabulary)
+        if copied > MAX_QUESTION_OVERLAP * len(words):
+            return "restates_question", MESSAGES["restates_question"]
+
+    if concepts and len(words) < SHORT_ANSWER_WORDS and not concept_hits(words, concepts):
+        return "off_topic", MESSAGES["off_topic"].format(concepts=concepts)
+
+    return None
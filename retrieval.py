@@ -0,0 +1,244 @@
+"""BM25 retrieval over the topic readings.
+
+Each ``topicNreading.qmd`` is split into section-level chunks keyed by the
+anchor Quarto gives the heading (explicit ``{#id}`` or the auto-generated
+one). The BM25 weight of every (term, chunk) pair is precomputed into a dense
+float32 matrix, so scoring a query is one row gather and a column sum. The
+matrix and its metadata are written next to the reading as
+``topicNreading.index/`` and memory-mapped on later starts; the index is
+rebuilt only when the reading's hash changes.
+
+Build indexes ahead of time with ``python retrieval.py topic1reading.qmd ...``.
+"""
+
+import hashlib
+import json
+import re
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+from prescreen import STOPWORDS, stem, tokenize
+
+SITE_URL = "https://camcalderon-monetary-economics-ec3014.netlify.app"
+
+K1 = 1.2
+B = 0.75
+
+# Sections that never help answer a question, and placeholder-sized stubs.
+SKIP_SECTIONS = {"references", "discussion questions"}
+MIN_SECTION_CHARS = 200
+
+# Level 1-3 headings start chunks; deeper ones only take up identifiers
+_HEADING = re.compile(r"^(#{1,6})\s+(.*?)\s*(?:\{([^}]*)\})?\s*$")
+_EXPLICIT_ID = re.compile(r"(?:^|\s)#([\w.-]+)")
+# Bumped when chunking or anchors change, so saved indexes are rebuilt
+INDEX_FORMAT = 2
+_FRONT_MATTER = re.compile(r"\A---\n.*?\n---\n", re.S)
+
+
+def quarto_anchor(title):
+    """Pandoc's auto-generated identifier for a heading."""
+    text = re.sub(r"[*_`]|\$[^$]*\$", "", title).lower()
+    text = re.sub(r"[^\w\s.-]", "", text)
+    text = re.sub(r"\s+", "-", text.strip())
+    return re.sub(r"^[^a-z]+", "", text) or "section"
+
+
+def unique_anchor(anchor, seen):
+    """``anchor``, or Pandoc's ``-1``, ``-2``, ... variant for a repeated one; records it in ``seen``."""
+    candidate, n = anchor, 0
+    while candidate in seen:
+        n += 1
+        candidate = f"{anchor}-{n}"
+    seen.add(candidate)
+    return candidate
+
+
+@dataclass
+class Passage:
+    anchor: str
+    title: str
+    text: str
+    url: str
+    score: float = 0.0
+
+
+def split_sections(qmd_text):
+    """Yield ``(anchor, title, text)`` for every heading in a Quarto document."""
+    body = _FRONT_MATTER.sub("", qmd_text)
+    anchor, title, lines = None, None, []
+    seen = set()
+    in_code = False
+    for line in body.splitlines():
+        if line.startswith("```"):
+            in_code = not in_code
+            continue
+        if in_code or line.startswith(":::") or line.startswith("!["):
+            continue
+        match = _HEADING.match(line)
+        if match:
+            explicit = _EXPLICIT_ID.search(match.group(3) or "")
+            if explicit:
+                seen.add(explicit.group(1))
+                heading_anchor = explicit.group(1)
+            else:
+                heading_anchor = unique_anchor(quarto_anchor(match.group(2)), seen)
+            if len(match.group(1)) > 3:
+                lines.append(line)
+                continue
+            if title is not None:
+                yield anchor, title, "\n".join(lines).strip()
+            title, anchor = match.group(2), heading_anchor
+            lines = []
+        elif line.strip() != "---":
+            lines.append(line)
+    if title is not None:
+        yield anchor, title, "\n".join(lines).strip()
+
+
+def _terms(text):
+    return [stem(word) for word in tokenize(text) if word not in STOPWORDS and len(word) > 2]
+
+
+def _digest(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class ReadingIndex:
+    """Dense BM25 term x chunk weight matrix over one reading."""
+
+    def __init__(self, weights, vocabulary, chunks, page):
+        self.weights = weights
+        self.vocabulary = vocabulary
+        self.chunks = chunks
+        self.page = page
+
+    @classmethod
+    def build(cls, qmd_text, page):
+        chunks, docs = [], []
+        for anchor, title, text in split_sections(qmd_text):
+            if title.lower() in SKIP_SECTIONS or len(text) < MIN_SECTION_CHARS:
+                continue
+            chunks.append({"anchor": anchor, "title": title, "text": text})
+            docs.append(_terms(title + "\n" + text))
+
+        vocabulary = {}
+        for doc in docs:
+            for term in doc:
+                vocabulary.setdefault(term, len(vocabulary))
+        tf = np.zeros((len(vocabulary), len(docs)), dtype=np.float32)
+        for column, doc in enumerate(docs):
+            np.add.at(tf[:, column], [vocabulary[t] for t in doc], 1.0)
+
+        lengths = tf.sum(axis=0)
+        avg_length = max(float(lengths.mean()), 1.0) if len(docs) else 1.0
+        df = (tf > 0).sum(axis=1)
+        idf = np.log(1.0 + (len(docs) - df + 0.5) / (df + 0.5)).astype(np.float32)
+        norm = K1 * (1.0 - B + B * lengths / avg_length)
+        weights = idf[:, None] * tf * (K1 + 1.0) / (tf + norm[None, :])
+        return cls(weights.astype(np.float32), vocabulary, chunks, page)
+
+    def save(self, directory, source_hash):
+        directory.mkdir(parents=True, exist_ok=True)
+        np.save(directory / "weights.npy", self.weights)
+        meta = {
+            "format": INDEX_FORMAT,
+            "source_sha256": source_hash,
+            "page": self.page,
+            "vocabulary": self.vocabulary,
+            "chunks": self.chunks,
+        }
+        (directory / "meta.json").write_text(json.dumps(meta), encoding="utf-8")
+
+    @classmethod
+    def load(cls, directory, source_hash=None):
+        """Memory-map a saved index; ``None`` if missing or stale."""
+        try:
+            meta = json.loads((directory / "meta.json").read_text(encoding="utf-8"))
+            if meta.get("format") != INDEX_FORMAT:
+                return None
+            if source_hash is not None and meta["source_sha256"] != source_hash:
+                return None
+            weights = np.load(directory / "weights.npy", mmap_mode="r")
+        except (OSError, ValueError, KeyError):
+            return None
+        return cls(weights, meta["vocabulary"], meta["chunks"], meta["page"])
+
+    def search(self, query, k=3):
+        """Top-``k`` passages for ``query`` by BM25 score."""
+        rows = sorted({self.vocabulary[t] for t in _terms(query) if t in self.vocabulary})
+        if not rows or not self.chunks:
+            return []
+        scores = np.asarray(self.weights[rows]).sum(axis=0)
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            Passage(
+                anchor=self.chunks[i]["anchor"],
+                title=self.chunks[i]["title"],
+                text=self.chunks[i]["text"],
+                url=f"{SITE_URL}/{self.page}#{self.chunks[i]['anchor']}",
+                score=float(scores[i]),
+            )
+            for i in top
+            if scores[i] > 0
+        ]
+
+
+def load_reading_index(reading, search_dirs=()):
+    """Open the index for ``reading`` (e.g. ``"topic1reading.qmd"``), building it if stale.
+
+    Returns ``None`` when the reading can't be found, so callers can fall back
+    to prompts without retrieved context.
+    """
+    candidates = [Path(d) / reading for d in (*search_dirs, Path.cwd(), Path(__file__).parent)]
+    path = next((p for p in candidates if p.exists()), None)
+    if path is None:
+        return None
+    text = path.read_text(encoding="utf-8")
+    source_hash = _digest(text)
+    directory = path.with_suffix(".index")
+    index = ReadingIndex.load(directory, source_hash)
+    if index is None:
+        index = ReadingIndex.build(text, path.with_suffix(".html").name)
+        try:
+            index.save(directory, source_hash)
+            index = ReadingIndex.load(directory, source_hash) or index
+        except OSError as e:
+            print(f"Warning: Could not save reading index for {reading}: {e}")
+    return index
+
+
+def format_passages(passages, max_tokens=800):
+    """Passages as prompt text, truncated to roughly ``max_tokens`` tokens."""
+    budget = max_tokens * 4
+    blocks = []
+    for passage in passages:
+        block = f"[{passage.title}]\n{passage.text}"
+        if len(block) > budget:
+            block = block[:budget].rsplit(" ", 1)[0] + " ..."
+        blocks.append(block)
+        budget -= len(block)
+        if budget <= 200:
+            break
+    return "\n\n".join(blocks)
+
+
+def reading_links(passages):
+    """Markdown 'further reading' footer linking the retrieved sections."""
+    if not passages:
+        return ""
+    links = "\n".join(f"- [{p.title}]({p.url})" for p in passages)
+    return f"\n\n**Relevant sections of the reading:**\n{links}"
+
+
+if __name__ == "__main__":
+    for arg in sys.argv[1:]:
+        path = Path(arg)
+        index = ReadingIndex.build(path.read_text(encoding="utf-8"), path.with_suffix(".html").name)
+        index.save(path.with_suffix(".index"), _digest(path.read_text(encoding="utf-8")))
+        print(f"{path}: {len(index.chunks)} sections, {len(index.vocabulary)} terms")
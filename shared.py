@@ -1,6 +1,93 @@
-from pathlib import Path
+"""Datasets for the apps, loaded on first use.
+
+Importing this module is free. It used to parse ``tips.csv`` with pandas at
+import time, whether or not the app ever used the data. A dataset is now
+read the first time it is accessed, as ``shared.tips`` or
+``shared.load("tips")``. The loaded DataFrame is kept for the life of the
+process.
+
+On first load, the CSV is converted to a columnar Feather file under the
+tutor data directory. Numbers are downcast to the smallest type that holds
+them, and repetitive text columns become categoricals. The file is named by
+the CSV's hash, so an edited CSV is converted again. Later loads, in this or
+any other process, memory-map the Feather file instead of parsing text. The
+cache needs ``pyarrow``; without it, datasets are read from the CSV each time.
+"""
 
-import pandas as pd
+import hashlib
+import threading
+from pathlib import Path
 
 app_dir = Path(__file__).parent
-tips = pd.read_csv(app_dir / "tips.csv")
\ No newline at end of file
+
+CACHE_DIR = "dataset_cache"
+# Text columns with at most this share of distinct values are stored as categoricals
+CATEGORY_SHARE = 0.5
+
+DATASETS = {"tips": app_dir / "tips.csv"}
+
+_loaded = {}
+_lock = threading.Lock()
+
+
+def register(name, path):
+    """Make the CSV at ``path`` available as ``shared.load(name)`` (and ``shared.<name>``)."""
+    DATASETS[name] = Path(path)
+    _loaded.pop(name, None)
+
+
+def _compact(frame):
+    import pandas as pd
+
+    for column in frame.columns:
+        values = frame[column]
+        if pd.api.types.is_integer_dtype(values):
+            frame[column] = pd.to_numeric(values, downcast="integer")
+        elif pd.api.types.is_float_dtype(values):
+            frame[column] = pd.to_numeric(values, downcast="float")
+        elif pd.api.types.is_string_dtype(values) and values.nunique() <= CATEGORY_SHARE * len(values):
+            frame[column] = values.astype("category")
+    return frame
+
+
+def _cache_path(source):
+    from answer_log import data_dir
+
+    digest = hashlib.sha256(source.read_bytes()).hexdigest()[:16]
+    return data_dir() / CACHE_DIR / f"{source.stem}-{digest}.feather"
+
+
+def _read(source):
+    import pandas as pd
+
+    try:
+        from pyarrow import feather
+    except ImportError:
+        return _compact(pd.read_csv(source))
+    cached = _cache_path(source)
+    if not cached.exists():
+        frame = _compact(pd.read_csv(source))
+        cached.parent.mkdir(parents=True, exist_ok=True)
+        tmp = cached.with_suffix(f".{threading.get_ident()}.tmp")
+        # Uncompressed, so later loads can map the file instead of decompressing it
+        feather.write_feather(frame, tmp, compression="uncompressed")
+        tmp.replace(cached)
+        return frame
+    return feather.read_table(cached, memory_map=True).to_pandas()
+
+
+def load(name):
+    """The dataset registered as ``name``, read on first use."""
+    frame = _loaded.get(name)
+    if frame is None:
+        with _lock:
+            frame = _loaded.get(name)
+            if frame is None:
+                frame = _loaded[name] = _read(DATASETS[name])
+    return frame
+
+
+def __getattr__(name):
+    if name in DATASETS:
+        return load(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,272 @@
+"""Shared result cache for the interactive model panels.
+
+Thousands of students drag the same sliders to nearly the same values, so a
+panel's results are cached on a lattice of parameter values:
+
+- parameters within ``snap`` steps of a lattice point are an exact hit on it;
+- otherwise, if every corner of the surrounding lattice cell is cached and the
+  corners agree to within ``tolerance``, the result is interpolated
+  multilinearly;
+- only a true miss calls the model, at the nearest lattice point.
+
+Results are NumPy arrays, or dicts of arrays. They live in a byte-bounded LRU
+in memory, backed by ``.npy`` files under the tutor data directory. The files
+are opened memory-mapped, so a disk hit reads only the pages it uses and a
+restarted Space starts warm. Every cache counts its hits, interpolations and
+misses for ``/metrics``.
+"""
+
+import hashlib
+import math
+import os
+import threading
+from collections import OrderedDict, defaultdict
+from itertools import product
+
+import numpy as np
+
+_REGISTRY = []
+
+
+def _nbytes(result):
+    if isinstance(result, dict):
+        return sum(np.asarray(v).nbytes for v in result.values())
+    return np.asarray(result).nbytes
+
+
+def _blend(results, weights):
+    if isinstance(results[0], dict):
+        return {k: _blend([r[k] for r in results], weights) for k in results[0]}
+    return sum(w * np.asarray(r, dtype=float) for r, w in zip(results, weights))
+
+
+def _spread(results):
+    """Largest difference between corner results, relative to their scale."""
+    if isinstance(results[0], dict):
+        return max(_spread([r[k] for r in results]) for k in results[0])
+    stacked = np.stack([np.asarray(r, dtype=float) for r in results])
+    scale = max(float(np.abs(stacked).max()), 1e-12)
+    return float((stacked.max(axis=0) - stacked.min(axis=0)).max()) / scale
+
+
+class SimulationCache:
+    """Lattice cache for ``compute(**params)``.
+
+    ``axes`` maps each parameter to its lattice step, or to ``(origin, step)``.
+    ``tolerance`` is the largest relative spread between corner results that
+    still allows interpolation; ``None`` disables interpolation.
+    """
+
+    def __init__(self, name, compute, axes, snap=0.05, tolerance=0.01, max_bytes=64 * 2**20, disk=True):
+        self.name = name
+        self.compute = compute
+        self.axes = {k: v if isinstance(v, tuple) else (0.0, v) for k, v in axes.items()}
+        self.snap = snap
+        self.tolerance = tolerance
+        self.max_bytes = max_bytes
+        self.disk = disk
+        self._memory = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self.counts = defaultdict(int)
+        self.evictions = 0
+        _REGISTRY.append(self)
+
+    def _directory(self):
+        from answer_log import data_dir
+
+        return data_dir() / "sim_cache" / self.name
+
+    def _path(self, key):
+        # The lattice is part of the key, so changing an axis never serves stale files
+        digest = hashlib.sha1(repr((sorted(self.axes.items()), key)).encode()).hexdigest()[:16]
+        return self._directory() / digest
+
+    def _point(self, key):
+        return {name: round(origin + step * i, 10) for (name, (origin, step)), i in zip(self.axes.items(), key)}
+
+    # Memory tier
+
+    def _remember(self, key, result):
+        size = _nbytes(result)
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return
+            self._memory[key] = (result, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes and len(self._memory) > 1:
+                _, (_, evicted) = self._memory.popitem(last=False)
+                self._bytes -= evicted
+                self.evictions += 1
+
+    def _from_memory(self, key):
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            self._memory.move_to_end(key)
+            return entry[0]
+
+    # Disk tier
+
+    def _load(self, key):
+        if not self.disk:
+            return None
+        path = self._path(key)
+        try:
+            if path.with_suffix(".npy").is_file():
+                return np.load(path.with_suffix(".npy"), mmap_mode="r")
+            if path.is_dir():
+                return {f.stem: np.load(f, mmap_mode="r") for f in sorted(path.glob("*.npy"))}
+        except (OSError, ValueError):
+            pass
+        return None
+
+    def _save(self, key, result):
+        if not self.disk:
+            return
+        path = self._path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            if isinstance(result, dict):
+                tmp.mkdir()
+                for k, v in result.items():
+                    np.save(tmp / f"{k}.npy", np.asarray(v))
+                # Renaming the directory publishes every field at once
+                os.replace(tmp, path)
+            else:
+                with open(tmp, "wb") as f:
+                    np.save(f, np.asarray(result))
+                os.replace(tmp, path.with_suffix(".npy"))
+        except OSError as e:
+            print(f"Warning: Could not cache {self.name} result: {e}")
+
+    def _cached(self, key):
+        """Memory then disk, without computing; ``(result, tier)`` or ``(None, None)``."""
+        result = self._from_memory(key)
+        if result is not None:
+            return result, "memory"
+        result = self._load(key)
+        if result is not None:
+            self._remember(key, result)
+            return result, "disk"
+        return None, None
+
+    # Lookup
+
+    def _compute(self, key):
+        with self._lock:
+            event = self._inflight.get(key)
+            owner = event is None
+            if owner:
+                event = self._inflight[key] = threading.Event()
+        if not owner:
+            # Another session is computing this point; wait for it rather than duplicating the work
+            event.wait()
+            result, _ = self._cached(key)
+            if result is not None:
+                return result
+        try:
+            result = self.compute(**self._point(key))
+            self._remember(key, result)
+            self._save(key, result)
+            return result
+        finally:
+            if owner:
+                with self._lock:
+                    del self._inflight[key]
+                event.set()
+
+    def _interpolate(self, position):
+        if self.tolerance is None:
+            return None
+        lower = [math.floor(p) for p in position]
+        fractions = [p - lo for p, lo in zip(position, lower)]
+        corners, weights = [], []
+        for offsets in product((0, 1), repeat=len(position)):
+            key = tuple(lo + o for lo, o in zip(lower, offsets))
+            result, _ = self._cached(key)
+            if result is None:
+                return None
+            corners.append(result)
+            weights.append(math.prod(f if o else 1 - f for f, o in zip(fractions, offsets)))
+        if _spread(corners) > self.tolerance:
+            return None
+        return _blend(corners, weights)
+
+    def get(self, **params):
+        """Result for ``params``; see the module docstring for how it is served."""
+        position = [(params[name] - origin) / step for name, (origin, step) in self.axes.items()]
+        key = tuple(int(round(p)) for p in position)
+        on_lattice = all(abs(p - k) <= self.snap for p, k in zip(position, key))
+        if on_lattice:
+            result, tier = self._cached(key)
+            if result is not None:
+                self.counts[f"{tier}_hits"] += 1
+                return result
+        else:
+            result = self._interpolate(position)
+            if result is not None:
+                self.counts["interpolated"] += 1
+                return result
+            result, tier = self._cached(key)
+            if result is not None:
+                self.counts["nearest_hits"] += 1
+                return result
+        self.counts["misses"] += 1
+        return self._compute(key)
+
+    def stats(self):
+        counts = dict(self.counts)
+        served = sum(counts.values())
+        return {
+            "entries": len(self._memory),
+            "bytes": self._bytes,
+            "evictions": self.evictions,
+            "counts": counts,
+            "hit_rate": 1 - counts.get("misses", 0) / served if served else 0.0,
+        }
+
+    def clear(self, disk=False):
+        with self._lock:
+            self._memory.clear()
+            self._bytes = 0
+        if disk and self.disk:
+            import shutil
+
+            shutil.rmtree(self._directory(), ignore_errors=True)
+
+
+def render_metrics():
+    """Prometheus text exposition for every cache in this process."""
+    if not _REGISTRY:
+        return ""
+    lines = [
+        "# HELP tutor_sim_cache_requests_total Simulation cache lookups by outcome.",
+        "# TYPE tutor_sim_cache_requests_total counter",
+    ]
+    for cache in _REGISTRY:
+        for outcome, count in sorted(cache.stats()["counts"].items()):
+            lines.append(f'tutor_sim_cache_requests_total{{cache="{cache.name}",outcome="{outcome}"}} {count}')
+    lines += [
+        "# HELP tutor_sim_cache_bytes Bytes held in the in-memory tier.",
+        "# TYPE tutor_sim_cache_bytes gauge",
+    ]
+    for cache in _REGISTRY:
+        lines.append(f'tutor_sim_cache_bytes{{cache="{cache.name}"}} {cache.stats()["bytes"]}')
+    lines += [
+        "# HELP tutor_sim_cache_evictions_total Entries evicted from the in-memory tier.",
+        "# TYPE tutor_sim_cache_evictions_total counter",
+    ]
+    for cache in _REGISTRY:
+        lines.append(f'tutor_sim_cache_evictions_total{{cache="{cache.name}"}} {cache.evictions}')
+    lines += [
+        "# HELP tutor_sim_cache_hit_rate Share of lookups served without running the model.",
+        "# TYPE tutor_sim_cache_hit_rate gauge",
+    ]
+    for cache in _REGISTRY:
+        lines.append(f'tutor_sim_cache_hit_rate{{cache="{cache.name}"}} {cache.stats()["hit_rate"]:.4f}')
+    return "\n".join(lines) + "\n"
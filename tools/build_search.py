@@ -0,0 +1,239 @@
+"""Sharded, prefix-searchable index of the rendered site, replacing ``docs/search.json``.
+
+Quarto's built-in search downloads the whole of ``search.json`` (every word
+of every page) before it can answer anything, then scans it with Fuse.js.
+This step reads the rendered pages in ``docs/`` and writes ``docs/search/``:
+
+- ``meta.json.gz``: the documents, one per page section (link, title,
+  section heading, a short excerpt and its length in words), the shard
+  keys, and the stop words;
+- ``<key>.json.gz``: one shard of the inverted index. It holds the sorted
+  terms starting with ``key``, front-coded (each term stores only what it
+  adds to the previous one). Each term has postings of delta-coded document
+  numbers and weights. Headings count ``TITLE_WEIGHT`` times;
+- ``client.js``: the reader, copied from ``tools/search_client.js``.
+
+Shard keys form a prefix trie. Terms are grouped by their first letter, and
+a group over ``SHARD_POSTINGS`` postings is split by its next letter, up to
+``MAX_KEY`` letters. A term lives in the shard with the longest key that
+prefixes it. A typed word therefore needs only that shard, plus the shards
+below it in the trie while the word is shorter than their keys. Within a
+shard, the terms matching a prefix are one binary search away.
+
+Quarto runs this after rendering the whole site (``post-render`` in
+``_quarto.yml``), and ``tools/build_site.py`` runs it after every build that
+rendered a page. To run it by hand, from the repository root:
+``python tools/build_search.py``.
+"""
+
+import argparse
+import gzip
+import json
+import os
+import re
+import shutil
+import sys
+import unicodedata
+from collections import defaultdict
+from html.parser import HTMLParser
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+OUTPUT = ROOT / "docs"
+INDEX_DIR = "search"
+CLIENT = Path(__file__).resolve().parent / "search_client.js"
+SHARD_POSTINGS = 1500
+MAX_KEY = 3
+TITLE_WEIGHT = 5
+EXCERPT_CHARS = 160
+STOP_WORDS = sorted("""a an and are as at be but by for from has have in is it its of on or that the this
+to was were which will with not their they than then there these can may also such into""".split())
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+_STOP = frozenset(STOP_WORDS)
+
+
+def _keep(token):
+    return len(token) <= 4 if token.isdigit() else 1 < len(token) <= 24 and token not in _STOP
+
+
+def tokens(text):
+    """Lower-case ASCII words of ``text``, accents folded, without stop words or long numbers."""
+    folded = unicodedata.normalize("NFKD", text.lower()).encode("ascii", "ignore").decode()
+    return [t for t in _TOKEN.findall(folded) if _keep(t)]
+
+
+class _Sections(HTMLParser):
+    """Text of a Quarto page's main content, split at its level 1 and 2 sections."""
+
+    SKIP = {"script", "style", "noscript", "svg", "button"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title = ""
+        self.sections = []  # [anchor, heading, text parts]
+        self._depth = 0  # elements open inside <main>, 0 when outside
+        self._skip = 0
+        self._in_title = False
+        self._heading = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "title" and not self._depth:
+            self._in_title = True
+        if tag == "main" and attrs.get("id") == "quarto-document-content":
+            self._depth = 1
+            self.sections.append(["", "", []])
+            return
+        if not self._depth:
+            return
+        self._depth += 1
+        if tag in self.SKIP:
+            self._skip += 1
+        if tag == "section" and attrs.get("id") and attrs.get("class", "").split()[:1] in (["level1"], ["level2"]):
+            self.sections.append([attrs["id"], "", []])
+        if tag in ("h1", "h2") and self.sections and not self.sections[-1][1]:
+            self._heading = []
+
+    def handle_endtag(self, tag):
+        if tag == "title":
+            self._in_title = False
+        if not self._depth:
+            return
+        self._depth -= 1
+        if tag in self.SKIP and self._skip:
+            self._skip -= 1
+        if tag in ("h1", "h2") and self._heading is not None:
+            self.sections[-1][1] = " ".join("".join(self._heading).split())
+            self._heading = None
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data
+        elif self._depth and not self._skip:
+            (self._heading if self._heading is not None else self.sections[-1][2]).append(data)
+
+
+def documents_from_html(docs_dir=OUTPUT):
+    """``{href, title, section, text}`` for every section of every rendered article page."""
+    found = []
+    for path in sorted(docs_dir.rglob("*.html")):
+        rel = path.relative_to(docs_dir)
+        if rel.parts[0] in ("site_libs", INDEX_DIR):
+            continue
+        parser = _Sections()
+        parser.feed(path.read_text(encoding="utf-8", errors="replace"))
+        # Slide decks have no article content to search
+        title = " ".join(parser.title.split()).split(" – ")[-1].strip()
+        for anchor, heading, parts in parser.sections:
+            text = " ".join(" ".join(parts).split())
+            if text or heading:
+                href = rel.as_posix() + (f"#{anchor}" if anchor else "")
+                found.append({"href": href, "title": title, "section": heading, "text": text})
+    return found
+
+
+def _shard_keys(postings):
+    """Shard key of every term: split a prefix group until it fits ``SHARD_POSTINGS``."""
+    keys = {}
+
+    def split(terms, depth):
+        groups = defaultdict(list)
+        for term in terms:
+            groups[term[:depth]].append(term)
+        for prefix, group in groups.items():
+            size = sum(len(postings[t]) for t in group)
+            longer = [t for t in group if len(t) > depth]
+            if size > SHARD_POSTINGS and depth < MAX_KEY and longer:
+                keys.update({t: prefix for t in group if len(t) <= depth})
+                split(longer, depth + 1)
+            else:
+                keys.update({t: prefix for t in group})
+
+    split(sorted(postings), 1)
+    return keys
+
+
+def _front_code(terms):
+    """Each term as (letters shared with the previous term, the rest)."""
+    shared, rest, previous = [], [], ""
+    for term in terms:
+        n = 0
+        while n < min(len(term), len(previous)) and term[n] == previous[n]:
+            n += 1
+        shared.append(n)
+        rest.append(term[n:])
+        previous = term
+    return shared, rest
+
+
+def _write(path, payload):
+    data = gzip.compress(json.dumps(payload, separators=(",", ":")).encode(), compresslevel=9, mtime=0)
+    path.write_bytes(data)
+    return len(data)
+
+
+def build_index(documents, out_dir):
+    """Write the index for ``documents`` into ``out_dir``; returns ``{file name: compressed bytes}``."""
+    weights = defaultdict(lambda: defaultdict(int))
+    lengths = []
+    for number, doc in enumerate(documents):
+        words = tokens(doc["text"])
+        for term in words:
+            weights[term][number] += 1
+        for term in tokens(f"{doc['title']} {doc['section']}"):
+            weights[term][number] += TITLE_WEIGHT
+        lengths.append(len(words))
+    postings = {term: sorted(docs.items()) for term, docs in weights.items()}
+    keys = _shard_keys(postings)
+
+    shards = defaultdict(list)
+    for term in sorted(postings):
+        shards[keys[term]].append(term)
+    out_dir = Path(out_dir)
+    if out_dir.exists():
+        shutil.rmtree(out_dir)
+    out_dir.mkdir(parents=True)
+    sizes = {}
+    for key, terms in shards.items():
+        encoded = []
+        for term in terms:
+            flat, previous = [], 0
+            for number, weight in postings[term]:
+                flat += [number - previous, weight]
+                previous = number
+            encoded.append(flat)
+        shared, rest = _front_code(terms)
+        sizes[f"{key}.json.gz"] = _write(out_dir / f"{key}.json.gz", {"shared": shared, "rest": rest, "postings": encoded})
+    sizes["meta.json.gz"] = _write(out_dir / "meta.json.gz", {
+        "version": 1,
+        "docs": [[d["href"], d["title"], d["section"], d["text"][:EXCERPT_CHARS], n] for d, n in zip(documents, lengths)],
+        "shards": sorted(shards),
+        "stop": STOP_WORDS,
+    })
+    shutil.copyfile(CLIENT, out_dir / "client.js")
+    return sizes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the sharded search index of the rendered site.")
+    parser.add_argument("--docs", default=str(OUTPUT), help="rendered site (default: docs/)")
+    args = parser.parse_args(argv)
+    docs_dir = Path(args.docs)
+    if os.environ.get("QUARTO_PROJECT_OUTPUT_DIR"):
+        # Run as Quarto's post-render step: a partial render leaves the index to tools/build_site.py
+        if os.environ.get("QUARTO_PROJECT_RENDER_ALL") != "1":
+            return 0
+        docs_dir = Path(os.environ["QUARTO_PROJECT_OUTPUT_DIR"])
+    documents = documents_from_html(docs_dir)
+    sizes = build_index(documents, docs_dir / INDEX_DIR)
+    print(f"{len(documents)} sections indexed into {len(sizes) - 1} shards, "
+          f"{sum(sizes.values()) / 1024:.0f} KB compressed (meta {sizes['meta.json.gz'] / 1024:.0f} KB, "
+          f"largest shard {max((v for k, v in sizes.items() if k != 'meta.json.gz'), default=0) / 1024:.1f} KB)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,321 @@
+"""Incremental, parallel build of the Quarto site into ``docs/``.
+
+``quarto render`` re-renders every page of the project. This tool renders
+only the pages whose inputs have changed since they were last built. A
+page's inputs are:
+
+- the page itself and any ``{{< include >}}`` files, recursively;
+- files named in its front matter: CSS, bibliography, ``include-*`` HTML,
+  ``resources`` globs;
+- local files its body refers to: image and link targets, quoted paths in
+  code chunks, and Python modules it imports;
+- the slide folders a lecture page lists at render time
+  (``ppt/<page>_png/``, ``ppt/<page>_web/``);
+- ``_quarto.yml`` and the non-page files it names, which every page shares.
+
+``site_manifest.json`` records the SHA-256 of every input and output of
+every page, plus how long each page took. A page is skipped when its inputs
+hash the same and its outputs in ``docs/`` are still the ones it produced.
+File hashes are memoised by size and modification time, so unchanged files
+are not re-read. The slide PNGs alone are over 200 MB.
+
+Stale pages render in parallel, one ``quarto`` process each, longest first.
+Every page renders into its own staging directory. The main thread then
+moves the outputs into ``docs/`` one page at a time, so concurrent renders
+never write the shared files at once. Once the pages are in place, the
+search index is rebuilt (``tools/build_search.py``). The build ends with a
+timing report.
+
+Run from the repository root: ``python tools/build_site.py`` (everything),
+or name pages, e.g. ``python tools/build_site.py topic1questions.qmd --to html``.
+``--dry-run`` lists the stale pages and why, without Quarto.
+"""
+
+import argparse
+import filecmp
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import build_search  # noqa: E402
+
+ROOT = Path(__file__).resolve().parents[1]
+OUTPUT = ROOT / "docs"
+MANIFEST = ROOT / "site_manifest.json"
+STAGING = ROOT / ".build"
+PROJECT = ROOT / "_quarto.yml"
+PAGE_SUFFIXES = {".qmd", ".md"}
+# Quarto skips README.md, and paths starting with "." or "_"; these hold no pages
+SKIP_DIRS = {"docs", "node_modules", "venv", "renv", "__pycache__"}
+# Folders a page lists from its own name in a code chunk (see the lecture pages)
+PAGE_DIRS = ("ppt/{stem}_png", "ppt/{stem}_web")
+
+_FRONT_MATTER = re.compile(r"\A---\s*\n(.*?)\n---\s*\n", re.S)
+_YAML_VALUE = re.compile(r"^[ \t]*(?:-[ \t]+|[\w-]+:[ \t]+)[\"']?([^\"'\s#][^\"'#\n]*?)[\"']?[ \t]*$", re.M)
+_INCLUDE = re.compile(r"\{\{<\s*include\s+[\"']?([^\"'\s>]+)[\"']?\s*>\}\}")
+_LINK = re.compile(r"\]\(<?([^)\s>#?]+)")
+_QUOTED = re.compile(r"[\"']([\w./-]{1,200}\.\w{1,8})[\"']")
+_IMPORT = re.compile(r"^\s*(?:from|import)\s+([A-Za-z_]\w*)", re.M)
+
+
+def pages():
+    """Every page Quarto renders in this project, as repository-relative paths."""
+    found = []
+    for path in ROOT.rglob("*"):
+        rel = path.relative_to(ROOT)
+        if (path.suffix in PAGE_SUFFIXES and path.name != "README.md" and path.is_file()
+                and not any(p.startswith((".", "_")) or p in SKIP_DIRS for p in rel.parts)):
+            found.append(rel)
+    return sorted(found)
+
+
+def _local(name, base):
+    """``name`` as a repository-relative path if it is a file or folder of the project, else ``None``."""
+    if "://" in name or name.startswith(("#", "mailto:", "data:")):
+        return None
+    path = (ROOT / name.lstrip("/")) if name.startswith("/") else (base / name)
+    try:
+        rel = path.resolve().relative_to(ROOT)
+    except (ValueError, OSError):
+        return None
+    if not rel.parts or rel.parts[0] in ("docs", ".build", ".git") or not path.exists():
+        return None
+    return rel
+
+
+def _expand(rel):
+    """A file, or the files under a folder."""
+    path = ROOT / rel
+    if path.is_dir():
+        return {p.relative_to(ROOT) for p in path.rglob("*") if p.is_file()}
+    return {rel}
+
+
+def shared_inputs():
+    """``_quarto.yml`` and the non-page files it names: every page depends on these."""
+    inputs = {PROJECT.relative_to(ROOT)}
+    for name in _YAML_VALUE.findall(PROJECT.read_text(encoding="utf-8")):
+        rel = _local(name.strip(), ROOT)
+        # Pages are rendered on their own, and pre/post-render scripts don't change them
+        if rel is not None and rel.suffix not in PAGE_SUFFIXES | {".py"}:
+            inputs |= _expand(rel)
+    return inputs
+
+
+def dependencies(page, _seen=None):
+    """The files ``page`` is rendered from, besides the shared inputs; includes are followed."""
+    seen = _seen if _seen is not None else set()
+    seen.add(page)
+    path = ROOT / page
+    text = path.read_text(encoding="utf-8", errors="replace")
+    base = path.parent
+    found = {page}
+
+    front = _FRONT_MATTER.match(text)
+    if front:
+        for value in _YAML_VALUE.findall(front.group(1)):
+            value = value.strip()
+            if any(c in value for c in "*?["):
+                found |= {p.relative_to(ROOT) for p in base.glob(value) if p.is_file()}
+            elif (rel := _local(value, base)) is not None:
+                found |= _expand(rel)
+
+    for name in _INCLUDE.findall(text):
+        rel = _local(name, base)
+        if rel is not None and rel not in seen:
+            found |= dependencies(rel, seen)
+    for name in _LINK.findall(text) + _QUOTED.findall(text):
+        rel = _local(name, base)
+        # Links to other pages need only the target's URL, not its content
+        if rel is not None and rel.suffix not in PAGE_SUFFIXES:
+            found |= _expand(rel)
+    for module in _IMPORT.findall(text):
+        rel = _local(f"{module}.py", base)
+        if rel is not None:
+            found.add(rel)
+    for pattern in PAGE_DIRS:
+        rel = _local(pattern.format(stem=page.stem), ROOT)
+        if rel is not None:
+            found |= _expand(rel)
+    return found
+
+
+class Hashes:
+    """SHA-256 of files, memoised on (size, mtime) across builds."""
+
+    def __init__(self, memo=None):
+        self.memo = memo or {}
+
+    def __call__(self, path):
+        key = path.relative_to(ROOT).as_posix()
+        try:
+            stat = path.stat()
+        except OSError:
+            return None
+        cached = self.memo.get(key)
+        if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+            return cached[2]
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        self.memo[key] = [stat.st_size, stat.st_mtime_ns, digest.hexdigest()]
+        return self.memo[key][2]
+
+
+def load_manifest(path=MANIFEST):
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(manifest, path=MANIFEST):
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(manifest, indent=1, sort_keys=True) + "\n", encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def stale_reason(entry, inputs, to, file_hash):
+    """Why ``entry`` (the page's manifest entry) is out of date, or ``None`` if it is current."""
+    if entry is None:
+        return "never built"
+    if entry.get("to") not in (None, to):
+        return f"last built only to {entry['to']}"
+    changed = sorted(set(inputs) ^ set(entry.get("inputs", {})) |
+                     {name for name, sha in inputs.items() if entry.get("inputs", {}).get(name) != sha})
+    if changed:
+        return "changed: " + ", ".join(changed[:3]) + (f" and {len(changed) - 3} more" if len(changed) > 3 else "")
+    missing = [name for name, sha in entry.get("outputs", {}).items() if file_hash(OUTPUT / name) != sha]
+    if missing or not entry.get("outputs"):
+        return "output missing or replaced: " + ", ".join(missing[:3])
+    return None
+
+
+def render_page(page, quarto="quarto", to=None):
+    """Render one page into a fresh staging directory; returns ``(stage, seconds)``."""
+    started = time.perf_counter()
+    STAGING.mkdir(exist_ok=True)
+    stage = Path(tempfile.mkdtemp(prefix=f"{page.stem}-", dir=STAGING))
+    command = [quarto, "render", page.as_posix(), "--output-dir", str(stage)] + (["--to", to] if to else [])
+    done = subprocess.run(command, cwd=ROOT, capture_output=True, text=True, timeout=1800)
+    if done.returncode:
+        shutil.rmtree(stage, ignore_errors=True)
+        raise RuntimeError(done.stderr.strip().splitlines()[-1] if done.stderr.strip() else f"exit {done.returncode}")
+    return stage, time.perf_counter() - started
+
+
+def merge(stage, page, file_hash):
+    """Move a staged render into ``docs/``; returns the page's own outputs and their hashes."""
+    outputs = []
+    for path in sorted(stage.rglob("*")):
+        rel = path.relative_to(stage)
+        # The site-wide index and sitemap are rebuilt from docs/ once all pages are in
+        if path.is_dir() or rel.parts[0] == build_search.INDEX_DIR or rel.as_posix() in ("search.json", "sitemap.xml"):
+            continue
+        target = OUTPUT / rel
+        # site_libs is shared by every page, so it is not recorded as this page's output
+        if rel.parts[0] != "site_libs":
+            outputs.append(rel.as_posix())
+        if target.is_file() and filecmp.cmp(path, target, shallow=False):
+            continue
+        target.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(path, target)
+    shutil.rmtree(stage, ignore_errors=True)
+    return {name: file_hash(OUTPUT / name) for name in outputs}
+
+
+def report(results, cached, wall):
+    """Per-page timings, slowest first, and the totals."""
+    if results:
+        print(f"\n{'page':32s} {'seconds':>8s}  status")
+    for page, seconds, status in sorted(results, key=lambda r: -r[1]):
+        print(f"{page.as_posix():32s} {seconds:8.1f}  {status}")
+    rendered = [seconds for _, seconds, status in results if status == "rendered"]
+    failed = len(results) - len(rendered)
+    print(f"{len(rendered)} pages rendered ({sum(rendered):.1f} s of rendering in {wall:.1f} s), {cached} unchanged"
+          + (f", {failed} failed" if failed else ""))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render the Quarto pages whose inputs changed.")
+    parser.add_argument("pages", nargs="*", help="pages to consider (default: every page of the project)")
+    parser.add_argument("--to", help="render only this format, e.g. html")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="pages rendered at once")
+    parser.add_argument("--force", action="store_true", help="render even if the page is unchanged")
+    parser.add_argument("--dry-run", action="store_true", help="list stale pages and why, without rendering")
+    args = parser.parse_args(argv)
+
+    manifest = load_manifest()
+    file_hash = Hashes(manifest.get("files"))
+    selected = [Path(p).resolve().relative_to(ROOT) for p in args.pages] or pages()
+    quarto = shutil.which("quarto")
+    version = None
+    if quarto:
+        version = subprocess.run([quarto, "--version"], capture_output=True, text=True).stdout.strip()
+    elif not args.dry_run:
+        print("Cannot build: quarto not found (https://quarto.org/docs/get-started/)")
+        return 1
+
+    shared = shared_inputs()
+    stale, cached = [], 0
+    entries = manifest.setdefault("pages", {})
+    for page in selected:
+        inputs = {p.as_posix(): file_hash(ROOT / p) for p in sorted(shared | dependencies(page))}
+        reason = "forced" if args.force else stale_reason(entries.get(page.as_posix()), inputs, args.to, file_hash)
+        if reason is None and version and manifest.get("quarto") not in (None, version):
+            reason = f"Quarto {manifest['quarto']} -> {version}"
+        if reason is None:
+            cached += 1
+        else:
+            stale.append((page, inputs, reason))
+    if args.dry_run:
+        for page, inputs, reason in stale:
+            print(f"{page.as_posix():32s} {len(inputs):4d} inputs  {reason}")
+        print(f"{len(stale)} of {len(selected)} pages stale")
+        manifest["files"] = file_hash.memo
+        save_manifest(manifest)
+        return 0
+
+    results, failed = [], 0
+    started = time.perf_counter()
+    # Longest pages first, by their last recorded time, so the slowest is not started last
+    stale.sort(key=lambda s: -entries.get(s[0].as_posix(), {}).get("seconds", 0.0))
+    with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+        # Threads only wait on the quarto processes; merging happens here, one page at a time
+        futures = {pool.submit(render_page, page, quarto, args.to): (page, inputs, reason)
+                   for page, inputs, reason in stale}
+        for future in as_completed(futures):
+            page, inputs, reason = futures[future]
+            try:
+                stage, seconds = future.result()
+            except (subprocess.SubprocessError, OSError, RuntimeError) as e:
+                failed += 1
+                results.append((page, 0.0, f"FAILED: {e}"))
+                continue
+            entries[page.as_posix()] = {"inputs": inputs, "outputs": merge(stage, page, file_hash),
+                                        "seconds": round(seconds, 2), "to": args.to}
+            results.append((page, seconds, "rendered"))
+            print(f"{page.as_posix()}: rendered in {seconds:.1f} s ({reason})")
+            manifest["quarto"], manifest["files"] = version, file_hash.memo
+            save_manifest(manifest)
+    manifest["files"] = file_hash.memo
+    save_manifest(manifest)
+    if len(results) > failed:
+        build_search.main(["--docs", str(OUTPUT)])
+    report(results, cached, time.perf_counter() - started)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,215 @@
+"""Export the lecture decks in ``ppt/`` to slide PNGs and a PDF, on any OS.
+
+Each ``ppt/topicNlecture.pptx`` becomes ``ppt/topicNlecture_png/SlideK.PNG``
+(the names the lecture pages already read) plus ``ppt/topicNlecture.pdf`` for
+download. LibreOffice converts the deck to PDF headlessly, and ``pdftoppm``
+rasterises the pages. Decks convert in parallel, one converter process each,
+and each uses its own LibreOffice profile so the processes don't contend for
+one lock.
+
+``ppt/slides_manifest.json`` records each deck's SHA-256 and what was
+exported from it. A deck whose hash and settings are unchanged, and whose
+slides are all present, is skipped. The PDFs are not committed; when a
+lecture page links its deck's PDF and only the PDF is missing, LibreOffice
+converts that deck again without rasterising it. The decks are stored in
+Git LFS, and an LFS pointer already carries the SHA-256 of the deck, so
+unchanged decks are recognised without fetching them. New slides are
+written to a staging directory and swapped in only when the export has
+succeeded.
+
+Run from the repository root: ``python tools/export_slides.py``.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+SLIDES = ROOT / "ppt"
+MANIFEST = SLIDES / "slides_manifest.json"
+# PowerPoint's own PNG export of a 13.33-inch slide is 4800 pixels wide
+DPI = 360
+LFS_POINTER = b"version https://git-lfs.github.com/spec/v1"
+_SLIDE = re.compile(r"^Slide(\d+)\.png$", re.I)
+
+
+def deck_hash(path):
+    """SHA-256 of the deck, read from the LFS pointer when the deck has not been fetched."""
+    with open(path, "rb") as f:
+        head = f.read(len(LFS_POINTER))
+        if head == LFS_POINTER:
+            match = re.search(rb"oid sha256:([0-9a-f]{64})", head + f.read(1024))
+            if match:
+                return match.group(1).decode(), True
+        digest = hashlib.sha256(head)
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest(), False
+
+
+def slide_files(directory):
+    """``SlideK.PNG`` files in slide order."""
+    if not directory.is_dir():
+        return []
+    found = [(int(m.group(1)), p) for p in directory.iterdir() if (m := _SLIDE.match(p.name))]
+    return [p for _, p in sorted(found)]
+
+
+def load_manifest(path=MANIFEST):
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(manifest, path=MANIFEST):
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(manifest, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def is_current(deck, entry, sha256, dpi):
+    return (
+        entry is not None
+        and entry.get("sha256") == sha256
+        and entry.get("dpi") == dpi
+        and len(slide_files(SLIDES / f"{deck.stem}_png")) == entry.get("slides")
+    )
+
+
+def needs_pdf(deck):
+    """Whether the deck's lecture page links a download PDF that isn't there."""
+    page = ROOT / f"{deck.stem}.qmd"
+    try:
+        linked = ".pdf" in page.read_text(encoding="utf-8")
+    except OSError:
+        return False
+    return linked and not (SLIDES / f"{deck.stem}.pdf").exists()
+
+
+def _swap_in(stage, target):
+    old = target.with_name(target.name + ".old")
+    shutil.rmtree(old, ignore_errors=True)
+    if target.exists():
+        target.rename(old)
+    stage.rename(target)
+    shutil.rmtree(old, ignore_errors=True)
+
+
+def _convert_pdf(deck, tmp, soffice):
+    subprocess.run(
+        [soffice, f"-env:UserInstallation={(tmp / 'profile').as_uri()}", "--headless",
+         "--convert-to", "pdf", "--outdir", str(tmp), str(deck)],
+        check=True, capture_output=True, timeout=900,
+    )
+    return tmp / f"{deck.stem}.pdf"
+
+
+def export_pdf(deck, soffice="soffice"):
+    """Convert one deck to its download PDF only, leaving the slides alone."""
+    with tempfile.TemporaryDirectory(prefix=f"{deck.stem}-") as tmp:
+        shutil.move(_convert_pdf(deck, Path(tmp), soffice), SLIDES / f"{deck.stem}.pdf")
+
+
+def export_deck(deck, dpi=DPI, soffice="soffice", pdftoppm="pdftoppm"):
+    """Convert one deck; returns its manifest entry."""
+    started = time.perf_counter()
+    target = SLIDES / f"{deck.stem}_png"
+    with tempfile.TemporaryDirectory(prefix=f"{deck.stem}-") as tmp:
+        tmp = Path(tmp)
+        pdf = _convert_pdf(deck, tmp, soffice)
+        subprocess.run([pdftoppm, "-png", "-r", str(dpi), str(pdf), str(tmp / "page")],
+                       check=True, capture_output=True, timeout=900)
+        pages = sorted(tmp.glob("page-*.png"), key=lambda p: int(p.stem.rsplit("-", 1)[1]))
+        if not pages:
+            raise RuntimeError(f"{deck.name} produced no pages")
+        stage = target.with_name(target.name + ".new")
+        shutil.rmtree(stage, ignore_errors=True)
+        stage.mkdir()
+        for k, page in enumerate(pages, start=1):
+            shutil.move(page, stage / f"Slide{k}.PNG")
+        _swap_in(stage, target)
+        shutil.move(pdf, SLIDES / f"{deck.stem}.pdf")
+    return {"slides": len(pages), "dpi": dpi, "seconds": round(time.perf_counter() - started, 2)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export changed lecture decks to slide PNGs and PDFs.")
+    parser.add_argument("decks", nargs="*", help="decks to consider (default: every ppt/*.pptx)")
+    parser.add_argument("--dpi", type=int, default=DPI, help=f"raster resolution (default {DPI})")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="decks converted at once")
+    parser.add_argument("--force", action="store_true", help="export even if the deck is unchanged")
+    parser.add_argument("--adopt", action="store_true",
+                        help="record the current decks against the slides already on disk, without exporting")
+    args = parser.parse_args(argv)
+
+    decks = [Path(d).resolve() for d in args.decks] or sorted(SLIDES.glob("*.pptx"))
+    manifest = load_manifest()
+    stale, pdfs = [], []
+    for deck in decks:
+        sha256, pointer = deck_hash(deck)
+        entry = manifest.get(deck.stem)
+        if args.adopt:
+            slides = len(slide_files(SLIDES / f"{deck.stem}_png"))
+            manifest[deck.stem] = {"sha256": sha256, "dpi": args.dpi, "slides": slides}
+        elif args.force or not is_current(deck, entry, sha256, args.dpi):
+            if pointer:
+                print(f"{deck.name}: needs exporting, but only its Git LFS pointer is here; run `git lfs pull` first")
+                continue
+            stale.append((deck, sha256))
+        elif needs_pdf(deck):
+            if pointer:
+                print(f"{deck.name}: PDF missing, but only its Git LFS pointer is here; run `git lfs pull` first")
+                continue
+            pdfs.append(deck)
+        else:
+            print(f"{deck.name}: unchanged, {entry['slides']} slides")
+    if args.adopt:
+        save_manifest(manifest)
+        print(f"Adopted {len(decks)} decks into {MANIFEST.relative_to(ROOT)}")
+        return 0
+
+    needed = {"soffice": stale or pdfs, "pdftoppm": stale}
+    missing = [tool for tool, decks_needing in needed.items() if decks_needing and not shutil.which(tool)]
+    if missing:
+        print(f"Cannot export {len(stale) + len(pdfs)} decks: {', '.join(missing)} not found "
+              "(install libreoffice and poppler-utils)")
+        return 1
+
+    failed = 0
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+        # Threads only wait on the converter processes, so a thread per deck is enough
+        futures = {pool.submit(export_deck, deck, args.dpi): (deck, sha256) for deck, sha256 in stale}
+        futures.update({pool.submit(export_pdf, deck): (deck, None) for deck in pdfs})
+        for future in as_completed(futures):
+            deck, sha256 = futures[future]
+            try:
+                if sha256 is None:
+                    future.result()
+                    print(f"{deck.name}: exported its download PDF")
+                    continue
+                manifest[deck.stem] = {"sha256": sha256, **future.result()}
+                print(f"{deck.name}: exported {manifest[deck.stem]['slides']} slides "
+                      f"in {manifest[deck.stem]['seconds']} s")
+                save_manifest(manifest)
+            except (subprocess.SubprocessError, OSError, RuntimeError) as e:
+                failed += 1
+                print(f"{deck.name}: export failed: {e}")
+    if stale or pdfs:
+        print(f"Exported {len(stale) + len(pdfs) - failed} of {len(stale) + len(pdfs)} decks "
+              f"in {time.perf_counter() - started:.1f} s")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,173 @@
+"""Responsive WebP/AVIF variants of the exported lecture slides.
+
+The exported slides in ``ppt/topicNlecture_png/`` are 4800-pixel PNGs.
+Every lecture page loaded them in full, a few at a time. This stage writes
+each slide to ``ppt/topicNlecture_web/`` as:
+
+- ``SlideK-{640,1280,1920,2560}.webp`` and ``.avif``: each width is resized
+  from the next larger one, so every slide is decoded once;
+- ``SlideK-lqip.webp``: a 48-pixel-wide placeholder of a few hundred bytes,
+  shown blurred under the slide until the real image arrives.
+
+Slides are encoded in a process pool. ``slides.json`` in each output
+directory records the source PNG's SHA-256, the encoder settings and the
+byte size of every variant. A slide whose PNG and settings are unchanged is
+skipped, so after the first run only re-exported slides are encoded. The
+lecture pages pick a width and format in the browser (see the
+``render-png-slides`` chunk). They load backgrounds only for the current and
+next slide.
+
+After encoding, the stage prints total bytes and modelled first-slide
+latency, before and after. Run from the repository root:
+``python tools/optimize_slides.py``.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from export_slides import SLIDES, slide_files  # noqa: E402
+
+WIDTHS = (2560, 1920, 1280, 640)
+DEFAULT_WIDTH = 1920
+LQIP_WIDTH = 48
+FORMATS = {"webp": {"quality": 80, "method": 4}, "avif": {"quality": 60, "speed": 8}}
+SETTINGS = {"widths": WIDTHS, "formats": FORMATS, "lqip": LQIP_WIDTH}
+
+# Slides whose backgrounds Reveal.js preloads (viewDistance) before and after, and the links the report models
+VIEW_DISTANCE = {"before": 3, "after": 2}
+LINKS = {"4G (10 Mbit/s, 60 ms)": (10e6, 0.06), "Campus Wi-Fi (50 Mbit/s, 20 ms)": (50e6, 0.02)}
+
+
+def _settings_key():
+    return hashlib.sha256(json.dumps(SETTINGS, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def optimise_slide(source, out_dir):
+    """Encode every variant of one slide; returns its ``slides.json`` entry."""
+    from PIL import Image
+
+    stem = source.stem
+    with Image.open(source) as im:
+        image = im.convert("RGB")
+    entry = {"sha256": _sha256(source), "size": list(image.size), "bytes": {}}
+    current = image
+    for width in WIDTHS:
+        height = round(width * image.height / image.width)
+        current = current.resize((width, height), Image.LANCZOS, reducing_gap=2.0)
+        for fmt, options in FORMATS.items():
+            path = out_dir / f"{stem}-{width}.{fmt}"
+            tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            current.save(tmp, fmt.upper(), **options)
+            os.replace(tmp, path)
+            entry["bytes"][f"{width}.{fmt}"] = path.stat().st_size
+    lqip = out_dir / f"{stem}-lqip.webp"
+    current.resize((LQIP_WIDTH, round(LQIP_WIDTH * image.height / image.width)), Image.LANCZOS).save(
+        lqip, "WEBP", quality=40)
+    entry["bytes"]["lqip"] = lqip.stat().st_size
+    return entry
+
+
+def _load_index(out_dir):
+    try:
+        index = json.loads((out_dir / "slides.json").read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    return index.get("slides", {}) if index.get("settings") == _settings_key() else {}
+
+
+def _save_index(out_dir, slides):
+    tmp = out_dir / "slides.json.tmp"
+    tmp.write_text(json.dumps({"settings": _settings_key(), "widths": sorted(WIDTHS), "default": DEFAULT_WIDTH,
+                               "slides": slides}, indent=1, sort_keys=True), encoding="utf-8")
+    os.replace(tmp, out_dir / "slides.json")
+
+
+def _first_slide_seconds(sizes, link):
+    """Time to the first slide when its image shares the link with the other preloaded backgrounds."""
+    bandwidth, rtt = link
+    return rtt + 8 * sum(sizes) / bandwidth
+
+
+def report(decks):
+    """Bytes on disk and per page view, and first-slide latency, before and after."""
+    total_png = total_after = 0
+    first = {"before": [], "after": []}
+    for deck in decks:
+        sources = slide_files(SLIDES / f"{deck}_png")
+        index = _load_index(SLIDES / f"{deck}_web")
+        total_png += sum(p.stat().st_size for p in sources)
+        total_after += sum(index[p.stem]["bytes"][f"{DEFAULT_WIDTH}.webp"] for p in sources if p.stem in index)
+        first["before"].append([p.stat().st_size for p in sources[:VIEW_DISTANCE["before"]]])
+        first["after"].append(
+            [index[p.stem]["bytes"][f"{DEFAULT_WIDTH}.webp"] + index[p.stem]["bytes"]["lqip"]
+             for p in sources[:VIEW_DISTANCE["after"]] if p.stem in index])
+    print(f"\nSlides as shipped to a 1080p screen: PNG {total_png / 1e6:,.1f} MB -> "
+          f"WebP {DEFAULT_WIDTH}w {total_after / 1e6:,.1f} MB (AVIF-capable browsers fetch less)")
+    for name, link in LINKS.items():
+        before = sum(_first_slide_seconds(s, link) for s in first["before"]) / len(decks)
+        after = sum(_first_slide_seconds(s, link) for s in first["after"]) / len(decks)
+        print(f"First slide, mean over decks, {name}: {before:.2f} s -> {after:.2f} s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Encode responsive WebP/AVIF variants of the lecture slides.")
+    parser.add_argument("decks", nargs="*", help='deck names, e.g. "topic1lecture" (default: every exported deck)')
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="encoder processes")
+    args = parser.parse_args(argv)
+    try:
+        from PIL import features
+    except ImportError:
+        print("Pillow is required: pip install pillow")
+        return 1
+    if not features.check("avif"):
+        print("This Pillow build cannot write AVIF; install Pillow 11.3 or later")
+        return 1
+
+    decks = args.decks or sorted(p.name[:-4] for p in SLIDES.glob("*_png") if p.is_dir())
+    work = []
+    indexes = {}
+    for deck in decks:
+        out_dir = SLIDES / f"{deck}_web"
+        out_dir.mkdir(exist_ok=True)
+        index = _load_index(out_dir)
+        sources = slide_files(SLIDES / f"{deck}_png")
+        # Drop slides that no longer exist, then queue those whose PNG changed
+        indexes[deck] = {p.stem: index[p.stem] for p in sources if p.stem in index}
+        for source in sources:
+            cached = indexes[deck].get(source.stem)
+            if cached is None or cached["sha256"] != _sha256(source) or not (out_dir / f"{source.stem}-lqip.webp").exists():
+                work.append((deck, source, out_dir))
+
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+        futures = {pool.submit(optimise_slide, source, out_dir): (deck, source) for deck, source, out_dir in work}
+        for done, future in enumerate(as_completed(futures), start=1):
+            deck, source = futures[future]
+            indexes[deck][source.stem] = future.result()
+            if done % 25 == 0 or done == len(work):
+                print(f"{done}/{len(work)} slides encoded ({time.perf_counter() - started:.0f} s)")
+    for deck in decks:
+        _save_index(SLIDES / f"{deck}_web", indexes[deck])
+    print(f"{len(work)} slides encoded, {sum(map(len, indexes.values())) - len(work)} unchanged")
+    report(decks)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
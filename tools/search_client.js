@@ -0,0 +1,119 @@
+// Reader for the sharded search index written by tools/build_search.py.
+// Only meta.json.gz and the shards the typed words need are fetched; each is
+// fetched once per page view. Every word of the query must match (the last
+// one may still be being typed, so all words match as prefixes). Sections
+// are ranked by BM25, and exact matches count double against prefix matches.
+class SiteSearch {
+  constructor(base, load) {
+    this.base = base;
+    this.load = load || (name => SiteSearch.fetchGzipJson(base + name));
+    this.files = new Map();
+  }
+
+  static async fetchGzipJson(url) {
+    const response = await fetch(url);
+    if (!response.ok) throw new Error(`${url}: ${response.status}`);
+    const stream = response.body.pipeThrough(new DecompressionStream("gzip"));
+    return JSON.parse(await new Response(stream).text());
+  }
+
+  file(name) {
+    if (!this.files.has(name)) {
+      const loading = this.load(name);
+      // A failed fetch is retried on the next query
+      loading.catch(() => this.files.delete(name));
+      this.files.set(name, loading);
+    }
+    return this.files.get(name);
+  }
+
+  meta() {
+    return this.file("meta.json.gz").then(meta => {
+      if (!meta.stopWords) {
+        meta.stopWords = new Set(meta.stop);
+        meta.averageLength = meta.docs.reduce((sum, d) => sum + d[4], 0) / Math.max(meta.docs.length, 1) || 1;
+      }
+      return meta;
+    });
+  }
+
+  async shard(key) {
+    const shard = await this.file(`${key}.json.gz`);
+    if (!shard.terms) {
+      // Undo the front coding once
+      shard.terms = [];
+      let previous = "";
+      shard.shared.forEach((n, i) => {
+        previous = previous.slice(0, n) + shard.rest[i];
+        shard.terms.push(previous);
+      });
+    }
+    return shard;
+  }
+
+  static words(query, stopWords) {
+    const folded = query.toLowerCase().normalize("NFKD").replace(/[^\x00-\x7f]/g, "");
+    return (folded.match(/[a-z0-9]+/g) || []).filter(w => !stopWords.has(w) && (w.length > 1 || /\d/.test(w)));
+  }
+
+  // Shards whose terms can start with `word`: the deepest key prefixing it, and every key below it
+  static shardsFor(word, keys) {
+    const below = keys.filter(k => k.startsWith(word));
+    const above = keys.filter(k => word.startsWith(k) && k !== word).sort((a, b) => b.length - a.length)[0];
+    return above ? [above, ...below] : below;
+  }
+
+  async scores(word, meta) {
+    const scores = new Map();
+    const n = meta.docs.length;
+    for (const key of SiteSearch.shardsFor(word, meta.shards)) {
+      const shard = await this.shard(key);
+      const terms = shard.terms;
+      let lo = 0, hi = terms.length;
+      while (lo < hi) {
+        const mid = (lo + hi) >> 1;
+        if (terms[mid] < word) lo = mid + 1; else hi = mid;
+      }
+      for (let t = lo; t < terms.length && terms[t].startsWith(word); t++) {
+        const postings = shard.postings[t];
+        const df = postings.length / 2;
+        const idf = Math.log(1 + (n - df + 0.5) / (df + 0.5)) * (terms[t] === word ? 2 : 1);
+        let doc = 0;
+        for (let i = 0; i < postings.length; i += 2) {
+          doc += postings[i];
+          const tf = postings[i + 1];
+          const norm = SiteSearch.K1 * (1 - SiteSearch.B + SiteSearch.B * meta.docs[doc][4] / meta.averageLength);
+          scores.set(doc, (scores.get(doc) || 0) + idf * tf * (SiteSearch.K1 + 1) / (tf + norm));
+        }
+      }
+    }
+    return scores;
+  }
+
+  async search(query, limit = 20) {
+    const meta = await this.meta();
+    const words = SiteSearch.words(query, meta.stopWords);
+    if (!words.length) return [];
+    const perWord = await Promise.all(words.map(w => this.scores(w, meta)));
+    perWord.sort((a, b) => a.size - b.size);
+    const results = [];
+    for (const [doc, score] of perWord[0]) {
+      let total = score;
+      for (const other of perWord.slice(1)) {
+        if (!other.has(doc)) { total = null; break; }
+        total += other.get(doc);
+      }
+      if (total !== null) results.push([doc, total]);
+    }
+    results.sort((a, b) => b[1] - a[1]);
+    return results.slice(0, limit).map(([doc, score]) => {
+      const [href, title, section, excerpt] = meta.docs[doc];
+      return { href, title, section, excerpt, score };
+    });
+  }
+}
+
+SiteSearch.K1 = 1.2;
+SiteSearch.B = 0.75;
+
+if (typeof module !== "undefined") module.exports = SiteSearch;
@@ -0,0 +1,212 @@
+"""Local numeric checks for the quantitative questions.
+
+Reference solutions are derived with SymPy and compiled with ``lambdify``
+when an app starts. ``NumericVerifier`` pulls ``name = value`` statements
+out of a student's answer and compares them against those references. A
+right-hand side left as arithmetic (``Y = 160 × 20``) is evaluated with
+SymPy, and the results are cached, so per-part verdicts cost a few regex passes. The verdicts are shown to the
+student and handed to the LLM, which no longer has to redo the arithmetic.
+"""
+
+import re
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from functools import lru_cache
+
+# A bare number (or fraction) that is not the start of a longer expression like ``160√N``.
+_NUMBER = re.compile(
+    r"\s*([-−]?\d[\d,]*(?:\.\d+)?(?:\s*/\s*\d+(?:\.\d+)?)?)(?!\.?\d|\s*[*×·^/+√-]|[\[(A-Za-zθ])"
+)
+_ASSIGN = r"\s*(?:\^?\{?\*\}?)?\s*(?:=|≈|≃|~|:|\bis\b|\bequals\b)"
+# Separators between statements: "θ = 4, N = 400", "P₁ = 7.5 and W₁ = 30", sentence ends,
+# and connectives that move on to the next step ("θ = 4 so N = 400").
+_STATEMENT_END = re.compile(
+    r",\s|\.\s|;|\n|⇒|=>|→|\b(?:and|so|hence|then|therefore|thus|giving|which\s+gives|which\s+means)\b", re.I
+)
+# Right-hand sides made only of numbers and operators, which SymPy can evaluate.
+_ARITHMETIC = re.compile(r"[\d\s.,+\-−*×·/^()√]+")
+_SUBSCRIPTS = str.maketrans("₀₁₂₃₄₅₆₇₈₉", "0123456789")
+
+
+def symbol(*names, sub=None, prime=False):
+    """Regex for a maths symbol as students type it: ``P_0``, ``P₀``, ``P0``, ``θ'``..."""
+    head = "(?:" + "|".join(names) + ")"
+    if sub is not None:
+        head += rf"(?:_?\{{?{sub}\}}?)"
+    else:
+        head += r"(?![_\d])"
+    head += r"\s*['′’]" if prime else r"(?!\s*['′’])"
+    # Only where a statement starts, not inside an expression such as ``160√N`` or ``θP_0``.
+    return r"(?<![\w\\√/*^·×+\-−'])" + head
+
+
+def reference_values(exprs, params):
+    """Evaluate SymPy expressions at ``params`` via compiled numeric lambdas."""
+    import sympy as sp
+
+    symbols = list(params)
+    compiled = sp.lambdify(symbols, list(exprs.values()), modules="math")
+    return dict(zip(exprs, (float(v) for v in compiled(*params.values()))))
+
+
+@dataclass
+class Check:
+    part: str
+    label: str
+    value: float
+    aliases: list
+    # Phrasings whose stated number is the negative of ``value`` ("net sale of good 2").
+    negated_aliases: list = field(default_factory=list)
+    rel_tol: float = 0.01
+
+    def __post_init__(self):
+        self.patterns = [(re.compile(a + _ASSIGN, re.I), 1.0) for a in self.aliases]
+        self.patterns += [(re.compile(a + _ASSIGN, re.I), -1.0) for a in self.negated_aliases]
+
+
+@dataclass
+class Verdict:
+    part: str
+    label: str
+    status: str
+    student: float = None
+    expected: float = None
+
+
+def _parse_number(text):
+    text = text.replace("−", "-").replace(",", "")
+    if "/" in text:
+        numerator, denominator = text.split("/")
+        return float(numerator) / float(denominator)
+    return float(text)
+
+
+@lru_cache(maxsize=4096)
+def _evaluate(expression):
+    """Value of a purely arithmetic expression such as ``160 × √400``, or ``None``."""
+    text = re.sub(r"(?<=\d),(?=\d{3}\b)", "", expression.strip())
+    if re.fullmatch(r"[-−]?\d+(?:\.\d+)?", text):
+        return float(text.replace("−", "-"))
+
+    import sympy as sp
+
+    text = text.replace("−", "-").replace("×", "*").replace("·", "*").replace("^", "**")
+    text = re.sub(r"√\s*(\d[\d.]*|\([^()]*\))", r"sqrt(\1)", text)
+    if not text or "," in text or "√" in text:
+        return None
+    try:
+        value = sp.sympify(text)
+        return float(value) if value.is_real else None
+    except (sp.SympifyError, TypeError, ValueError, ZeroDivisionError, SyntaxError):
+        return None
+
+
+def _stated_value(rest):
+    """The value a statement gives after its label's ``=``.
+
+    When the whole right-hand side is an arithmetic chain (``100 × 4 = 400``,
+    or just ``160 × 20``) its final link is evaluated. Otherwise the first
+    bare number after an ``=`` is taken, skipping symbolic steps such as
+    ``θP₀ = 20``; a right-hand side with no bare number (``100θ``) states
+    nothing.
+    """
+    pieces = re.split(r"[=≈≃]", rest)
+    if all(_ARITHMETIC.fullmatch(piece) for piece in pieces):
+        value = _evaluate(pieces[-1])
+        if value is not None:
+            return value
+    for piece in pieces:
+        match = _NUMBER.match(piece)
+        if match:
+            try:
+                return _parse_number(match.group(1))
+            except (ValueError, ZeroDivisionError):
+                continue
+    return None
+
+
+class NumericVerifier:
+    def __init__(self, checks):
+        self.checks = checks
+        # Any check's label starts a new statement: "θ = 4 N = 400"
+        self._labels = re.compile(
+            "|".join(pattern.pattern for check in checks for pattern, _ in check.patterns), re.I
+        )
+
+    def _statement(self, text, start):
+        """Text of the statement whose right-hand side begins at ``start``."""
+        end = _STATEMENT_END.search(text, start)
+        stop = end.start() if end else len(text)
+        for label in self._labels.finditer(text, start, stop):
+            # A label only ends the statement once a value has been given ("W₀ = θP₀ = 20" continues)
+            if re.search(r"\d", text[start:label.start()]):
+                return text[start:label.start()]
+        return text[start:stop]
+
+    @staticmethod
+    def _inside_expression(text, start, position):
+        """Whether a label at ``position`` sits in an earlier right-hand side ("W₀ = θ P₀ = 20")."""
+        before = text[start:position]
+        equals = max(before.rfind(sign) for sign in "=≈≃")
+        # Once that right-hand side has given a value, the label starts a new statement ("θ = 4 N = 400")
+        return equals >= 0 and not re.search(r"\d", before[equals + 1:])
+
+    def verify(self, answer):
+        text = answer.translate(_SUBSCRIPTS)
+        ends = [0] + [end.end() for end in _STATEMENT_END.finditer(text)]
+        verdicts = []
+        for check in self.checks:
+            # The first statement in the answer that gives a value; later mentions ("into N = 100θ") don't override it
+            stated = None
+            for pattern, sign in check.patterns:
+                for match in pattern.finditer(text):
+                    if stated and match.start() >= stated[0]:
+                        break
+                    if self._inside_expression(text, ends[bisect_right(ends, match.start()) - 1], match.start()):
+                        continue
+                    value = _stated_value(self._statement(text, match.end()))
+                    if value is not None:
+                        stated = (match.start(), sign * value)
+                        break
+            if stated is None:
+                verdicts.append(Verdict(check.part, check.label, "missing", expected=check.value))
+                continue
+            stated = stated[1]
+            close = abs(stated - check.value) <= check.rel_tol * max(abs(check.value), 1e-9)
+            verdicts.append(
+                Verdict(check.part, check.label, "correct" if close else "incorrect", stated, check.value)
+            )
+        return verdicts
+
+
+def verdicts_prompt(verdicts):
+    """Verdicts as a prompt block the LLM should trust rather than recompute."""
+    lines = []
+    for v in verdicts:
+        if v.status == "missing":
+            lines.append(f"- {v.part} {v.label}: not stated (reference {v.expected:g})")
+        else:
+            lines.append(f"- {v.part} {v.label}: student gave {v.student:g}, reference {v.expected:g} -> {v.status.upper()}")
+    return "\n".join(lines)
+
+
+def verdicts_ui(verdicts):
+    """Per-part checklist for the student; reference values are not revealed."""
+    from shiny import ui
+
+    marks = {"correct": "✅", "incorrect": "❌", "missing": "⬜"}
+    notes = {"correct": "matches the reference", "incorrect": "check this calculation", "missing": "not found in your answer"}
+    return ui.div(
+        ui.h4("Numerical check", style="margin-top: 0; color: #3949ab;"),
+        ui.tags.ul(
+            *[
+                ui.tags.li(f"{marks[v.status]} {v.part} {v.label}: {notes[v.status]}", style="list-style: none; margin: 2px 0;")
+                for v in verdicts
+            ],
+            style="padding-left: 0; margin: 0;",
+        ),
+        style=(
+            "margin-top: 12px; padding: 16px 20px; background: #f0f4ff; "
+            "border-left: 4px solid #667eea; border-radius: 6px;"
+        ),
+    )